@@ -0,0 +1,226 @@
+"""
+Synthetic market data files in the formats read by the DataManager, and a synthetic
+order flow for the Book. Everything is seeded, so the same arguments write the same
+files.
+"""
+
+from event_backtesting.constants import *
+import numpy as np
+import os
+
+# Rows formatted and written at once
+BLOCK = 1_000_000
+
+# First price of the random walks
+PRICE = 20.0
+
+# Trading session of the intraday files, one row per second from 10:00
+SESSION_START = 10 * 3600
+SESSION_SECONDS = 7 * 3600
+
+START = np.datetime64("2020-01-01", "D")
+
+# Yahoo dates are days, datetime only goes up to the year 9999
+MAX_DAYS = (np.datetime64("9999-12-31", "D") - START).astype(int)
+
+HEADERS = {
+    (DataSource.BLOOMBERG, DataType.TICK): "DATA;ACAO;VALOR;VOLUME",
+    (DataSource.BLOOMBERG, DataType.INTR): "DATA;ABERTURA;FECHAMENTO;MAXIMA;MINIMA",
+    (DataSource.YAHOO, DataType.HIST): "Date,Open,High,Low,Close,Adj Close,Volume",
+}
+
+
+def walk(rows: int, rng: np.random.Generator, price: float = PRICE) -> np.ndarray:
+    """
+    Random walk of prices rounded to cents, from the price before the first row.
+    """
+    return (price * np.exp(np.cumsum(rng.normal(0, 0.0005, rows)))).round(2)
+
+
+def seconds(first: int, rows: int) -> np.ndarray:
+    """
+    Intraday timestamps of the rows first to first + rows, one per second of the session.
+    """
+    index = np.arange(first, first + rows, dtype=np.int64)
+    day, second = np.divmod(index, SESSION_SECONDS)
+    return (
+        START.astype("datetime64[s]")
+        + day * 86400
+        + SESSION_START
+        + second.astype("timedelta64[s]")
+    )
+
+
+def bloomberg_dates(timestamps: np.ndarray) -> list:
+    """
+    Timestamps as DATETIME_FORMAT text (%d/%m/%Y %H:%M:%S).
+    """
+    return [
+        "{0}/{1}/{2} {3}".format(iso[8:10], iso[5:7], iso[:4], iso[11:19])
+        for iso in np.datetime_as_string(timestamps, unit="s")
+    ]
+
+
+def decimal(values: np.ndarray) -> list:
+    """
+    Prices in the Brazilian decimal format.
+    """
+    return ["{0:.2f}".format(value).replace(".", ",") for value in values.tolist()]
+
+
+def bloomberg_tick(
+    first: int, rows: int, rng: np.random.Generator, price: float
+) -> tuple:
+    bid = walk(rows, rng, price)
+    spread = rng.integers(1, 5, rows) / 100
+
+    # Mostly quotes, a tenth of trades
+    kind = rng.choice(np.array(["BID", "ASK", "TRADE"]), rows, p=[0.45, 0.45, 0.1])
+    price = np.where(kind == "ASK", bid + spread, bid)
+    volume = rng.integers(1, 50, rows) * 100
+
+    lines = [
+        ";".join(row)
+        for row in zip(
+            bloomberg_dates(seconds(first, rows)),
+            kind.tolist(),
+            decimal(price),
+            map(str, volume.tolist()),
+        )
+    ]
+    return lines, bid[-1]
+
+
+def candles(rows: int, rng: np.random.Generator, price: float) -> tuple:
+    # Each bar opens at the previous close
+    close = walk(rows, rng, price)
+    open = np.concatenate(([price], close[:-1]))
+    high = np.maximum(open, close) + rng.integers(0, 10, rows) / 100
+    low = np.minimum(open, close) - rng.integers(0, 10, rows) / 100
+    return open, high, low, close
+
+
+def bloomberg_intr(
+    first: int, rows: int, rng: np.random.Generator, price: float
+) -> tuple:
+    open, high, low, close = candles(rows, rng, price)
+    lines = [
+        ";".join(row)
+        for row in zip(
+            bloomberg_dates(seconds(first, rows)),
+            decimal(open),
+            decimal(close),
+            decimal(high),
+            decimal(low),
+        )
+    ]
+    return lines, close[-1]
+
+
+def yahoo_hist(first: int, rows: int, rng: np.random.Generator, price: float) -> tuple:
+    open, high, low, close = candles(rows, rng, price)
+    dates = np.datetime_as_string(START + np.arange(first, first + rows))
+    volume = rng.integers(1000, 100000, rows)
+    lines = [
+        "{0},{1:.2f},{2:.2f},{3:.2f},{4:.2f},{4:.2f},{5}".format(*row)
+        for row in zip(
+            dates.tolist(),
+            open.tolist(),
+            high.tolist(),
+            low.tolist(),
+            close.tolist(),
+            volume.tolist(),
+        )
+    ]
+    return lines, close[-1]
+
+
+# Each generator formats rows rows from the row first, starting the prices from the
+# last price of the previous block, and returns the lines and its own last price
+GENERATORS = {
+    (DataSource.BLOOMBERG, DataType.TICK): bloomberg_tick,
+    (DataSource.BLOOMBERG, DataType.INTR): bloomberg_intr,
+    (DataSource.YAHOO, DataType.HIST): yahoo_hist,
+}
+
+
+def write(file_name: str, source: str, type: str, rows: int, seed: int = 0) -> None:
+    """
+    Writes a file of rows synthetic rows, sorted by time, in blocks of BLOCK rows. The
+    prices of each block go on from the previous one.
+
+    Raises:
+        ValueError: If the format is not supported or a Yahoo file has more days than
+            the calendar allows.
+    """
+    if (source, type) not in GENERATORS:
+        raise ValueError("Unsupported data {0} {1}.".format(source, type))
+    if type == DataType.HIST and rows > MAX_DAYS:
+        raise ValueError("A daily file has at most {0} rows.".format(MAX_DAYS))
+
+    generate = GENERATORS[(source, type)]
+    rng = np.random.default_rng(seed)
+    price = PRICE
+
+    with open(file_name, "w") as file:
+        file.write(HEADERS[(source, type)] + "\n")
+        for first in range(0, rows, BLOCK):
+            lines, price = generate(first, min(BLOCK, rows - first), rng, price)
+            file.write("\n".join(lines) + "\n")
+
+
+def dataset(
+    folder: str, source: str, type: str, rows: int, instruments: int = 1, seed: int = 0
+) -> dict:
+    """
+    Writes rows synthetic rows split among instruments files. Existing files are kept,
+    so the same dataset is generated once.
+
+    Returns:
+        dict: The LOAD event value, instrument -> data spec.
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    specs = {}
+    for i in range(instruments):
+        instrument = "SYN{0}".format(i)
+        count = rows // instruments + (1 if i < rows % instruments else 0)
+        file_name = os.path.join(
+            folder,
+            "{0}_{1}_{2}_{3}_{4}.csv".format(
+                source, partition_name(type), count, seed, instrument
+            ),
+        )
+        if not os.path.exists(file_name):
+            write(file_name, source, type, count, seed + i)
+
+        specs[instrument] = {
+            Data.SOURCE: source,
+            Data.TYPE: type,
+            Data.FILE: file_name,
+        }
+    return specs
+
+
+def order_flow(count: int, price: float = 20.0, seed: int = 0) -> list:
+    """
+    Limit orders around price, alternating sides, with prices a few cents apart.
+
+    Returns:
+        list[tuple[str, int, float]]: (side, quantity, price) of each order.
+    """
+    rng = np.random.default_rng(seed)
+    offset = rng.integers(1, 200, count) / 100
+    quantity = rng.integers(1, 10, count) * 100
+
+    orders = []
+    for i in range(count):
+        if i % 2 == 0:
+            orders.append(
+                (OrderSide.BUY, int(quantity[i]), round(price - offset[i], 2))
+            )
+        else:
+            orders.append(
+                (OrderSide.SELL, int(quantity[i]), round(price + offset[i], 2))
+            )
+    return orders
@@ -0,0 +1,283 @@
+"""
+Speed benchmarks of the DataManager, the Book and Risk on synthetic data.
+
+Each benchmark is timed as the best of --repeat runs and saved as JSON with the commit
+and the environment, so two runs can be compared:
+
+    PYTHONPATH=src python -m benchmarks.run --rows 10000 1000000 --output new.json
+    PYTHONPATH=src python -m benchmarks.run --compare old.json new.json
+"""
+
+from event_processing.event import Event
+from event_backtesting.constants import *
+from event_backtesting.data_manager import DataManager
+from event_backtesting.book import Book
+from event_backtesting.order import Order
+from event_backtesting.risk import Risk
+from benchmarks.generate import dataset, order_flow
+from datetime import datetime, timedelta
+from time import perf_counter
+import numpy as np
+import subprocess
+import platform
+import argparse
+import tempfile
+import json
+import sys
+import os
+
+FORMATS = {
+    "tick": (DataSource.BLOOMBERG, DataType.TICK),
+    "intr": (DataSource.BLOOMBERG, DataType.INTR),
+    "hist": (DataSource.YAHOO, DataType.HIST),
+}
+
+FOLDER = os.path.join(tempfile.gettempdir(), "event_backtesting_benchmarks")
+
+
+def measure(run, setup=None, repeat: int = 3) -> float:
+    """
+    Best wall time in seconds of run(setup()) over repeat runs. setup is not timed.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = perf_counter()
+        run(state)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def result(benchmark: str, seconds: float, count: int, **params) -> dict:
+    return {
+        "benchmark": benchmark,
+        "params": params,
+        "seconds": seconds,
+        "per_second": count / seconds if seconds > 0 else 0.0,
+    }
+
+
+def bench_data_manager(
+    folder: str, format: str, rows: int, instruments: int, columnar: bool, repeat: int
+) -> list:
+    """
+    LOAD (parsing) and RUN (replay and send) of synthetic files.
+    """
+    source, type = FORMATS[format]
+    specs = dataset(folder, source, type, rows, instruments)
+    params = dict(format=format, rows=rows, instruments=instruments, columnar=columnar)
+
+    manager = DataManager(columnar=columnar)
+    load = Event(Topic.SYSTEM, Partition.LOAD, specs)
+    seconds = measure(lambda _: manager.receive(load), repeat=repeat)
+    results = [result("data_manager.load", seconds, rows, **params)]
+
+    # Count the events instead of queueing them in an engine
+    sent = [0]
+
+    def count(event):
+        sent[0] += 1
+
+    manager._send = count
+    run = Event(Topic.SYSTEM, Partition.RUN, None)
+    seconds = measure(lambda _: manager.receive(run), repeat=repeat)
+    results.append(result("data_manager.run", seconds, sent[0] // repeat, **params))
+
+    return results
+
+
+def pending_book(pending: int) -> Book:
+    """
+    Book with pending limit orders around 20.00 and quotes crossing about 1% of them.
+    """
+    book = Book("SYN")
+    book.timestamp = datetime(2020, 1, 1, 10)
+    for side, quantity, price in order_flow(pending):
+        order = Order("SYN", side, quantity, price)
+        order.owner = 0
+        order.timestamp = book.timestamp
+        book.add_order(order)
+
+    book.bids.quote(20.02, 0, book.timestamp)
+    book.asks.quote(19.98, 0, book.timestamp)
+    return book
+
+
+def bench_book(pending: int, repeat: int) -> list:
+    """
+    Fills of the pending orders crossing a quote and of the orders inside a candle range.
+    """
+
+    def crossing():
+        book = pending_book(pending)
+        return book, book.crossing_orders()
+
+    def fill(state):
+        book, orders = state
+        book.try_fill_orders(orders, order_price=True)
+
+    seconds = measure(fill, crossing, repeat)
+    results = [result("book.try_fill_orders", seconds, pending, pending=pending)]
+
+    seconds = measure(
+        lambda book: book.try_match_range(19.97, 20.03),
+        lambda: pending_book(pending),
+        repeat,
+    )
+    results.append(result("book.try_match_range", seconds, pending, pending=pending))
+
+    return results
+
+
+def bench_risk(trades: int, repeat: int) -> list:
+    """
+    Accounting of round trip trades and the summary of all of them.
+    """
+    timestamp = datetime(2020, 1, 1, 10)
+    rng = np.random.default_rng(0)
+    prices = (20 + rng.normal(0, 0.1, (trades, 2))).round(2).tolist()
+
+    def setup():
+        risk = Risk()
+        risk.receive(Event(Topic.SYSTEM, Partition.LOAD, ["SYN"]))
+        risk.receive(
+            Event(
+                "SYN",
+                Partition.CANDLE,
+                {
+                    Candle.OPEN: 20.0,
+                    Candle.HIGH: 20.0,
+                    Candle.LOW: 20.0,
+                    Candle.CLOSE: 20.0,
+                    Candle.VOLUME: 0,
+                },
+                timestamp,
+            )
+        )
+        return risk
+
+    def fill(risk):
+        for i, (buy, sell) in enumerate(prices):
+            moment = timestamp + timedelta(seconds=i)
+            risk.fill("SYN", 1, 2 * i, OrderSide.BUY, 100, buy, moment)
+            risk.fill("SYN", 1, 2 * i + 1, OrderSide.SELL, 100, sell, moment)
+
+    seconds = measure(fill, setup, repeat)
+    results = [result("risk.fill", seconds, 2 * trades, trades=trades)]
+
+    risk = setup()
+    fill(risk)
+    seconds = measure(lambda _: risk.summary(1), repeat=repeat)
+    results.append(result("risk.summary", seconds, trades, trades=trades))
+
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def key(row: dict) -> str:
+    return "{0} {1}".format(
+        row["benchmark"],
+        " ".join("{0}={1}".format(*item) for item in sorted(row["params"].items())),
+    )
+
+
+def table(results: list) -> str:
+    lines = []
+    for row in results:
+        lines.append(
+            "{0:<70} {1:>12.6f}s {2:>14.0f}/s".format(
+                key(row), row["seconds"], row["per_second"]
+            )
+        )
+    return "\n".join(lines)
+
+
+def compare(old: dict, new: dict) -> str:
+    """
+    New time over old time of each benchmark in both runs, above 1 is slower.
+    """
+    before = {key(row): row["seconds"] for row in old["results"]}
+
+    lines = [
+        "{0} -> {1}".format(old["environment"]["commit"], new["environment"]["commit"])
+    ]
+    for row in new["results"]:
+        if key(row) in before and before[key(row)] > 0:
+            lines.append(
+                "{0:<70} {1:>8.2f}x".format(key(row), row["seconds"] / before[key(row)])
+            )
+    return "\n".join(lines)
+
+
+def main(argv: list = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--instruments", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS)
+    )
+    parser.add_argument(
+        "--columnar", type=int, nargs="+", choices=[0, 1], default=[0, 1]
+    )
+    parser.add_argument(
+        "--pending", type=int, nargs="+", default=[10, 100, 1000, 10000]
+    )
+    parser.add_argument("--trades", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--folder", default=FOLDER, help="Synthetic files, reused")
+    parser.add_argument("--output", help="JSON file of the results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare is not None:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            print(compare(json.load(old), json.load(new)))
+        return None
+
+    results = []
+    for format in args.formats:
+        for rows in args.rows:
+            for instruments in args.instruments:
+                for columnar in args.columnar:
+                    results += bench_data_manager(
+                        args.folder,
+                        format,
+                        rows,
+                        instruments,
+                        bool(columnar),
+                        args.repeat,
+                    )
+    for pending in args.pending:
+        results += bench_book(pending, args.repeat)
+    for trades in args.trades:
+        results += bench_risk(trades, args.repeat)
+
+    report = {"environment": environment(), "results": results}
+
+    print(table(results))
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
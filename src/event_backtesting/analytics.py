@@ -0,0 +1,196 @@
+from event_backtesting.constants import *
+from contextlib import contextmanager
+import numpy as np
+import warnings
+
+# Trading days per year
+PERIODS = 252
+
+# Every function works on the last axis: a 1-D array is one strategy, a 2-D array
+# (strategies x days) is a batch of strategies computed in the same pass.
+
+
+@contextmanager
+def undefined():
+    """
+    Metrics of curves too short to define them (e.g. the standard deviation of fewer than 2
+    returns) are NaN, without the NumPy warnings.
+    """
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        yield
+
+
+def daily_rate(yearly: float = RISK_FREE_RATE) -> float:
+    """
+    Daily rate of a yearly rate in percent.
+    """
+    return (1 + yearly / 100) ** (1 / PERIODS) - 1
+
+
+def returns(equity: np.ndarray) -> np.ndarray:
+    """
+    Simple returns between consecutive points of the equity.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    return equity[..., 1:] / equity[..., :-1] - 1
+
+
+def underwater(equity: np.ndarray) -> np.ndarray:
+    """
+    Drawdown of each point relative to the running peak (0 or negative).
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    return equity / np.maximum.accumulate(equity, axis=-1) - 1
+
+
+def max_drawdown(equity: np.ndarray) -> np.ndarray:
+    """
+    Largest drawdown relative to the peak (0 or negative).
+    """
+    return underwater(equity).min(axis=-1)
+
+
+def cagr(equity: np.ndarray, periods: int = PERIODS) -> np.ndarray:
+    """
+    Compound annual growth rate, with periods points per year. NaN with fewer than 2
+    points, as no time has passed.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.shape[-1] < 2:
+        return np.full(equity.shape[:-1], np.nan)[()]
+
+    years = (equity.shape[-1] - 1) / periods
+    return (equity[..., -1] / equity[..., 0]) ** (1 / years) - 1
+
+
+def sharpe(
+    returns: np.ndarray, risk_free: float = 0.0, periods: int = PERIODS
+) -> np.ndarray:
+    """
+    Annualized Sharpe ratio of the returns over the risk-free rate of one period.
+    """
+    excess = np.asarray(returns, dtype=np.float64) - risk_free
+    with undefined():
+        return excess.mean(axis=-1) / excess.std(axis=-1, ddof=1) * np.sqrt(periods)
+
+
+def sortino(
+    returns: np.ndarray, risk_free: float = 0.0, periods: int = PERIODS
+) -> np.ndarray:
+    """
+    Annualized Sortino ratio: only the returns below the risk-free rate count as risk.
+    """
+    excess = np.asarray(returns, dtype=np.float64) - risk_free
+    with undefined():
+        downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2, axis=-1))
+        return excess.mean(axis=-1) / downside * np.sqrt(periods)
+
+
+def calmar(equity: np.ndarray, periods: int = PERIODS) -> np.ndarray:
+    """
+    Compound annual growth rate over the maximum drawdown. A curve that never draws down
+    has a ratio of inf if it grows and NaN if it is flat.
+    """
+    # abs() and not a minus sign: no drawdown is 0.0, and a minus sign gives -0.0 (-inf)
+    with undefined():
+        return cagr(equity, periods) / np.abs(max_drawdown(equity))
+
+
+def rolling_volatility(
+    returns: np.ndarray, window: int, periods: int = PERIODS
+) -> np.ndarray:
+    """
+    Annualized volatility of each window of returns, from running sums in one pass
+    whatever the window size. The first window - 1 points are NaN, so all of them are
+    when the window is longer than the returns.
+
+    Raises:
+        ValueError: If the window is shorter than 2 returns.
+    """
+    if window < 2:
+        raise ValueError(
+            "The window must have at least 2 returns, not {0}.".format(window)
+        )
+
+    returns = np.asarray(returns, dtype=np.float64)
+    if window > returns.shape[-1]:
+        return np.full(returns.shape, np.nan)
+
+    # Running sums with a leading zero, the window sums are differences
+    shape = returns.shape[:-1] + (1,)
+    sums = np.concatenate([np.zeros(shape), np.cumsum(returns, axis=-1)], axis=-1)
+    squares = np.concatenate(
+        [np.zeros(shape), np.cumsum(returns * returns, axis=-1)], axis=-1
+    )
+    total = sums[..., window:] - sums[..., :-window]
+    total2 = squares[..., window:] - squares[..., :-window]
+
+    variance = np.maximum(total2 - total * total / window, 0) / (window - 1)
+
+    volatility = np.full(returns.shape, np.nan)
+    volatility[..., window - 1 :] = np.sqrt(variance * periods)
+    return volatility
+
+
+def exposure(exposed: np.ndarray) -> np.ndarray:
+    """
+    Fraction of the time with an open position.
+    """
+    return np.mean(np.asarray(exposed, dtype=bool), axis=-1)
+
+
+def stack(curves: list, capital: float = INITIAL_CAPITAL) -> tuple:
+    """
+    Aligns the daily equity of several strategies into one strategies x days array. A
+    strategy that started later is padded at the start with its initial capital.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The equity and exposed arrays.
+    """
+    days = max([len(curve) for curve in curves], default=0)
+
+    equity = np.full((len(curves), days), float(capital))
+    exposed = np.zeros((len(curves), days), dtype=bool)
+    for i, curve in enumerate(curves):
+        equity[i, days - len(curve) :] = curve.equities
+        exposed[i, days - len(curve) :] = curve.exposed
+
+    return equity, exposed
+
+
+def report(
+    equity: np.ndarray,
+    exposed: np.ndarray = None,
+    capital: float = INITIAL_CAPITAL,
+    risk_free_rate: float = RISK_FREE_RATE,
+    periods: int = PERIODS,
+) -> dict:
+    """
+    Performance metrics of daily equity curves: one strategy (1-D) or a batch (2-D). The
+    initial capital is the first point, so the first day has a return too.
+
+    Returns:
+        dict: Each metric, a float for one strategy or an array for a batch.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    shape = equity.shape[:-1] + (1,)
+    equity = np.concatenate([np.full(shape, float(capital)), equity], axis=-1)
+
+    daily = returns(equity)
+    risk_free = daily_rate(risk_free_rate)
+
+    with undefined():
+        metrics = {
+            "return": equity[..., -1] / equity[..., 0] - 1,
+            "cagr": cagr(equity, periods),
+            "volatility": daily.std(axis=-1, ddof=1) * np.sqrt(periods),
+            "sharpe": sharpe(daily, risk_free, periods),
+            "sortino": sortino(daily, risk_free, periods),
+            "max_drawdown": max_drawdown(equity),
+            "calmar": calmar(equity, periods),
+        }
+        if exposed is not None:
+            metrics["exposure"] = exposure(exposed)
+
+    return metrics
@@ -1,12 +1,16 @@
 from event_processing.subscriber import Subscriber
 from event_processing.event import Event
-from event_backtesting.order import Order, Trade, OrderSide, OrderStatus
+from event_backtesting.order import Order, Quote, OrderSide, OrderStatus
+from event_backtesting.levels import PriceLevels, OrderIndex
+from event_backtesting.tape import TradeTape
 from event_backtesting.constants import *
 from datetime import datetime
 
 
 class Book(Subscriber):
-    def __init__(self, instrument: str) -> None:
+    def __init__(
+        self, instrument: str, tape_size: int = None, tape_seconds: float = None
+    ) -> None:
 
         # book instrument
         self.instrument: str = instrument
@@ -14,172 +18,216 @@ class Book(Subscriber):
         # timestamp of last update
         self.timestamp: datetime = None
 
-        # list of trades
-        self.trades: list[Trade] = []
+        # tape of trades, unbounded or the last tape_size trades or the last
+        # tape_seconds seconds
+        self.trades: TradeTape = TradeTape(instrument, tape_size, tape_seconds)
 
-        # list of bids
-        self.bids: list[Order] = []
+        # bid price levels, highest first
+        self.bids: PriceLevels = PriceLevels(OrderSide.BUY)
 
-        # list of asks
-        self.asks: list[Order] = []
+        # ask price levels, lowest first
+        self.asks: PriceLevels = PriceLevels(OrderSide.SELL)
 
         # list of pending orders
         self.orders: dict[int, Order] = {}
 
+        # pending orders of each side sorted by price
+        self.pending: dict[str, OrderIndex] = {
+            OrderSide.BUY: OrderIndex(OrderSide.BUY),
+            OrderSide.SELL: OrderIndex(OrderSide.SELL),
+        }
+
+        # handler of each partition, the Dispatcher routes the events straight
+        # to them and receive() looks them up
+        self.handlers: dict = {
+            Partition.CANDLE: self.on_candle,
+            Partition.BID: self.on_level,
+            Partition.ASK: self.on_level,
+            Partition.TRADE: self.on_trade,
+            Partition.NEG: self.on_trade,
+            Partition.BEST_BID: self.on_best,
+            Partition.BEST_ASK: self.on_best,
+            Partition.ORDER: self.on_order,
+        }
+
     def receive(self, event: Event) -> None:
         if event.topic == self.instrument:
 
             # Save last update
             self.timestamp = event.timestamp
 
-            # Received a candle price event
-            if event.partition == Partition.CANDLE:
+            handler = self.handlers.get(event.partition)
+            if handler is not None:
+                handler(event)
 
-                # Append the candle as last trade
-                bid = Order(
-                    event.topic,
-                    OrderSide.BUY,
-                    0,
-                    event.value[Candle.CLOSE],
-                )
-                ask = Order(
-                    event.topic,
-                    OrderSide.SELL,
-                    0,
-                    event.value[Candle.CLOSE],
-                )
+    # Received a candle price event
+    def on_candle(self, event: Event) -> None:
+        self.timestamp = event.timestamp
 
-                trade = Trade(
-                    event.timestamp,
-                    event.topic,
-                    event.value[Candle.VOLUME],
-                    event.value[Candle.CLOSE],
-                )
-                self.trades.append(trade)
+        close = event.value[Candle.CLOSE]
 
-                # Update bid/ask book. This is the best guess we have
-                self.bids = [bid]
-                self.asks = [ask]
+        # Append the candle as last trade
+        self.trades.append(event.timestamp, event.value[Candle.VOLUME], close)
 
-                # Try match pending orders
-                # We assume infinity liquidity and
-                # the Low/High range will cross the limit price
-                filled_orders = self.try_match_range(
-                    event.value[Candle.LOW], event.value[Candle.HIGH]
-                )
+        # Update bid/ask book in place. This is the best guess we have
+        self.bids.quote(close, 0, event.timestamp)
+        self.asks.quote(close, 0, event.timestamp)
 
-                # Send fill event
-                for fill in filled_orders:
+        # Try match pending orders
+        # We assume infinity liquidity and
+        # the Low/High range will cross the limit price
+        filled_orders = self.try_match_range(
+            event.value[Candle.LOW], event.value[Candle.HIGH]
+        )
 
-                    # Remove from pending list
-                    del self.orders[fill.id]
+        # Send fill event
+        for fill in filled_orders:
 
-                    # Send the FILLED event
-                    fill.status = OrderStatus.FILLED
+            # Remove from pending list
+            self.remove_order(fill)
 
-                    self.send(
-                        Event(
-                            event.topic,
-                            OrderStatus.FILLED,
-                            fill.__dict__.copy(),
-                            event.timestamp,
-                        )
-                    )
+            # Send the FILLED event
+            fill.status = OrderStatus.FILLED
 
-            # TODO: RAW DATA & Event LOB
-            # TODO: sorted dict on bid/ask for LOB
-            elif event.partition == Partition.BID:
-                pass
-            elif event.partition == Partition.ASK:
-                pass
-            elif event.partition == Partition.NEG:
-                pass
-            elif event.partition == Partition.TRADE:
-
-                # Save the trade in the trades list
-                trade = Trade(
-                    self.timestamp,
+            self.send(
+                Event(
                     event.topic,
-                    event.value[Order.QUANTITY],
-                    event.value[Order.PRICE],
+                    OrderStatus.FILLED,
+                    fill.report(),
+                    event.timestamp,
                 )
-                self.trades.append(trade)
-
-            elif (
-                event.partition == Partition.BEST_BID
-                or event.partition == Partition.BEST_ASK
-            ):
-                if event.partition == Partition.BEST_BID:
-                    # Replace the best bid in the book
-                    order = Order(
-                        event.topic,
-                        OrderSide.BUY,
-                        event.value[Order.QUANTITY],
-                        event.value[Order.PRICE],
-                    )
-                    order.timestamp = event.timestamp
-                    self.bids = [order]
-
-                elif event.partition == Partition.BEST_ASK:
-                    # Replace the best ask in the book
-                    order = Order(
-                        event.topic,
-                        OrderSide.SELL,
-                        event.value[Order.QUANTITY],
-                        event.value[Order.PRICE],
-                    )
-                    order.timestamp = event.timestamp
-                    self.asks = [order]
-
-                # Try to fill the pending orders under new lob with order price
-                filled = self.try_fill_orders(self.orders.values(), order_price=True)
-                # Remove if filled
-                for fill in filled:
-                    del self.orders[fill.id]
-
-            # If receive an order request from execution
-            elif event.partition == Partition.ORDER:
-
-                # Create the order object
-                order = Order(
-                    event.topic,
-                    event.value[Order.SIDE],
+            )
+
+    # Level update of the full book: the quantity at a price
+    # Quantity 0 removes the price level
+    def on_level(self, event: Event) -> None:
+        self.timestamp = event.timestamp
+
+        if event.partition == Partition.BID:
+            side, levels = OrderSide.BUY, self.bids
+        else:
+            side, levels = OrderSide.SELL, self.asks
+
+        offer = levels.get(event.value[Order.PRICE])
+        if offer is not None and event.value[Order.QUANTITY] != 0:
+            # Update the level in place
+            offer.quantity = event.value[Order.QUANTITY]
+            offer.timestamp = event.timestamp
+        else:
+            levels.update(
+                Quote(
+                    side,
                     event.value[Order.QUANTITY],
                     event.value[Order.PRICE],
+                    event.timestamp,
                 )
-                order.owner = event.value[Order.OWNER]
-                order.timestamp = self.timestamp
-
-                self.send(
-                    Event(
-                        order.instrument,
-                        OrderStatus.NEW,
-                        order.__dict__.copy(),
-                        self.timestamp,
-                    )
-                )
-
-                # try to fill the order
-                filled = self.try_fill_orders([order])
-                # if it was not possible to fill it completely
-                if len(filled) == 0:
-                    # Add to pending orders list
-                    self.orders[order.id] = order
-
-    # Filling ALL pending orders when received a Candle event
+            )
+
+        # Try to fill the pending orders that cross the new lob
+        self.try_fill_pending()
+
+    def on_trade(self, event: Event) -> None:
+        self.timestamp = event.timestamp
+
+        # Save the trade in the tape
+        self.trades.append(
+            self.timestamp,
+            event.value[Order.QUANTITY],
+            event.value[Order.PRICE],
+        )
+
+    def on_best(self, event: Event) -> None:
+        self.timestamp = event.timestamp
+
+        if event.partition == Partition.BEST_BID:
+            # Replace the best bid in the book
+            levels = self.bids
+        else:
+            # Replace the best ask in the book
+            levels = self.asks
+
+        levels.quote(
+            event.value[Order.PRICE],
+            event.value[Order.QUANTITY],
+            event.timestamp,
+        )
+
+        # Try to fill the pending orders that cross the new lob
+        self.try_fill_pending()
+
+    # If receive an order request from execution
+    def on_order(self, event: Event) -> None:
+        self.timestamp = event.timestamp
+
+        # Create the order object
+        order = Order(
+            event.topic,
+            event.value[Order.SIDE],
+            event.value[Order.QUANTITY],
+            event.value[Order.PRICE],
+        )
+        order.owner = event.value[Order.OWNER]
+        order.timestamp = self.timestamp
+
+        self.send(
+            Event(
+                order.instrument,
+                OrderStatus.NEW,
+                order.report(),
+                self.timestamp,
+            )
+        )
+
+        # try to fill the order
+        filled = self.try_fill_orders([order])
+        # if it was not possible to fill it completely
+        if len(filled) == 0:
+            # Add to pending orders list
+            self.add_order(order)
+
+    def add_order(self, order: Order) -> None:
+        self.orders[order.id] = order
+        self.pending[self.index_side(order)].add(order)
+
+    def remove_order(self, order: Order) -> None:
+        del self.orders[order.id]
+        self.pending[self.index_side(order)].remove(order)
+
+    def index_side(self, order: Order) -> str:
+        return OrderSide.BUY if order.side == OrderSide.BUY else OrderSide.SELL
+
+    # Pending orders that cross the best bid/ask, in placement (id) order
+    def crossing_orders(self) -> list[Order]:
+        orders = []
+
+        if self.asks.best() is not None:
+            orders += self.pending[OrderSide.BUY].crossing(self.asks.best().price)
+        if self.bids.best() is not None:
+            orders += self.pending[OrderSide.SELL].crossing(self.bids.best().price)
+
+        orders.sort(key=lambda order: order.id)
+        return orders
+
+    # Try to fill the pending orders under new lob with order price
+    def try_fill_pending(self) -> None:
+        filled = self.try_fill_orders(self.crossing_orders(), order_price=True)
+        # Remove if filled
+        for fill in filled:
+            self.remove_order(fill)
+
+    # Filling the pending orders when received a Candle event
     # If target price is inside low-high range, it fills in order price
     # Assuming that the order was placed already
     def try_match_range(self, low: float, high: float):
-        filled_orders = []
+        # Only the orders with price inside the range, in placement (id) order
+        filled_orders = self.pending[OrderSide.BUY].between(low, high)
+        filled_orders += self.pending[OrderSide.SELL].between(low, high)
+        filled_orders.sort(key=lambda order: order.id)
 
-        # Try all pending orders
-        for order in self.orders.values():
-            # If order price is inside the range
-            if order.price >= low and order.price <= high:
-                # Fill it fully, assuming infinite liquidity
-                order.executed = order.quantity
-                order.average = order.price
-                filled_orders.append(order)
+        for order in filled_orders:
+            # Fill it fully, assuming infinite liquidity
+            order.executed = order.quantity
+            order.average = order.price
 
         return filled_orders
 
@@ -190,16 +238,14 @@ class Book(Subscriber):
             # Buy Order
             if order.side == OrderSide.BUY:
                 book = self.asks
-            # Sell Order
-            elif order.side == OrderSide.SELL:
+            # Sell or short sell Order
+            else:
                 book = self.bids
 
-            # Book position
-            i = 0
-            # while there is a book and filled anything
-            while i < len(book):
-                # Try fill with i-th depth of the book
-                quantity, price = self.try_fill_order_offer(order, book[i], order_price)
+            # Walk the levels from the best price while anything is filled
+            for offer in book:
+                # Try fill with this depth of the book
+                quantity, price = self.try_fill_order_offer(order, offer, order_price)
                 if quantity > 0:
                     # filled partially a new order
                     order.status = OrderStatus.PARTIAL
@@ -207,17 +253,12 @@ class Book(Subscriber):
                         Event(
                             order.instrument,
                             Partition.PARTIAL,
-                            {
-                                **order.__dict__.copy(),
-                                **{Fill.QUANTITY: quantity, Fill.PRICE: price},
-                            },
+                            order.report(quantity, price),
                             self.timestamp,
                         )
                     )
                 elif quantity == 0:
-                    i = len(book)
-                # Next book line
-                i += 1
+                    break
 
             # If it filled any quantity in the order or mkt order
             if order.executed == order.quantity or order.price == 0:
@@ -227,7 +268,7 @@ class Book(Subscriber):
                     Event(
                         order.instrument,
                         OrderStatus.FILLED,
-                        order.__dict__.copy(),
+                        order.report(),
                         self.timestamp,
                     )
                 )
@@ -236,15 +277,15 @@ class Book(Subscriber):
         return filled_orders
 
     # Method to try to fill ONE order with one line of LOB
-    def try_fill_order_offer(self, order: Order, offer: Order, order_price: bool):
+    def try_fill_order_offer(self, order: Order, offer: Quote, order_price: bool):
         # Pending order quantity
         rem = order.quantity - order.executed
 
         if (
             # If buy order and the price is above ask
             (order.side == OrderSide.BUY and order.price >= offer.price)
-            # If sell order and the price is bellow bid
-            or (order.side == OrderSide.SELL and order.price <= offer.price)
+            # If sell (or short sell) order and the price is bellow bid
+            or (order.side != OrderSide.BUY and order.price <= offer.price)
             # If market order
             or (order.price == 0)
         ):
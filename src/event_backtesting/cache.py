@@ -0,0 +1,155 @@
+from event_backtesting.market_data import MarketData
+from event_backtesting.constants import partition_code, partition_name
+import numpy as np
+import json
+import os
+
+# Bump when the layout of the cached columns changes
+CACHE_VERSION = 1
+
+# Files of a cache directory
+KEY_FILE = "key.json"
+TIMESTAMP_FILE = "timestamp.npy"
+CODE_FILE = "code.npy"
+
+
+def cache_dir(file_name: str, loader: str) -> str:
+    """
+    Returns the hidden cache directory next to the source file, one per loader type.
+    """
+    folder, name = os.path.split(os.path.abspath(file_name))
+    return os.path.join(folder, ".{0}.{1}.cache".format(name, loader.lower()))
+
+
+def cache_key(file_name: str, loader: str) -> dict:
+    """
+    Builds the key that identifies the parsed content of a source file. Any change in the
+    path, size or modification time of the file invalidates the cache.
+    """
+    stat = os.stat(file_name)
+    return {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(file_name),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "loader": loader,
+    }
+
+
+def read_cache(instrument: str, file_name: str, loader: str) -> MarketData:
+    """
+    Memory-maps the cached columns of a source file.
+
+    Returns:
+        MarketData: The cached data, or None if there is no valid cache for the file.
+    """
+    folder = cache_dir(file_name, loader)
+
+    try:
+        with open(os.path.join(folder, KEY_FILE), "r") as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if meta["key"] != cache_key(file_name, loader):
+        return None
+
+    return read_columns(instrument, folder, meta)
+
+
+def read_columns(instrument: str, folder: str, meta: dict) -> MarketData:
+    """
+    Memory-maps the columns saved in a folder by write_columns.
+    """
+
+    def load(name):
+        return np.load(os.path.join(folder, name), mmap_mode="r")
+
+    return MarketData(
+        instrument,
+        [partition_code(name) for name in meta["partitions"]],
+        load(TIMESTAMP_FILE),
+        load(CODE_FILE),
+        {key: load(name) for key, name in meta["columns"].items()},
+    )
+
+
+def replace(file_name: str, write) -> None:
+    """
+    Writes a file through a temporary file in the same folder moved over it at once. A
+    file memory-mapped by an earlier read is never truncated: the mapping keeps the old
+    content and the next read maps the new one.
+
+    Parameters:
+        write (callable): Writes the content to the open binary file.
+    """
+    temporary = "{0}.{1}.tmp".format(file_name, os.getpid())
+    try:
+        with open(temporary, "wb") as file:
+            write(file)
+        os.replace(temporary, file_name)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def save(file_name: str, array: np.ndarray) -> None:
+    """
+    np.save through replace.
+    """
+    replace(file_name, lambda file: np.save(file, array))
+
+
+def write_columns(data: MarketData, folder: str) -> dict:
+    """
+    Saves the columns of the data as .npy files in a folder.
+
+    Returns:
+        dict: The partition names and the file of each column, needed to read them back.
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    save(os.path.join(folder, TIMESTAMP_FILE), data.timestamp)
+    save(os.path.join(folder, CODE_FILE), data.code)
+
+    columns = {}
+    for i, key in enumerate(data.columns):
+        columns[key] = "column{0}.npy".format(i)
+        save(os.path.join(folder, columns[key]), data.columns[key])
+
+    return {
+        "partitions": [partition_name(code) for code in data.partitions],
+        "columns": columns,
+    }
+
+
+def write_cache(data: MarketData, file_name: str, loader: str) -> bool:
+    """
+    Saves the columns of the parsed source file as .npy files in its cache directory.
+    Every file is replaced at once and the key is written last, so an interrupted write
+    is never read as valid and the columns mapped by an earlier read stay intact.
+
+    Returns:
+        bool: True if the cache was written.
+    """
+    folder = cache_dir(file_name, loader)
+    key = cache_key(file_name, loader)
+
+    try:
+        os.makedirs(folder, exist_ok=True)
+
+        # Invalidate the previous content before touching the columns
+        if os.path.exists(os.path.join(folder, KEY_FILE)):
+            os.remove(os.path.join(folder, KEY_FILE))
+
+        meta = write_columns(data, folder)
+
+        replace(
+            os.path.join(folder, KEY_FILE),
+            lambda file: file.write(json.dumps({"key": key, **meta}).encode()),
+        )
+    except OSError:
+        # Read-only folders just run without cache
+        return False
+
+    return True
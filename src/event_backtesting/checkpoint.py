@@ -0,0 +1,179 @@
+from event_processing.event import Event
+from event_processing.subscriber import Subscriber
+from event_backtesting.constants import *
+from event_backtesting.order import Order
+from event_backtesting.data_manager import DataManager
+import pickle
+import os
+
+# Bump when the layout of the snapshots changes
+CHECKPOINT_VERSION = 2
+
+
+class Checkpoint:
+    """
+    Replays the data of a DataManager into an Engine (or Dispatcher) one event at a time,
+    so the whole simulation can be saved between two events and resumed later: after a
+    crash, or with a new day appended to the data so only the new events are replayed.
+
+    A snapshot holds every subscriber of the engine as it is (Book quotes and pending
+    orders, Risk positions, open and closed trades and days, the strategies), the
+    subscriptions, the Order and Subscriber id counters, the LOAD specs of the
+    DataManager and the replay cursor. The loaded data is not saved, it is loaded again
+    on resume. The strategy classes must be importable to be loaded back.
+
+    Attributes:
+        engine (Engine): The engine of the simulation.
+        manager (DataManager): The loaded DataManager.
+        cursor (tuple): (timestamp, seen) of the last event processed: its timestamp and
+            the number of events processed at that timestamp. None before the first one.
+        count (int): Number of events processed by run().
+    """
+
+    def __init__(self, engine, manager: DataManager, cursor: tuple = None) -> None:
+        self.engine = engine
+        self.manager = manager
+        self.cursor = cursor
+        self.count = 0
+
+    @property
+    def subscribers(self) -> dict:
+        """
+        Every subscriber of the engine by id, in subscription order.
+        """
+        subscribers = {}
+        for callbacks in self.engine.subscriptions.values():
+            for id, callback in callbacks.items():
+                subscribers.setdefault(id, callback.__self__)
+        return subscribers
+
+    def run(self, every: int = None, file_name: str = None, limit: int = None) -> int:
+        """
+        Replays the events after the cursor, each one processed before the next.
+
+        Parameters:
+            every (int): Saves a snapshot in file_name every this many events.
+            file_name (str): Where the snapshots are saved, also at the end of the run.
+            limit (int): Stops after this many events, at the end of the data by default.
+
+        Returns:
+            int: Number of events processed.
+        """
+        count = 0
+        timestamp, seen = self.cursor if self.cursor is not None else (None, 0)
+
+        for event in self.manager.replay(self.cursor):
+            self.engine.inject(event)
+
+            if event.timestamp == timestamp:
+                seen += 1
+            else:
+                timestamp, seen = event.timestamp, 1
+            self.cursor = (timestamp, seen)
+
+            count += 1
+            if file_name is not None and every is not None and count % every == 0:
+                self.save(file_name)
+            if limit is not None and count == limit:
+                break
+
+        self.count += count
+        if file_name is not None:
+            self.save(file_name)
+
+        return count
+
+    def save(self, file_name: str) -> None:
+        """
+        Saves a snapshot of the simulation. The file is replaced at once, so a crash while
+        saving keeps the previous snapshot.
+        """
+        subscribers = self.subscribers
+        subscriptions = {}
+
+        # Partitions of each subscription of a Dispatcher, all of them otherwise
+        handlers = getattr(self.engine, "_handlers", {})
+        for topic, callbacks in self.engine.subscriptions.items():
+            subscriptions[topic] = []
+            for id in callbacks:
+                partitions = handlers.get(topic, {}).get(id)
+                subscriptions[topic].append(
+                    (id, None if partitions is None else list(partitions))
+                )
+
+        # The engine and the data are not saved
+        objects = list(subscribers.values())
+        if self.manager.id not in subscribers:
+            objects.append(self.manager)
+
+        detached = [(self.manager, "events", vars(self.manager).pop("events"))]
+        for subscriber in objects:
+            if "_send" in vars(subscriber):
+                detached.append((subscriber, "_send", vars(subscriber).pop("_send")))
+
+        try:
+            state = {
+                "version": CHECKPOINT_VERSION,
+                "engine": type(self.engine),
+                "subscribers": subscribers,
+                "subscriptions": subscriptions,
+                "manager": self.manager,
+                "cursor": self.cursor,
+                "order_id": Order._id,
+                "subscriber_id": Subscriber._id,
+            }
+
+            with open(file_name + ".tmp", "wb") as file:
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(file_name + ".tmp", file_name)
+
+        finally:
+            for subscriber, name, value in detached:
+                setattr(subscriber, name, value)
+
+    @staticmethod
+    def resume(file_name: str, specs: dict = None) -> "Checkpoint":
+        """
+        Loads a snapshot into a new engine and loads the data again.
+
+        Parameters:
+            file_name (str): The snapshot.
+            specs (dict): LOAD value to use instead of the saved one, e.g. the same files
+                with a new day appended. The instruments are the same as in the snapshot.
+
+        Returns:
+            Checkpoint: Ready to run() from the saved cursor.
+
+        Raises:
+            ValueError: If the file is a snapshot of another version.
+        """
+        with open(file_name, "rb") as file:
+            state = pickle.load(file)
+
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("{0} is not a compatible checkpoint.".format(file_name))
+
+        # New orders and subscribers never reuse an id of the snapshot
+        Order._id = max(Order._id, state["order_id"])
+        Subscriber._id = max(Subscriber._id, state["subscriber_id"])
+
+        engine = state["engine"]()
+        for topic, subscriptions in state["subscriptions"].items():
+            for id, partitions in subscriptions:
+                subscriber = state["subscribers"][id]
+                if partitions is None:
+                    engine.subscribe(subscriber, topic)
+                else:
+                    engine.subscribe(subscriber, topic, partitions)
+
+        # Straight to the DataManager, a LOAD through the engine would reset Risk
+        manager = state["manager"]
+        manager.receive(
+            Event(
+                Topic.SYSTEM,
+                Partition.LOAD,
+                specs if specs is not None else manager.specs,
+            )
+        )
+
+        return Checkpoint(engine, manager, state["cursor"])
@@ -22,62 +22,92 @@ class Topic:
     # [INSTRUMENT] = ... Every instrument is a topic
 
 
+# Partitions, order statuses, sides and data types are small ints, unique among all
+# of them: branch checks are int comparisons and the codes fit in int8 arrays.
+# Their names are only used at the I/O boundary, see partition_name/partition_code
+
+
 class OrderStatus:
     # Enum for status attribute
-    _status = [
-        "NEW",
-        "PARTIAL",
-        "FILLED",
-        "REJECTED",
-        "CANCELED",
-    ]
-
-    NEW, PARTIAL, FILLED, REJECTED, CANCELED = _status
+    NEW, PARTIAL, FILLED, REJECTED, CANCELED = range(0, 5)
 
 
 class OrderSide:
     # Enum for side attribute
-    _sides = [
-        "BUY",
-        "SELL",
-        "SELLSHORT",
-    ]
-
-    BUY, SELL, SELLSHORT = _sides
+    BUY, SELL, SELLSHORT = range(5, 8)
 
 
 class DataType:
-    _types = ["BID", "ASK", "NEG", "TRADE", "TICK", "HIST", "INTR"]
-    BID, ASK, NEG, TRADE, TICK, HIST, INTR = _types
+    BID, ASK, NEG, TRADE, TICK, HIST, INTR = range(8, 15)
 
 
 class DataSource:
-    BLOOMBERG, YAHOO, RAW = ["BLOOMBERG", "YAHOO", "RAW"]
+    BLOOMBERG, YAHOO, RAW, STORE = ["BLOOMBERG", "YAHOO", "RAW", "STORE"]
+
+
+class Executor:
+    # Worker pools for the parallel LOAD
+    PROCESS, THREAD = ["PROCESS", "THREAD"]
 
 
 class Data:
     SOURCE, TYPE, FILE = ["SOURCE", "TYPE", "FILE"]
 
+    # Optional row filters of an instrument:
+    # START (inclusive) and END (exclusive) datetimes, SESSION list of
+    # ("HH:MM:SS", "HH:MM:SS") time windows, PARTITIONS allow-list and
+    # SORTED file flag to stop reading after END
+    START, END, SESSION, PARTITIONS, SORTED = [
+        "START",
+        "END",
+        "SESSION",
+        "PARTITIONS",
+        "SORTED",
+    ]
+
 
 # Partitions:
 class SystemCommand:
-    LOAD, RUN = ["LOAD", "RUN"]
+    LOAD, RUN = range(15, 17)
 
 
 class Partition(SystemCommand, OrderStatus, OrderSide, DataType):
 
     # Order:
-    EXECUTE, CANCEL, ORDER = [
-        # From Risk to Execution
-        "EXECUTE",
-        "CANCEL",
-        # From Execution to Book
-        "ORDER",
-    ]
+    # From Risk to Execution: EXECUTE, CANCEL
+    # From Execution to Book: ORDER
+    EXECUTE, CANCEL, ORDER = range(17, 20)
+
+    BEST_BID, BEST_ASK, CANDLE = range(20, 23)
+
+    # Price bar (Candle keys) for Risk
+    PRICE = 23
+
+
+# Name of each code and code of each name
+_NAMES = {
+    value: key
+    for cls in Partition.__mro__
+    for key, value in vars(cls).items()
+    if not key.startswith("_") and isinstance(value, int)
+}
+_CODES = {value: key for key, value in _NAMES.items()}
+
+
+def partition_name(code: int) -> str:
+    """
+    Name of a partition, order status, side or data type code, e.g. "CANDLE". Names
+    and unknown codes are returned as they are.
+    """
+    return _NAMES.get(code, code)
 
-    BEST_BID, BEST_ASK, CANDLE = ["BEST_BID", "BEST_ASK", "CANDLE"]
 
-    PRICE = ["PRICE"]
+def partition_code(name) -> int:
+    """
+    Code of a partition, order status, side or data type name. Codes and unknown names
+    are returned as they are.
+    """
+    return _CODES.get(name, name)
 
 
 class Candle:
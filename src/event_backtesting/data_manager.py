@@ -2,127 +2,343 @@ from event_processing.subscriber import Subscriber
 from event_processing.event import Event
 from event_backtesting.constants import *
 from event_backtesting.order import Order
+from event_backtesting.market_data import (
+    MarketData,
+    columns_parser,
+    data_spec,
+    read_rows,
+    row_filter,
+    RowFilter,
+    to_timestamp,
+    CHUNK_SIZE,
+)
+from event_backtesting.cache import read_cache, write_cache
+from event_backtesting.store import TickStore
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat, dropwhile, islice
+from bisect import bisect_left
 from datetime import datetime
-
-# from market_data import MarketData
+import numpy as np
+import heapq
 
 
 class DataManager(Subscriber):
-    def __init__(self):
+    def __init__(
+        self,
+        columnar: bool = False,
+        cache: bool = False,
+        streaming: bool = False,
+        chunk_size: int = CHUNK_SIZE,
+        workers: int = 1,
+        executor: str = Executor.PROCESS,
+    ):
         self.events: dict = {}
 
+        # Data spec of each instrument of the last LOAD
+        self.specs: dict = {}
+
+        # Keep the parsed columns next to the source files and memory-map them
+        # on the next LOAD. The cache only exists for columnar data
+        self.cache: bool = cache
+
+        # Parse the files into typed NumPy columns and build the events only on RUN
+        self.columnar: bool = columnar or cache
+
+        # Do not read anything on LOAD, read the files chunk by chunk on RUN.
+        # Peak memory does not depend on the file size, but each file must be
+        # sorted by time (the cache is not used)
+        self.streaming: bool = streaming
+
+        # Number of characters read from the files at once
+        self.chunk_size: int = chunk_size
+
+        # Load the instruments in parallel, in a pool of processes (parsing is
+        # CPU bound) or of threads (I/O bound, e.g. memory-mapped cache and store)
+        self.workers: int = workers
+        self.executor: str = executor
+
+        # Handler of each SYSTEM command
+        self.handlers: dict = {
+            Partition.LOAD: self.on_load,
+            Partition.RUN: self.on_run,
+        }
+
     def receive(self, event: Event):
-        if event.topic == Topic.SYSTEM and event.partition == Partition.LOAD:
-            # Reset the data
-            self.events: dict = {}
-
-            events = []
-            for instrument in event.value:
-
-                if event.value[instrument][Data.SOURCE] == DataSource.BLOOMBERG:
-                    if event.value[instrument][Data.TYPE] == DataType.TICK:
-                        data = self.load_bloomberg_tick(
-                            instrument, event.value[instrument][Data.FILE]
-                        )
-                    elif event.value[instrument][Data.TYPE] == DataType.INTR:
-                        data = self.load_bloomberg_intr(
-                            instrument, event.value[instrument][Data.FILE]
-                        )
-                elif event.value[instrument][Data.SOURCE] == DataSource.YAHOO:
-                    if event.value[instrument][Data.TYPE] == DataType.HIST:
-                        data = self.load_yahoo_hist(
-                            instrument, event.value[instrument][Data.FILE]
-                        )
-
-                events += data
-
-            for event in events:
-                if event.timestamp.toordinal() not in self.events:
-                    self.events[event.timestamp.toordinal()] = []
-
-                self.events[event.timestamp.toordinal()].append(event)
-
-        if event.topic == Topic.SYSTEM and event.partition == Partition.RUN:
-            # Start simulation
-
-            dates = list(self.events.keys())
-            dates.sort()
-            for date in dates:
-                for event in self.events[date]:
-                    self.send(event)
+        if event.topic == Topic.SYSTEM:
+            handler = self.handlers.get(event.partition)
+            if handler is not None:
+                handler(event)
 
-    # Specific methods for different data sources
+    def on_load(self, event: Event):
+        # Reset the data: one time-sorted stream per instrument, in LOAD order
+        self.events: dict = {}
+        self.specs = {
+            instrument: data_spec(spec) for instrument, spec in event.value.items()
+        }
+
+        instruments = list(self.specs.keys())
+        specs = list(self.specs.values())
+
+        if self.streaming:
+            # Only keep the data sources, they are read on RUN
+            data = specs
+
+        elif self.workers > 1 and self.executor == Executor.THREAD:
+            with ThreadPoolExecutor(self.workers) as pool:
+                data = list(pool.map(self.load, instruments, specs))
+
+        elif self.workers > 1 and self.executor == Executor.PROCESS:
+            # Each process loads with its own DataManager and sends back the result
+            with ProcessPoolExecutor(self.workers) as pool:
+                data = list(
+                    pool.map(
+                        load_instrument,
+                        instruments,
+                        specs,
+                        repeat(self.columnar),
+                        repeat(self.cache),
+                        repeat(self.chunk_size),
+                    )
+                )
 
-    def load_bloomberg_tick(self, instrument, file_name):
+        else:
+            data = [self.load(i, spec) for i, spec in zip(instruments, specs)]
+
+        # map keeps the LOAD order, so the replay is the same as the serial one
+        self.events = dict(zip(instruments, data))
+
+    # Start simulation. RUN is handled inside Engine.consume, where send only
+    # queues the event, so the engine is drained after each one: every event
+    # is processed, with the orders and reports it triggers, before the next
+    # one is read. Only the heads of the streams are in memory and the orders
+    # are handled at their timestamp
+    def on_run(self, event: Event):
+        engine = getattr(self._send, "__self__", None)
+
+        for event in self.replay():
+            self.send(event)
+
+            if engine is not None and engine.lock:
+                engine.consume()
+                # Still inside the consume of RUN
+                engine.lock = True
+
+    # Time-sorted data of one instrument
+    def load(self, instrument: str, spec: dict):
+        spec = data_spec(spec)
+
+        if self.columnar:
+            return self.load_columns(instrument, spec).sort()
+
+        data = list(self.stream(instrument, spec))
+
+        # Stable sort, rows with the same timestamp keep the file order
+        data.sort(key=lambda event: event.timestamp)
+
+        return data
+
+    # Merge the instrument streams in timestamp order. Only the head of each
+    # stream is kept in the heap. Ties are broken by the LOAD order of the
+    # instruments, then by the file order inside each instrument.
+    # A cursor (timestamp, seen) resumes the replay after the seen-th event
+    # at timestamp, see checkpoint.py
+    def replay(self, cursor: tuple = None):
+        start = None if cursor is None else cursor[0]
+
+        streams = []
+        for instrument, data in self.events.items():
+            if self.streaming:
+                stream = self.stream(instrument, data)
+                if start is not None:
+                    stream = dropwhile(lambda event: event.timestamp < start, stream)
+                streams.append(stream)
+            elif self.columnar:
+                # Events are built lazily from the columns
+                index = None
+                if start is not None:
+                    first = np.searchsorted(data.timestamp, to_timestamp(start))
+                    index = np.arange(first, len(data))
+                streams.append(data.events(index))
+            else:
+                first = 0
+                if start is not None:
+                    first = bisect_left(data, start, key=lambda event: event.timestamp)
+                streams.append(islice(data, first, None))
+
+        events = heapq.merge(*streams, key=lambda event: event.timestamp)
+
+        # Every event left is at or after start, skip the ones already seen
+        if cursor is not None:
+            events = islice(events, cursor[1], None)
 
-        events = []
+        return events
 
-        with open(file_name, "r") as file:
+    # Generator of the events of any supported data source, read in chunks
+    def stream(self, instrument: str, spec: dict):
+        spec = data_spec(spec)
+
+        if self.columnar or spec[Data.SOURCE] == DataSource.STORE:
+            for data in self.stream_columns(instrument, spec):
+                yield from data.events()
+            return
+
+        # Files are sorted when streaming, so reading stops after Data.END
+        filters = row_filter(spec, self.streaming)
+        file_name = spec[Data.FILE]
+
+        if spec[Data.SOURCE] == DataSource.BLOOMBERG:
+            if spec[Data.TYPE] == DataType.TICK:
+                yield from self.stream_bloomberg_tick(instrument, file_name, filters)
+            elif spec[Data.TYPE] == DataType.INTR:
+                yield from self.stream_bloomberg_intr(instrument, file_name, filters)
+        elif spec[Data.SOURCE] == DataSource.YAHOO:
+            if spec[Data.TYPE] == DataType.HIST:
+                yield from self.stream_yahoo_hist(instrument, file_name, filters)
+
+    # Columnar loading of any supported data source
+    def load_columns(self, instrument: str, spec: dict) -> MarketData:
+        spec = data_spec(spec)
+
+        filters = row_filter(spec, self.streaming)
+
+        # The store is already binary, only the requested range is mapped
+        if spec[Data.SOURCE] == DataSource.STORE:
+            data = TickStore(spec[Data.FILE]).read(
+                instrument, spec.get(Data.START), spec.get(Data.END)
+            )
+            return data if filters is None else filters.apply(data)
+
+        loader = "{0}_{1}".format(spec[Data.SOURCE], partition_name(spec[Data.TYPE]))
+        parse = columns_parser(spec[Data.SOURCE], spec[Data.TYPE])
+
+        # The cache always holds the whole file, filtered after reading
+        if self.cache:
+            data = read_cache(instrument, spec[Data.FILE], loader)
+            if data is None:
+                with open(spec[Data.FILE], "r") as file:
+                    data = file.read()
+
+                # Skip first row (header row)
+                data = parse(instrument, data.split("\n")[1:])
+                write_cache(data, spec[Data.FILE], loader)
+
+            return data if filters is None else filters.apply(data)
+
+        # Sorted file with an end: stop reading at the first chunk past the end
+        if filters is not None and filters.sorted and filters.end is not None:
+            parts = list(self.stream_columns(instrument, spec))
+            if len(parts) == 0:
+                return parse(instrument, [])
+            return MarketData.concat(instrument, parts)
+
+        with open(spec[Data.FILE], "r") as file:
             data = file.read()
 
-        # Break in lines
-        rows = data.split("\n")
-
         # Skip first row (header row)
-        rows = rows[1:]
+        return parse(instrument, data.split("\n")[1:], filters)
 
-        for row in rows:
+    # Columnar batches of chunk_size characters of any supported data source
+    def stream_columns(self, instrument: str, spec: dict):
 
-            # Split the columns with ;
-            cols = row.split(CSV_SEPARATOR)
+        # The store is memory-mapped, pages are read as the events are built
+        if spec[Data.SOURCE] == DataSource.STORE:
+            yield self.load_columns(instrument, spec)
+            return
 
-            # It should be date, action, value, volume
-            if len(cols) == 4:
+        parse = columns_parser(spec[Data.SOURCE], spec[Data.TYPE])
+        filters = row_filter(spec, self.streaming)
 
-                timestamp = datetime.strptime(cols[0], DATETIME_FORMAT)
-                # Brazilian decimal format
-                price = float(cols[2].replace(",", "."))
-                quantity = int(cols[3])
-                partition = cols[1]
+        for rows in read_rows(spec[Data.FILE], self.chunk_size):
+            data = parse(instrument, rows, filters)
+            if len(data) > 0:
+                yield data
 
-                if partition == Partition.BID:
-                    partition = Partition.BEST_BID
-                elif partition == Partition.ASK:
-                    partition = Partition.BEST_ASK
+            # Sorted file: nothing else to read after the end
+            if filters is not None and filters.sorted and filters.past_rows(rows):
+                return
 
-                events.append(
-                    Event(
-                        topic=instrument,
-                        partition=partition,
-                        value={Order.QUANTITY: quantity, Order.PRICE: price},
-                        timestamp=timestamp,
-                    )
-                )
+    # Specific methods for different data sources
+    # The load_* methods read the whole file, the stream_* generators read it
+    # in chunks of chunk_size characters and yield the events as they go
 
-        return events
+    def load_bloomberg_tick(self, instrument, file_name):
+        return list(self.stream_bloomberg_tick(instrument, file_name))
 
     def load_yahoo_hist(self, instrument, file_name):
+        return list(self.stream_yahoo_hist(instrument, file_name))
 
-        events = []
+    def load_bloomberg_intr(self, instrument, file_name):
+        return list(self.stream_bloomberg_intr(instrument, file_name))
 
-        with open(file_name, "r") as file:
-            data = file.read()
+    def stream_bloomberg_tick(self, instrument, file_name, filters: RowFilter = None):
 
-        # Break in lines
-        rows = data.split("\n")
+        for rows in read_rows(file_name, self.chunk_size):
+            for row in rows:
 
-        # Skip first row (header row)
-        rows = rows[1:]
+                # Split the columns with ;
+                cols = row.split(CSV_SEPARATOR)
+
+                # It should be date, action, value, volume
+                if len(cols) == 4:
 
-        for row in rows:
-            cols = row.split(",")  # It is fixed for yahoo
-            # Sometimes the row is null
-            if len(cols) == 7 and cols[1] != "null":
+                    partition = partition_code(cols[1])
 
-                date = datetime.strptime(cols[0], "%Y-%m-%d")  # It is fixed for yahoo
-                price = (float(cols[1]), float(cols[2]), float(cols[3]), float(cols[5]))
-                quantity = int(cols[6])
+                    # Top of book rows, they replace the best quotes
+                    if partition == Partition.BID:
+                        partition = Partition.BEST_BID
+                    elif partition == Partition.ASK:
+                        partition = Partition.BEST_ASK
 
-                # TODO: fix Open, High, Low as Adjusted Close
-                # TODO: arg adjusted to choose from adjusted o dividend event
+                    # Filter on the raw text, before any parsing
+                    if filters is not None:
+                        key = filters.row_key(cols[0])
+                        if filters.sorted and filters.past(key):
+                            return
+                        if not filters.accept(key, partition):
+                            continue
 
-                events.append(
-                    Event(
+                    timestamp = datetime.strptime(cols[0], DATETIME_FORMAT)
+                    # Brazilian decimal format
+                    price = float(cols[2].replace(",", "."))
+                    quantity = int(cols[3])
+
+                    yield Event(
+                        topic=instrument,
+                        partition=partition,
+                        value={Order.QUANTITY: quantity, Order.PRICE: price},
+                        timestamp=timestamp,
+                    )
+
+    def stream_yahoo_hist(self, instrument, file_name, filters: RowFilter = None):
+
+        for rows in read_rows(file_name, self.chunk_size):
+            for row in rows:
+                cols = row.split(",")  # It is fixed for yahoo
+                # Sometimes the row is null
+                if len(cols) == 7 and cols[1] != "null":
+
+                    # Filter on the raw text, before any parsing
+                    if filters is not None:
+                        key = filters.row_key(cols[0])
+                        if filters.sorted and filters.past(key):
+                            return
+                        if not filters.accept(key, Partition.CANDLE):
+                            continue
+
+                    # It is fixed for yahoo
+                    date = datetime.strptime(cols[0], "%Y-%m-%d")
+                    price = (
+                        float(cols[1]),
+                        float(cols[2]),
+                        float(cols[3]),
+                        float(cols[5]),
+                    )
+                    quantity = int(cols[6])
+
+                    # TODO: fix Open, High, Low as Adjusted Close
+                    # TODO: arg adjusted to choose from adjusted o dividend event
+
+                    yield Event(
                         topic=instrument,
                         partition=Partition.CANDLE,
                         value={
@@ -134,39 +350,33 @@ class DataManager(Subscriber):
                         },
                         timestamp=date,
                     )
-                )
 
-        return events
-
-    def load_bloomberg_intr(self, instrument, file_name):
+    def stream_bloomberg_intr(self, instrument, file_name, filters: RowFilter = None):
 
-        events = []
+        for rows in read_rows(file_name, self.chunk_size):
+            for row in rows:
+                cols = row.split(CSV_SEPARATOR)
 
-        with open(file_name, "r") as file:
-            data = file.read()
-
-        # Break in lines
-        rows = data.split("\n")
-
-        # Skip first row (header row)
-        rows = rows[1:]
+                if len(cols) == 5:
 
-        for row in rows:
-            cols = row.split(CSV_SEPARATOR)
+                    # Filter on the raw text, before any parsing
+                    if filters is not None:
+                        key = filters.row_key(cols[0])
+                        if filters.sorted and filters.past(key):
+                            return
+                        if not filters.accept(key, Partition.CANDLE):
+                            continue
 
-            if len(cols) == 5:
-
-                date = datetime.strptime(cols[0], DATETIME_FORMAT)
-                price = (
-                    float(cols[1].replace(",", ".")),
-                    float(cols[3].replace(",", ".")),
-                    float(cols[4].replace(",", ".")),
-                    float(cols[2].replace(",", ".")),
-                )
-                quantity = 0
+                    date = datetime.strptime(cols[0], DATETIME_FORMAT)
+                    price = (
+                        float(cols[1].replace(",", ".")),
+                        float(cols[3].replace(",", ".")),
+                        float(cols[4].replace(",", ".")),
+                        float(cols[2].replace(",", ".")),
+                    )
+                    quantity = 0
 
-                events.append(
-                    Event(
+                    yield Event(
                         topic=instrument,
                         partition=Partition.CANDLE,
                         value={
@@ -178,6 +388,11 @@ class DataManager(Subscriber):
                         },
                         timestamp=date,
                     )
-                )
 
-        return events
+
+# Loads one instrument in a worker process
+def load_instrument(
+    instrument: str, spec: dict, columnar: bool, cache: bool, chunk_size: int
+):
+    dm = DataManager(columnar=columnar, cache=cache, chunk_size=chunk_size)
+    return dm.load(instrument, spec)
@@ -0,0 +1,127 @@
+from event_processing.engine import Engine
+from event_processing.event import Event
+
+
+class Dispatcher(Engine):
+    """
+    Engine that routes each event straight to the handlers of its (topic, partition) with
+    one dict lookup, instead of calling the receive of every subscriber of the topic.
+
+    A subscriber with a handlers dict (partition -> method), like the Book, Risk,
+    Execution and the DataManager, only gets the partitions it handles. Any other
+    subscriber gets every event of the topic in receive, as with the Engine. The handlers
+    of an event are called in subscription order and never with the events of their own
+    subscriber, as with the Engine.
+
+    Attributes:
+        routes (dict): (topic, partition) -> list of (subscriber id, handler).
+        wildcards (dict): topic -> list of (subscriber id, receive) of the subscribers of
+            every partition, the route of the partitions without handlers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.routes: dict = {}
+        self.wildcards: dict = {}
+
+        # topic -> {subscriber id: {partition: handler} or None for every partition}
+        self._handlers: dict = {}
+
+    def subscribe(self, subscriber, topic, partitions: list = None):
+        """
+        Subscribes to a topic, to all the partitions of the subscriber handlers or to the
+        given partitions.
+
+        Parameters:
+            subscriber (Subscriber): The subscriber.
+            topic (str): The topic.
+            partitions (list): Only these partitions. A subscriber without handlers
+                gets them in receive.
+        """
+        super().subscribe(subscriber, topic)
+
+        handlers = getattr(subscriber, "handlers", None)
+        if handlers is None and partitions is not None:
+            handlers = {partition: subscriber.receive for partition in partitions}
+        elif handlers is not None and partitions is not None:
+            handlers = {
+                partition: handlers[partition]
+                for partition in partitions
+                if partition in handlers
+            }
+        elif handlers is not None:
+            handlers = dict(handlers)
+
+        self._handlers.setdefault(topic, {})[subscriber.id] = handlers
+        self.build(topic)
+
+    def route(self, subscriber, topic, partition, handler) -> None:
+        """
+        Adds one handler of a subscriber for a (topic, partition).
+        """
+        if subscriber.id not in self._handlers.get(topic, {}):
+            super().subscribe(subscriber, topic)
+            self._handlers.setdefault(topic, {})[subscriber.id] = {}
+
+        handlers = self._handlers[topic][subscriber.id]
+        if handlers is not None:
+            handlers[partition] = handler
+            self.build(topic)
+
+    def unsubscribe(self, subscriber_id, topic):
+        super().unsubscribe(subscriber_id, topic)
+
+        if subscriber_id in self._handlers.get(topic, {}):
+            del self._handlers[topic][subscriber_id]
+            self.build(topic)
+
+    def build(self, topic) -> None:
+        """
+        Rebuilds the routes of a topic after a subscription change.
+        """
+        subscribers = self._handlers[topic]
+        receive = self.subscriptions[topic]
+
+        for key in [key for key in self.routes if key[0] == topic]:
+            del self.routes[key]
+
+        self.wildcards[topic] = [
+            (id, receive[id])
+            for id, handlers in subscribers.items()
+            if handlers is None
+        ]
+
+        partitions = []
+        for handlers in subscribers.values():
+            for partition in handlers or {}:
+                if partition not in partitions:
+                    partitions.append(partition)
+
+        for partition in partitions:
+            self.routes[(topic, partition)] = [
+                (id, receive[id] if handlers is None else handlers[partition])
+                for id, handlers in subscribers.items()
+                if handlers is None or partition in handlers
+            ]
+
+    def consume(self):
+        self.lock = True
+
+        routes = self.routes
+        wildcards = self.wildcards
+
+        while not self.events.empty():
+
+            event: Event = self.events.get()
+
+            # The handlers of the partition or the subscribers of every partition
+            handlers = routes.get((event.topic, event.partition))
+            if handlers is None:
+                handlers = wildcards.get(event.topic, ())
+
+            for id, handler in handlers:
+                # Do not send event to itself
+                if event.sender != id:
+                    handler(event)
+
+        self.lock = False
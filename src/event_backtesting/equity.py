@@ -0,0 +1,108 @@
+from datetime import date
+import numpy as np
+
+# Initial number of days of the preallocated arrays
+CAPACITY = 256
+
+
+class EquityCurve:
+    """
+    Mark-to-market equity of one strategy. The current equity, its peak and the drawdown are
+    updated in O(1) on every mark, and each day is closed into preallocated arrays (doubled
+    when full) with its last equity and its carry.
+
+    Attributes:
+        equity (float): Current equity.
+        peak (float): Highest equity so far.
+        max_drawdown (float): Lowest equity - peak so far (0 or negative).
+        carry (float): Sum of the carry of the closed days.
+    """
+
+    def __init__(self, capital: float, capacity: int = CAPACITY) -> None:
+        self.equity = capital
+        self.peak = capital
+        self.max_drawdown = 0.0
+        self.carry = 0.0
+
+        # Closed days
+        self._date = np.empty(capacity, dtype="datetime64[D]")
+        self._equity = np.empty(capacity, dtype=np.float64)
+        self._drawdown = np.empty(capacity, dtype=np.float64)
+        self._carry = np.empty(capacity, dtype=np.float64)
+        self._exposed = np.empty(capacity, dtype=np.bool_)
+        self._days = 0
+
+    def __len__(self) -> int:
+        return self._days
+
+    def __repr__(self) -> str:
+        return "{0} days, equity ${1:.2f}, drawdown ${2:.2f}".format(
+            self._days, self.equity, self.drawdown
+        )
+
+    @property
+    def drawdown(self) -> float:
+        """
+        Current equity - peak (0 or negative).
+        """
+        return self.equity - self.peak
+
+    def update(self, equity: float) -> None:
+        self.equity = equity
+        if equity > self.peak:
+            self.peak = equity
+        elif equity - self.peak < self.max_drawdown:
+            self.max_drawdown = equity - self.peak
+
+    def close_day(self, day: date, carry: float, exposed: bool = False) -> None:
+        """
+        Saves the current equity as the close of a day. Closing the last day again
+        replaces it.
+
+        Parameters:
+            day (date): The day.
+            carry (float): Carry of the day.
+            exposed (bool): If there was an open position at the close of the day.
+        """
+        day = np.datetime64(day, "D")
+
+        if self._days > 0 and self._date[self._days - 1] == day:
+            self._days -= 1
+            self.carry -= self._carry[self._days]
+
+        if self._days == len(self._date):
+            for name in ["_date", "_equity", "_drawdown", "_carry", "_exposed"]:
+                column = getattr(self, name)
+                grown = np.empty(2 * len(column), dtype=column.dtype)
+                grown[: self._days] = column[: self._days]
+                setattr(self, name, grown)
+
+        self._date[self._days] = day
+        self._equity[self._days] = self.equity
+        self._drawdown[self._days] = self.drawdown
+        self._carry[self._days] = carry
+        self._exposed[self._days] = exposed
+        self._days += 1
+        self.carry += carry
+
+    # Views of the closed days
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._date[: self._days]
+
+    @property
+    def equities(self) -> np.ndarray:
+        return self._equity[: self._days]
+
+    @property
+    def drawdowns(self) -> np.ndarray:
+        return self._drawdown[: self._days]
+
+    @property
+    def carries(self) -> np.ndarray:
+        return self._carry[: self._days]
+
+    @property
+    def exposed(self) -> np.ndarray:
+        return self._exposed[: self._days]
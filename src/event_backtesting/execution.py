@@ -8,12 +8,23 @@ class Execution(Subscriber):
     Execution class is responsible for executing orders.
     This is where you can create new synthetic orders, modify or cancel orders.
 
+    Attributes
+    ----------
+    handlers : dict
+        Handler of each partition.
+
     Methods
     -------
     receive(event)
         Receives an event and processes it.
     """
 
+    def __init__(self) -> None:
+        self.handlers: dict = {
+            Partition.EXECUTE: self.on_execute,
+            Partition.CANCEL: self.on_cancel,
+        }
+
     def receive(self, event: Event) -> None:
         """
         Receives an EXECUTE event and processes it.
@@ -26,18 +37,23 @@ class Execution(Subscriber):
         Returns
         -------
         """
-        if event.partition == Partition.EXECUTE:
+        handler = self.handlers.get(event.partition)
+        if handler is not None:
+            handler(event)
+
+    def on_execute(self, event: Event) -> None:
+        # BYPASSING: you can create new syntethic orders here
 
-            # BYPASSING: you can create new syntethic orders here
+        # TODO: Modify/Cancel Order
 
-            # TODO: Modify/Cancel Order
+        order = Event(
+            event.topic,
+            Partition.ORDER,
+            event.value,
+            event.timestamp,
+        )
 
-            order = event(
-                event.topic,
-                Partition.ORDER,
-                {event.__dict__.copy()},
-            )
+        self.send(order)
 
-            self.send(order)
-        elif event.partition == Partition.CANCEL:
-            pass
+    def on_cancel(self, event: Event) -> None:
+        pass
@@ -0,0 +1,202 @@
+from event_processing.event import Event
+from event_backtesting.constants import *
+from datetime import datetime
+import asyncio
+import json
+
+# Events waiting between the source and the engine
+QUEUE_SIZE = 4096
+
+# Events read at once from a blocking source in the worker thread
+BATCH_SIZE = 1024
+
+
+class Feed:
+    """
+    Feeds an Engine (or Dispatcher) from an asyncio source, e.g. a paced replay of the
+    DataManager for paper trading or a socket standing in for a live feed.
+
+    The source and the engine are two tasks joined by a bounded queue: when the pipeline
+    is slower than the source the queue fills up and the source waits, so nothing is
+    buffered without bound. Events are injected one at a time, in source order, and the
+    engine processes each one (and everything it triggers) before the next.
+
+    Attributes:
+        engine (Engine): Where the events are injected.
+        maxsize (int): Capacity of the queue.
+        speed (float): Pace of the replay, the time between the events divided by speed
+            (1 for real time, 60 for a minute per second). None injects as fast as the
+            engine consumes.
+    """
+
+    def __init__(self, engine, maxsize: int = QUEUE_SIZE, speed: float = None) -> None:
+        self.engine = engine
+        self.maxsize = maxsize
+        self.speed = speed
+
+    async def run(self, source) -> int:
+        """
+        Injects every event of the source into the engine. A blocking iterable, like
+        DataManager.replay(), is read in a worker thread (see threaded).
+
+        Returns:
+            int: Number of events injected.
+        """
+        if not hasattr(source, "__aiter__"):
+            source = threaded(source)
+
+        queue = asyncio.Queue(self.maxsize)
+        producer = asyncio.ensure_future(self.produce(source, queue))
+        consumer = asyncio.ensure_future(self.consume(queue))
+
+        try:
+            # Both finish, unless one of them fails first
+            done, _ = await asyncio.wait(
+                [producer, consumer], return_when=asyncio.FIRST_EXCEPTION
+            )
+            for task in done:
+                task.result()
+        finally:
+            producer.cancel()
+            consumer.cancel()
+
+        return consumer.result()
+
+    async def produce(self, source, queue: asyncio.Queue) -> None:
+        async for event in source:
+            # Waits while the queue is full
+            await queue.put(event)
+
+        # End of the source
+        await queue.put(None)
+
+    async def consume(self, queue: asyncio.Queue) -> int:
+        loop = asyncio.get_running_loop()
+        count = 0
+        first = None
+
+        while True:
+            event = await queue.get()
+            if event is None:
+                return count
+
+            if self.speed is not None and event.timestamp is not None:
+                if first is None:
+                    first, start = event.timestamp, loop.time()
+
+                # Wall time of the event at speed times the event time
+                delay = (event.timestamp - first).total_seconds() / self.speed
+                delay -= loop.time() - start
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            self.engine.inject(event)
+            count += 1
+
+            # Let the source refill the queue from time to time
+            if count % BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+
+
+def take(iterator, size: int) -> list:
+    """
+    Next size items of an iterator, fewer at the end.
+    """
+    items = []
+    for item in iterator:
+        items.append(item)
+        if len(items) == size:
+            break
+    return items
+
+
+async def threaded(iterable, batch: int = BATCH_SIZE):
+    """
+    Async iterator over a blocking iterable, e.g. DataManager.replay(). The items are read
+    batch by batch in a worker thread, and the next batch is read while the current one is
+    processed, so reading files overlaps the backtest.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+
+    pending = loop.run_in_executor(None, take, iterator, batch)
+    while True:
+        items = await pending
+        if len(items) == 0:
+            return
+
+        # Read ahead
+        pending = loop.run_in_executor(None, take, iterator, batch)
+        for item in items:
+            yield item
+
+
+def encode(event: Event) -> bytes:
+    """
+    One event as a JSON line, with the partition name and the ISO 8601 timestamp.
+    """
+    return (
+        json.dumps(
+            {
+                "topic": event.topic,
+                "partition": partition_name(event.partition),
+                "timestamp": (
+                    event.timestamp.isoformat() if event.timestamp is not None else None
+                ),
+                "value": event.value,
+            }
+        ).encode()
+        + b"\n"
+    )
+
+
+def decode(line: bytes) -> Event:
+    """
+    The event of a JSON line written by encode().
+    """
+    data = json.loads(line)
+    timestamp = data.get("timestamp")
+    return Event(
+        data["topic"],
+        partition_code(data["partition"]),
+        data.get("value"),
+        datetime.fromisoformat(timestamp) if timestamp is not None else None,
+    )
+
+
+async def connect(host: str, port: int):
+    """
+    Async iterator over the events of a JSON lines socket, until it is closed.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if len(line) == 0:
+                return
+            if line.strip():
+                yield decode(line)
+    finally:
+        writer.close()
+
+
+async def serve(events, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+    """
+    Local stand-in of a live feed: sends the events (any iterable) as JSON lines to each
+    client and closes the connection. A slow client slows the sender down.
+
+    Returns:
+        asyncio.Server: The started server, its port is server.sockets[0].getsockname()[1].
+    """
+
+    async def send(reader, writer):
+        try:
+            for i, event in enumerate(events):
+                writer.write(encode(event))
+                if i % BATCH_SIZE == 0:
+                    await writer.drain()
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(send, host, port)
@@ -0,0 +1,92 @@
+from event_backtesting.constants import *
+from datetime import datetime, timedelta
+import numpy as np
+
+# Rows of each preallocated chunk
+CHUNK = 4096
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# One bar: int64 timestamp in microseconds and the OHLC prices
+BAR = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        (Candle.OPEN, "<f8"),
+        (Candle.HIGH, "<f8"),
+        (Candle.LOW, "<f8"),
+        (Candle.CLOSE, "<f8"),
+    ]
+)
+
+
+class PriceHistory:
+    """
+    Price bars of one instrument kept in preallocated NumPy chunks. Appending never copies
+    the previous bars: a new chunk is allocated when the last one is full. The last bar is a
+    record view of the current chunk, read as last[Candle.CLOSE].
+
+    Attributes:
+        chunk (int): Rows of each chunk.
+    """
+
+    def __init__(self, chunk: int = CHUNK) -> None:
+        self.chunk = chunk
+
+        # Full chunks and the chunk being filled, with the number of rows of the
+        # full chunks and of the last one
+        self._chunks: list[np.ndarray] = []
+        self._full = 0
+        self._rows = 0
+
+        # View of the last bar, None before the first one
+        self.last: np.void = None
+
+    def __len__(self) -> int:
+        return self._full + self._rows
+
+    def __repr__(self) -> str:
+        return "{0} bars".format(len(self))
+
+    def append(
+        self, timestamp: datetime, open: float, high: float, low: float, close: float
+    ) -> None:
+        if len(self._chunks) == 0 or self._rows == len(self._chunks[-1]):
+            self._full += self._rows
+            self._chunks.append(np.empty(self.chunk, dtype=BAR))
+            self._rows = 0
+
+        self.last = self._chunks[-1][self._rows]
+        self.last["timestamp"] = (timestamp - EPOCH) // MICROSECOND
+        self.last[Candle.OPEN] = open
+        self.last[Candle.HIGH] = high
+        self.last[Candle.LOW] = low
+        self.last[Candle.CLOSE] = close
+        self._rows += 1
+
+    def bars(self) -> np.ndarray:
+        """
+        All the bars as one structured array. The chunks are merged into a single one, so
+        the next call is a view.
+        """
+        if len(self._chunks) == 0:
+            return np.empty(0, dtype=BAR)
+
+        if len(self._chunks) > 1:
+            rows = len(self)
+            merged = np.concatenate(self._chunks)
+
+            # Keep the room left in the last chunk, the next chunks are still
+            # chunk rows long
+            self._chunks = [merged]
+            self._full = 0
+            self._rows = rows
+            self.last = merged[rows - 1]
+
+        return self._chunks[0][: self._rows]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        One column of all the bars (timestamp, Candle.OPEN, HIGH, LOW or CLOSE).
+        """
+        return self.bars()[name]
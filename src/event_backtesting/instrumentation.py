@@ -0,0 +1,261 @@
+from event_processing.engine import Engine
+from event_processing.event import Event
+from event_backtesting.constants import partition_name
+from time import perf_counter_ns
+import json
+
+# Latency buckets: bucket b holds the latencies in [2^(b-1), 2^b) nanoseconds
+BUCKETS = 64
+
+
+class Histogram:
+    """
+    Latencies of one handler in power of two buckets of nanoseconds, with the count, sum
+    and maximum. Percentiles are the upper bound of their bucket.
+
+    Attributes:
+        count (int): Number of calls.
+        total (int): Sum of the latencies in nanoseconds.
+        max (int): Largest latency in nanoseconds.
+        buckets (list[int]): Number of calls in each bucket.
+    """
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * BUCKETS
+
+    def __repr__(self) -> str:
+        return "{0} calls, mean {1:.0f} ns, max {2} ns".format(
+            self.count, self.mean, self.max
+        )
+
+    def add(self, latency: int) -> None:
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+        self.buckets[min(latency.bit_length(), BUCKETS - 1)] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, q: float) -> int:
+        """
+        Upper bound in nanoseconds of the bucket of the q-th percentile (0 to 100).
+        """
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count > 0 and seen >= rank:
+                return min(1 << bucket, self.max)
+        return self.max
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of an Engine. attach() wraps the receive callback of every
+    subscription and the send of every subscriber to count the events per topic and
+    partition, time each handler per partition and measure the throughput. The engine is
+    not touched until attach() and is restored by detach(), so a run without a Profiler
+    pays nothing.
+
+    Handlers are timed on their own: events sent while the engine is consuming are only
+    queued, so the time of a handler does not include the handlers of the events it sends.
+
+    Attributes:
+        events (dict): (topic, partition) -> number of events sent.
+        handlers (dict): (subscriber label, partition) -> Histogram.
+    """
+
+    def __init__(self) -> None:
+        self.events: dict = {}
+        self.handlers: dict = {}
+
+        self._engine: Engine = None
+        self._start = 0
+        self._stop = 0
+
+        # Original callbacks, routes of a Dispatcher and senders, restored on detach
+        self._callbacks: dict = {}
+        self._routes: tuple = None
+        self._senders: dict = {}
+
+    def attach(self, engine: Engine) -> "Profiler":
+        """
+        Instruments the current subscriptions of the engine, so attach after subscribing.
+        """
+        self._engine = engine
+        self._start = perf_counter_ns()
+        self._stop = 0
+
+        for topic, callbacks in engine.subscriptions.items():
+            for id, callback in callbacks.items():
+                self._callbacks[(topic, id)] = callback
+                callbacks[id] = self.timed(callback)
+
+                subscriber = callback.__self__
+                if subscriber.id not in self._senders:
+                    self._senders[subscriber.id] = (subscriber, subscriber._send)
+                    subscriber._send = self.counted(subscriber._send)
+
+        # A Dispatcher calls the handlers of its routes instead
+        if hasattr(engine, "routes"):
+            self._routes = (engine.routes, engine.wildcards)
+            engine.routes = {
+                key: [(id, self.timed(handler)) for id, handler in handlers]
+                for key, handlers in engine.routes.items()
+            }
+            engine.wildcards = {
+                topic: [(id, self.timed(handler)) for id, handler in handlers]
+                for topic, handlers in engine.wildcards.items()
+            }
+
+        # Events injected from outside the subscribers, e.g. a replay loop
+        engine.inject = self.counted(engine.inject)
+
+        return self
+
+    def detach(self) -> None:
+        self._stop = perf_counter_ns()
+
+        for (topic, id), callback in self._callbacks.items():
+            self._engine.subscriptions[topic][id] = callback
+        if self._routes is not None:
+            self._engine.routes, self._engine.wildcards = self._routes
+        for subscriber, send in self._senders.values():
+            subscriber._send = send
+        del self._engine.inject
+
+        self._callbacks = {}
+        self._routes = None
+        self._senders = {}
+
+    def __enter__(self) -> "Profiler":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.detach()
+
+    def timed(self, callback):
+        subscriber = getattr(callback, "__self__", None)
+        if subscriber is None:
+            label = callback.__name__
+        else:
+            label = "{0}#{1}".format(type(subscriber).__name__, subscriber.id)
+        handlers = self.handlers
+
+        def receive(event: Event) -> None:
+            start = perf_counter_ns()
+            callback(event)
+            latency = perf_counter_ns() - start
+
+            key = (label, event.partition)
+            histogram = handlers.get(key)
+            if histogram is None:
+                histogram = handlers[key] = Histogram()
+            histogram.add(latency)
+
+        return receive
+
+    def counted(self, send):
+        events = self.events
+
+        def count(event: Event) -> None:
+            key = (event.topic, event.partition)
+            events[key] = events.get(key, 0) + 1
+            send(event)
+
+        # The engine of the send, the DataManager drains it on RUN
+        count.__self__ = getattr(send, "__self__", None)
+
+        return count
+
+    def report(self) -> dict:
+        """
+        Counts, latencies and throughput so far.
+
+        Returns:
+            dict: wall (seconds), events, events_per_second, the events per topic and
+                partition and the latency of each handler and partition in nanoseconds.
+        """
+        stop = self._stop if self._stop > 0 else perf_counter_ns()
+        wall = (stop - self._start) / 1e9
+        total = sum(self.events.values())
+
+        return {
+            "wall": wall,
+            "events": total,
+            "events_per_second": total / wall if wall > 0 else 0.0,
+            "topics": [
+                {
+                    "topic": topic,
+                    "partition": partition_name(partition),
+                    "events": count,
+                }
+                for (topic, partition), count in sorted(
+                    self.events.items(), key=lambda item: str(item[0])
+                )
+            ],
+            "handlers": [
+                {
+                    "handler": label,
+                    "partition": partition_name(partition),
+                    "calls": histogram.count,
+                    "total": histogram.total,
+                    "mean": histogram.mean,
+                    "p50": histogram.percentile(50),
+                    "p99": histogram.percentile(99),
+                    "max": histogram.max,
+                    "buckets": histogram.buckets,
+                }
+                for (label, partition), histogram in sorted(
+                    self.handlers.items(), key=lambda item: -item[1].total
+                )
+            ],
+        }
+
+    def save(self, file_name: str) -> None:
+        """
+        Exports the report as JSON.
+        """
+        with open(file_name, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def text(self) -> str:
+        """
+        The report as text, the slowest handlers first.
+        """
+        report = self.report()
+
+        res = "Events: {0} in {1:.3f}s ({2:.0f} events/s)\n".format(
+            report["events"], report["wall"], report["events_per_second"]
+        )
+
+        res += "\n{0:<24} {1:<12} {2:>10}\n".format("Topic", "Partition", "Events")
+        for row in report["topics"]:
+            res += "{0:<24} {1:<12} {2:>10}\n".format(
+                str(row["topic"]), str(row["partition"]), row["events"]
+            )
+
+        columns = "{0:<24} {1:<12} {2:>10} {3:>10} {4:>10} {5:>10} {6:>10}\n"
+        res += "\n" + columns.format(
+            "Handler", "Partition", "Calls", "Total ms", "Mean us", "p99 us", "Max us"
+        )
+        for row in report["handlers"]:
+            res += columns.format(
+                row["handler"],
+                str(row["partition"]),
+                row["calls"],
+                "{0:.3f}".format(row["total"] / 1e6),
+                "{0:.2f}".format(row["mean"] / 1e3),
+                "{0:.2f}".format(row["p99"] / 1e3),
+                "{0:.2f}".format(row["max"] / 1e3),
+            )
+
+        return res
@@ -0,0 +1,178 @@
+from event_backtesting.order import Order, Quote
+from event_backtesting.constants import *
+from bisect import bisect_left, bisect_right
+from math import inf
+from datetime import datetime
+
+
+class PriceLevels:
+    """
+    One side of a limit order book. The prices are kept in a sorted list, searched with bisect,
+    and the offer of each price in a dictionary, so the best price is always the first key.
+
+    Attributes:
+        side (str): OrderSide.BUY for bids (highest price first) or OrderSide.SELL for asks
+            (lowest price first).
+    """
+
+    def __init__(self, side: str) -> None:
+        self.side = side
+
+        # Sorted keys: the price for asks and -price for bids, best first
+        self._keys: list[float] = []
+
+        # Offer of each key
+        self._levels: dict[float, Quote] = {}
+
+        # Top of book quote, reused by every quote() call
+        self._top: Quote = Quote(side, 0, 0.0)
+
+    def _key(self, price: float) -> float:
+        return -price if self.side == OrderSide.BUY else price
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, depth: int) -> Quote:
+        """
+        Offer at a depth of the book, 0 being the best price.
+        """
+        return self._levels[self._keys[depth]]
+
+    def __iter__(self):
+        """
+        Walks the offers from the best price to the worst one.
+        """
+        for key in self._keys:
+            yield self._levels[key]
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def best(self) -> Quote:
+        """
+        Offer at the best price, or None if the side is empty.
+        """
+        if len(self._keys) == 0:
+            return None
+        return self._levels[self._keys[0]]
+
+    def get(self, price: float) -> Quote:
+        """
+        Offer at a price, or None if there is no level at the price.
+        """
+        return self._levels.get(self._key(price))
+
+    def update(self, offer: Quote) -> None:
+        """
+        Inserts or replaces the level at the offer price. An offer with quantity 0 deletes it.
+        """
+        key = self._key(offer.price)
+
+        if offer.quantity == 0:
+            self.delete(offer.price)
+            return
+
+        if key not in self._levels:
+            self._keys.insert(bisect_left(self._keys, key), key)
+        self._levels[key] = offer
+
+    def delete(self, price: float) -> None:
+        """
+        Removes the level at a price, if any.
+        """
+        key = self._key(price)
+
+        if key in self._levels:
+            del self._levels[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+    def replace(self, offer: Quote) -> None:
+        """
+        Replaces the whole side by a single offer (best bid/ask and candle data). An offer with
+        quantity 0 means infinite liquidity at its price.
+        """
+        key = self._key(offer.price)
+
+        self._keys = [key]
+        self._levels = {key: offer}
+
+    def quote(self, price: float, quantity: int, timestamp: datetime) -> Quote:
+        """
+        Same as replace, but the side keeps a single quote updated in place, so best bid/ask
+        and candle updates allocate nothing.
+        """
+        top = self._top
+        top.price = price
+        top.quantity = quantity
+        top.timestamp = timestamp
+
+        key = self._key(price)
+        if len(self._keys) == 1:
+            self._keys[0] = key
+        else:
+            self._keys = [key]
+        self._levels.clear()
+        self._levels[key] = top
+
+        return top
+
+    def clear(self) -> None:
+        self._keys = []
+        self._levels = {}
+
+
+class OrderIndex:
+    """
+    Pending orders of one side of the book, sorted by (price, id). A candle range or a quote
+    only touches the orders whose prices cross it: O(log n + k) instead of a scan of all
+    pending orders.
+
+    Attributes:
+        side (str): OrderSide.BUY or OrderSide.SELL.
+    """
+
+    def __init__(self, side: str) -> None:
+        self.side = side
+
+        # Sorted (price, id) keys and the order of each id
+        self._keys: list[tuple] = []
+        self._orders: dict[int, Order] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self):
+        for _, id in self._keys:
+            yield self._orders[id]
+
+    def add(self, order: Order) -> None:
+        key = (order.price, order.id)
+        self._keys.insert(bisect_left(self._keys, key), key)
+        self._orders[order.id] = order
+
+    def remove(self, order: Order) -> None:
+        key = (order.price, order.id)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+            del self._orders[order.id]
+
+    def between(self, low: float, high: float) -> list:
+        """
+        Orders with low <= price <= high.
+        """
+        start = bisect_left(self._keys, (low, 0))
+        end = bisect_right(self._keys, (high, inf))
+        return [self._orders[id] for _, id in self._keys[start:end]]
+
+    def crossing(self, price: float) -> list:
+        """
+        Orders that cross an offer at price: buy orders at or above an ask, sell orders at or
+        below a bid.
+        """
+        if self.side == OrderSide.BUY:
+            keys = self._keys[bisect_left(self._keys, (price, 0)) :]
+        else:
+            keys = self._keys[: bisect_right(self._keys, (price, inf))]
+        return [self._orders[id] for _, id in keys]
@@ -0,0 +1,564 @@
+from event_processing.event import Event
+from event_backtesting.constants import *
+from event_backtesting.order import Order
+from datetime import datetime
+import numpy as np
+
+# Timestamps are kept as int64 microseconds since the epoch (datetime64[us])
+TIMESTAMP_UNIT = "datetime64[us]"
+
+# Number of characters read from a file at once by read_rows
+CHUNK_SIZE = 1 << 20
+
+# Microseconds in one day
+DAY = 86_400_000_000
+
+# Number of rows converted to python objects at once when building events
+BATCH_SIZE = 4096
+
+# Bloomberg tick actions that are renamed when turned into partitions. Their rows
+# are the top of book after each change, not depth updates, so they replace the
+# best quote (Book.on_best) instead of adding a price level (Book.on_level),
+# which would keep every old best price in the book
+TICK_PARTITIONS = {
+    DataType.BID: Partition.BEST_BID,
+    DataType.ASK: Partition.BEST_ASK,
+}
+
+# Position of each byte of "dd/mm/YYYY HH:MM:SS" in "YYYY-mm-ddTHH:MM:SS"
+_ISO_ORDER = [6, 7, 8, 9, 2, 3, 4, 5, 0, 1, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+
+# Separators of "dd/mm/YYYY HH:MM:SS" by position, every other byte is a digit
+_SEPARATORS = {2: "/", 5: "/", 10: " ", 13: ":", 16: ":"}
+_DIGITS = [i for i in range(19) if i not in _SEPARATORS]
+
+
+class MarketData:
+    """
+    Columnar storage of the events of one instrument. Instead of one Event per row, the rows of
+    a file are kept in typed NumPy arrays and the Event objects are only built when the data is
+    replayed.
+
+    Attributes:
+        instrument (str): The instrument (topic) of every event.
+        partitions (list[int]): Partitions, indexed by the values of code.
+        timestamp (np.ndarray): int64 timestamps in microseconds since the epoch.
+        code (np.ndarray): int8 partition code of each row.
+        columns (dict[str, np.ndarray]): Event value columns, keyed by the event value keys.
+    """
+
+    def __init__(
+        self,
+        instrument: str,
+        partitions: list,
+        timestamp: np.ndarray,
+        code: np.ndarray,
+        columns: dict,
+    ) -> None:
+        self.instrument = instrument
+        self.partitions = list(partitions)
+        self.timestamp = timestamp
+        self.code = code
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __repr__(self) -> str:
+        return "{0}: {1} rows {2}".format(
+            self.instrument, len(self), list(self.columns.keys())
+        )
+
+    def take(self, index: np.ndarray) -> "MarketData":
+        """
+        Returns a new MarketData with only the given rows, in the given order.
+        """
+        return MarketData(
+            self.instrument,
+            self.partitions,
+            self.timestamp[index],
+            self.code[index],
+            {key: column[index] for key, column in self.columns.items()},
+        )
+
+    @staticmethod
+    def concat(instrument: str, parts: list) -> "MarketData":
+        """
+        Concatenates the rows of several MarketData (e.g. the chunks of one file). The partition
+        codes of each part are translated to a common list of partitions.
+        """
+        partitions = []
+        for part in parts:
+            for name in part.partitions:
+                if name not in partitions:
+                    partitions.append(name)
+
+        codes = []
+        for part in parts:
+            lookup = np.array(
+                [partitions.index(name) for name in part.partitions], dtype=np.int8
+            )
+            codes.append(lookup[part.code])
+
+        return MarketData(
+            instrument,
+            partitions,
+            np.concatenate([part.timestamp for part in parts]),
+            np.concatenate(codes),
+            {
+                key: np.concatenate([part.columns[key] for part in parts])
+                for key in parts[0].columns
+            },
+        )
+
+    def sort(self) -> "MarketData":
+        """
+        Returns the data sorted by timestamp. Rows with the same timestamp keep the file
+        order. Data that is already sorted (the usual case) is returned without a copy.
+        """
+        if np.all(self.timestamp[1:] >= self.timestamp[:-1]):
+            return self
+
+        return self.take(np.argsort(self.timestamp, kind="stable"))
+
+    def events(self, index: np.ndarray = None):
+        """
+        Builds the events lazily, BATCH_SIZE rows at a time.
+
+        Parameters:
+            index (np.ndarray): Rows to replay, in replay order. Defaults to all rows.
+
+        Yields:
+            Event: One event per row.
+        """
+        if index is None:
+            index = np.arange(len(self))
+
+        keys = list(self.columns.keys())
+
+        for start in range(0, len(index), BATCH_SIZE):
+            rows = index[start : start + BATCH_SIZE]
+
+            # Bulk conversion to python objects (datetime, str, float, int)
+            timestamps = self.timestamp[rows].astype(TIMESTAMP_UNIT).tolist()
+            partitions = [self.partitions[code] for code in self.code[rows].tolist()]
+            values = zip(*[self.columns[key][rows].tolist() for key in keys])
+
+            for timestamp, partition, value in zip(timestamps, partitions, values):
+                yield Event(
+                    topic=self.instrument,
+                    partition=partition,
+                    value=dict(zip(keys, value)),
+                    timestamp=timestamp,
+                )
+
+
+def read_rows(file_name: str, chunk_size: int = CHUNK_SIZE):
+    """
+    Reads a file in chunks of chunk_size characters, so the whole file is never in memory.
+    A row broken by the end of a chunk is completed with the start of the next one.
+
+    Yields:
+        list[str]: The complete rows of each chunk. The header row is skipped.
+    """
+    header = True
+    rest = ""
+
+    with open(file_name, "r") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+
+            rows = (rest + chunk).split("\n")
+
+            # The last row may continue in the next chunk
+            rest = rows.pop()
+
+            # Skip first row (header row)
+            if header and len(rows) > 0:
+                rows = rows[1:]
+                header = False
+
+            yield rows
+
+    # Last row without line break
+    if rest and not header:
+        yield [rest]
+
+
+def to_timestamp(value: datetime) -> int:
+    """
+    Converts a datetime to int64 microseconds since the epoch.
+    """
+    return int(np.datetime64(value, "us").astype(np.int64))
+
+
+def iso_datetime(dates: list) -> np.ndarray:
+    """
+    Converts "dd/mm/YYYY HH:MM:SS" strings to "YYYY-mm-ddTHH:MM:SS" bytes without calling
+    strptime, by shuffling the bytes. ISO 8601 bytes sort in time order.
+
+    Dates in any other layout (e.g. not zero padded) are parsed by strptime, as the rows
+    of the event loaders are.
+
+    Raises:
+        ValueError: If a date does not match DATETIME_FORMAT.
+    """
+    # One byte more than the layout, so longer dates are not truncated
+    raw = np.array(dates, dtype="S20").view(np.uint8).reshape(-1, 20)
+
+    valid = raw[:, 19] == 0
+    for i, separator in _SEPARATORS.items():
+        valid &= raw[:, i] == ord(separator)
+    digits = raw[:, _DIGITS]
+    valid &= ((digits >= ord("0")) & (digits <= ord("9"))).all(axis=1)
+
+    iso = raw[:, _ISO_ORDER]
+    iso[:, [4, 7]] = ord("-")
+    iso[:, 10] = ord("T")
+
+    for i in np.flatnonzero(~valid).tolist():
+        date = datetime.strptime(dates[i], DATETIME_FORMAT)
+        iso[i] = np.frombuffer(
+            date.strftime("%Y-%m-%dT%H:%M:%S").encode(), dtype=np.uint8
+        )
+
+    return iso.copy().view("S19").ravel()
+
+
+def iso_date(dates: list) -> np.ndarray:
+    """
+    Converts "YYYY-mm-dd" strings to "YYYY-mm-ddT00:00:00" bytes.
+    """
+    raw = np.array(dates, dtype="S10").view(np.uint8).reshape(-1, 10)
+    iso = np.empty((len(raw), 19), dtype=np.uint8)
+    iso[:, :10] = raw
+    iso[:, 10:] = np.frombuffer(b"T00:00:00", dtype=np.uint8)
+
+    return iso.view("S19").ravel()
+
+
+def parse_iso(iso: np.ndarray) -> np.ndarray:
+    """
+    Converts ISO 8601 bytes to int64 timestamps, parsed by NumPy.
+    """
+    return iso.astype(TIMESTAMP_UNIT).astype(np.int64)
+
+
+def split_columns(rows: list, separator: str, size: int, decimal: bool = False) -> list:
+    """
+    Splits the rows with exactly size columns in one pass, returning one list per column.
+    If decimal is set, the Brazilian decimal comma is replaced once for the whole block.
+    """
+    rows = [row for row in rows if row.count(separator) == size - 1]
+    if len(rows) == 0:
+        return [[] for _ in range(size)]
+
+    text = separator.join(rows)
+    if decimal:
+        text = text.replace(DEC_SYMBOL, ".")
+
+    cols = text.split(separator)
+
+    return [cols[i::size] for i in range(size)]
+
+
+class RowFilter:
+    """
+    Row filters of one instrument of a LOAD payload (Data.START, Data.END, Data.SESSION and
+    Data.PARTITIONS). They are checked on the date and action text of the rows, before any
+    price or date is parsed and before any Event is built.
+
+    Attributes:
+        start (str): First ISO 8601 timestamp (inclusive), or None.
+        end (str): Last ISO 8601 timestamp (exclusive), or None.
+        sessions (list[tuple[str, str]]): "HH:MM:SS" windows (start inclusive, end exclusive),
+            or None for the whole day. Daily bars (Yahoo) have no time and ignore them.
+        partitions (set[int]): Allowed partitions, or None for all of them. BID and ASK
+            allow the BEST_BID and BEST_ASK events of the Bloomberg tick actions.
+        sorted (bool): The file is sorted by time, reading stops at the first row past end.
+        intraday (bool): Rows have a time of day (Bloomberg) or only a date (Yahoo).
+    """
+
+    def __init__(self, spec: dict, sorted: bool = False) -> None:
+        self.start = self.iso(spec.get(Data.START))
+        self.end = self.iso(spec.get(Data.END))
+
+        self.sessions = None
+        if spec.get(Data.SESSION) is not None:
+            self.sessions = [(str(a), str(b)) for a, b in spec[Data.SESSION]]
+
+        self.partitions = None
+        if spec.get(Data.PARTITIONS) is not None:
+            # The Bloomberg BID and ASK actions are loaded as BEST_BID and BEST_ASK
+            self.partitions = {
+                TICK_PARTITIONS.get(partition, partition)
+                for partition in map(partition_code, spec[Data.PARTITIONS])
+            }
+
+        self.sorted = spec.get(Data.SORTED, sorted)
+        self.intraday = spec.get(Data.SOURCE) != DataSource.YAHOO
+
+    @staticmethod
+    def iso(value: datetime) -> str:
+        if value is None:
+            return None
+        return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def row_key(self, row: str) -> str:
+        """
+        ISO 8601 timestamp of a raw row, or None if the row has no date.
+        """
+        if self.intraday:
+            text = row.split(CSV_SEPARATOR, 1)[0]
+            if len(text) == 19:
+                return text[6:10] + "-" + text[3:5] + "-" + text[0:2] + "T" + text[11:]
+        else:
+            text = row.split(",", 1)[0]
+            if len(text) == 10:
+                return text + "T00:00:00"
+        return None
+
+    def past(self, key: str) -> bool:
+        """
+        True if a row with this ISO 8601 timestamp is after the end of the range.
+        """
+        return self.end is not None and key >= self.end
+
+    def past_rows(self, rows: list) -> bool:
+        """
+        True if the last row with a date is after the end of the range.
+        """
+        for row in reversed(rows):
+            key = self.row_key(row)
+            if key is not None:
+                return self.past(key)
+        return False
+
+    def accept(self, key: str, partition: int) -> bool:
+        """
+        Checks one row, given its ISO 8601 timestamp and partition.
+        """
+        if self.start is not None and key < self.start:
+            return False
+        if self.end is not None and key >= self.end:
+            return False
+        if self.sessions is not None and self.intraday:
+            time = key[11:]
+            if not any(a <= time < b for a, b in self.sessions):
+                return False
+        if self.partitions is not None and partition not in self.partitions:
+            return False
+        return True
+
+    def mask(self, iso: np.ndarray, partitions: list, code: np.ndarray) -> np.ndarray:
+        """
+        Vectorized accept over ISO 8601 bytes and partition codes.
+        """
+        mask = np.ones(len(iso), dtype=bool)
+
+        if self.start is not None:
+            mask &= iso >= self.start.encode()
+        if self.end is not None:
+            mask &= iso < self.end.encode()
+        if self.sessions is not None and self.intraday:
+            time = iso.view(np.uint8).reshape(-1, 19)[:, 11:].copy().view("S8").ravel()
+            session = np.zeros(len(iso), dtype=bool)
+            for a, b in self.sessions:
+                session |= (time >= a.encode()) & (time < b.encode())
+            mask &= session
+        if self.partitions is not None:
+            allowed = np.array([name in self.partitions for name in partitions])
+            mask &= allowed[code]
+
+        return mask
+
+    def apply(self, data: MarketData) -> MarketData:
+        """
+        Filters data that is already parsed (cache or store).
+        """
+        timestamp = data.timestamp
+        mask = np.ones(len(data), dtype=bool)
+
+        if self.start is not None:
+            mask &= timestamp >= to_timestamp(np.datetime64(self.start))
+        if self.end is not None:
+            mask &= timestamp < to_timestamp(np.datetime64(self.end))
+        if self.sessions is not None and self.intraday:
+            time = timestamp % DAY
+            session = np.zeros(len(data), dtype=bool)
+            for a, b in self.sessions:
+                a = to_timestamp(np.datetime64("1970-01-01T" + a))
+                b = to_timestamp(np.datetime64("1970-01-01T" + b))
+                session |= (time >= a) & (time < b)
+            mask &= session
+        if self.partitions is not None:
+            allowed = np.array([name in self.partitions for name in data.partitions])
+            mask &= allowed[data.code]
+
+        if mask.all():
+            return data
+
+        return data.take(np.flatnonzero(mask))
+
+
+def data_spec(spec: dict) -> dict:
+    """
+    Normalizes the spec of one instrument of a LOAD payload: the type and the partitions
+    may be given by name (e.g. "TICK") or by code, the result holds the codes.
+
+    Raises:
+        ValueError: If the source and type are not supported.
+    """
+    spec = dict(spec)
+
+    if spec.get(Data.TYPE) is not None:
+        spec[Data.TYPE] = partition_code(spec[Data.TYPE])
+    if spec.get(Data.PARTITIONS) is not None:
+        spec[Data.PARTITIONS] = list(map(partition_code, spec[Data.PARTITIONS]))
+
+    # The store holds its own partitions, any other source needs a parser
+    if spec.get(Data.SOURCE) != DataSource.STORE:
+        columns_parser(spec.get(Data.SOURCE), spec.get(Data.TYPE))
+
+    return spec
+
+
+def row_filter(spec: dict, sorted: bool = False) -> RowFilter:
+    """
+    Returns the RowFilter of a LOAD payload, or None if it has no filter.
+    """
+    if all(
+        spec.get(key) is None
+        for key in [Data.START, Data.END, Data.SESSION, Data.PARTITIONS]
+    ):
+        return None
+    return RowFilter(spec, sorted)
+
+
+def parse_bloomberg_tick(
+    instrument: str, rows: list, filters: RowFilter = None
+) -> MarketData:
+    """
+    Parses Bloomberg tick rows (date;action;value;volume) into columns.
+    """
+    dates, actions, prices, quantities = split_columns(rows, CSV_SEPARATOR, 4, True)
+
+    iso = iso_datetime(dates)
+    names, code = np.unique(np.array(actions, dtype=str), return_inverse=True)
+    partitions = [partition_code(name) for name in names.tolist()]
+    partitions = [TICK_PARTITIONS.get(code, code) for code in partitions]
+    code = code.astype(np.int8).ravel()
+    prices = np.array(prices, dtype=str)
+    quantities = np.array(quantities, dtype=str)
+
+    # Drop the rows before parsing numbers and dates
+    if filters is not None:
+        mask = filters.mask(iso, partitions, code)
+        iso, code, prices, quantities = [
+            col[mask] for col in [iso, code, prices, quantities]
+        ]
+
+    return MarketData(
+        instrument,
+        partitions,
+        parse_iso(iso),
+        code,
+        {
+            Order.QUANTITY: quantities.astype(np.int64),
+            Order.PRICE: prices.astype(np.float64),
+        },
+    )
+
+
+def parse_bloomberg_intr(
+    instrument: str, rows: list, filters: RowFilter = None
+) -> MarketData:
+    """
+    Parses Bloomberg intraday bars (date;open;close;high;low) into candle columns.
+    """
+    cols = split_columns(rows, CSV_SEPARATOR, 5, True)
+
+    iso = iso_datetime(cols[0])
+    opens, closes, highs, lows = [np.array(col, dtype=str) for col in cols[1:]]
+    code = np.zeros(len(iso), dtype=np.int8)
+
+    # Drop the rows before parsing numbers and dates
+    if filters is not None:
+        mask = filters.mask(iso, [Partition.CANDLE], code)
+        iso, code, opens, closes, highs, lows = [
+            col[mask] for col in [iso, code, opens, closes, highs, lows]
+        ]
+
+    return MarketData(
+        instrument,
+        [Partition.CANDLE],
+        parse_iso(iso),
+        code,
+        {
+            Candle.OPEN: opens.astype(np.float64),
+            Candle.HIGH: highs.astype(np.float64),
+            Candle.LOW: lows.astype(np.float64),
+            Candle.CLOSE: closes.astype(np.float64),
+            Candle.VOLUME: np.zeros(len(iso), dtype=np.int64),
+        },
+    )
+
+
+def parse_yahoo_hist(
+    instrument: str, rows: list, filters: RowFilter = None
+) -> MarketData:
+    """
+    Parses Yahoo daily history (Date,Open,High,Low,Close,Adj Close,Volume) into candle columns.
+    """
+    cols = [np.array(col, dtype=str) for col in split_columns(rows, ",", 7)]
+
+    # Sometimes the row is null
+    mask = cols[1] != "null"
+
+    iso = iso_date(cols[0])
+    code = np.zeros(len(iso), dtype=np.int8)
+
+    # Drop the rows before parsing numbers and dates
+    if filters is not None:
+        mask &= filters.mask(iso, [Partition.CANDLE], code)
+
+    iso, code = iso[mask], code[mask]
+    _, opens, highs, lows, _, closes, volumes = [col[mask] for col in cols]
+
+    # TODO: fix Open, High, Low as Adjusted Close
+
+    return MarketData(
+        instrument,
+        [Partition.CANDLE],
+        parse_iso(iso),
+        code,
+        {
+            Candle.OPEN: opens.astype(np.float64),
+            Candle.HIGH: highs.astype(np.float64),
+            Candle.LOW: lows.astype(np.float64),
+            Candle.CLOSE: closes.astype(np.float64),
+            Candle.VOLUME: volumes.astype(np.int64),
+        },
+    )
+
+
+def columns_parser(source: str, type: int):
+    """
+    Returns the columnar parser of a supported data source and type (code or name).
+
+    Raises:
+        ValueError: If the source and type are not supported.
+    """
+    type = partition_code(type)
+    if source == DataSource.BLOOMBERG:
+        if type == DataType.TICK:
+            return parse_bloomberg_tick
+        elif type == DataType.INTR:
+            return parse_bloomberg_intr
+    elif source == DataSource.YAHOO:
+        if type == DataType.HIST:
+            return parse_yahoo_hist
+
+    raise ValueError("Unsupported data {0} {1}.".format(source, partition_name(type)))
@@ -1,5 +1,6 @@
 from datetime import datetime
 from event_backtesting.constants import *
+from collections import namedtuple
 
 
 class Order:
@@ -29,6 +30,19 @@ class Order:
 
     _id = 0
 
+    __slots__ = (
+        "id",
+        "owner",
+        "instrument",
+        "side",
+        "status",
+        "timestamp",
+        "quantity",
+        "price",
+        "executed",
+        "average",
+    )
+
     @staticmethod
     def get_id() -> int:
         """
@@ -94,6 +108,36 @@ class Order:
         self.executed = 0
         self.average = 0
 
+    def __getnewargs__(self) -> tuple:
+        """
+        Arguments of __new__ when the order is unpickled. The saved id replaces the new one.
+        """
+        return (self.instrument, self.side, self.quantity, self.price)
+
+    def report(self, fill_quantity: int = 0, fill_price: float = 0) -> "Report":
+        """
+        Snapshot of the order as an immutable execution report, the payload of the NEW, PARTIAL
+        and FILLED events.
+
+        Parameters:
+            fill_quantity (int): Quantity of the fill reported by a PARTIAL event.
+            fill_price (float): Price of the fill reported by a PARTIAL event.
+        """
+        return Report(
+            self.id,
+            self.owner,
+            self.instrument,
+            self.side,
+            self.status,
+            self.timestamp,
+            self.quantity,
+            self.price,
+            self.executed,
+            self.average,
+            fill_quantity,
+            fill_price,
+        )
+
     def __repr__(self) -> str:
         """
         Returns a string representation of the Order instance, including its unique ID, timestamp,
@@ -122,6 +166,8 @@ class Trade:
         price (float): The price at which the trade was executed.
     """
 
+    __slots__ = ("timestamp", "instrument", "quantity", "price")
+
     def __init__(
         self, timestamp: datetime, instrument: str, quantity: int, price: float
     ):
@@ -141,3 +187,88 @@ class Trade:
         return "{0} - {1}: {2}@{3:0.6f}".format(
             self.timestamp, self.instrument, self.quantity, self.price
         )
+
+
+class Report(
+    namedtuple(
+        "Report",
+        [
+            "id",
+            "owner",
+            "instrument",
+            "side",
+            "status",
+            "timestamp",
+            "quantity",
+            "price",
+            "executed",
+            "average",
+            "fill_quantity",
+            "fill_price",
+        ],
+    )
+):
+    """
+    Immutable execution report of an order, sent by the Book in the NEW, PARTIAL and FILLED
+    events. It is a tuple, so a fill allocates one object instead of several dictionaries.
+    Fields are read as attributes (report.price) or with the order keys (report[Order.PRICE],
+    report[Fill.QUANTITY]) used by the dictionary payloads.
+
+    Attributes:
+        id, owner, instrument, side, status, timestamp, quantity, price, executed, average:
+            The order attributes when the report was made.
+        fill_quantity (int): Quantity of this fill (PARTIAL events), 0 otherwise.
+        fill_price (float): Price of this fill (PARTIAL events), 0 otherwise.
+    """
+
+    __slots__ = ()
+
+    # Payload keys that are not field names
+    _keys = {Fill.QUANTITY: "fill_quantity", Fill.PRICE: "fill_price"}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, Report._keys.get(key, key))
+            except AttributeError:
+                raise KeyError(key) from None
+        return super().__getitem__(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class Quote:
+    """
+    Represents the offer at one price level of the book (a bid or an ask). Unlike an Order, a
+    quote has no id and is mutable, so the book updates it in place instead of allocating a new
+    object on every market data event.
+
+    Attributes:
+        side (str): OrderSide.BUY for a bid or OrderSide.SELL for an ask.
+        quantity (int): The quantity offered. Zero means infinite liquidity (candle data).
+        price (float): The price of the level.
+        timestamp (datetime): Timestamp of the last update of the level.
+    """
+
+    __slots__ = ("side", "quantity", "price", "timestamp")
+
+    def __init__(
+        self, side: str, quantity: int, price: float, timestamp: datetime = None
+    ) -> None:
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.timestamp = timestamp
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the Quote instance, detailing the timestamp, side,
+        quantity and price.
+        """
+        return "{0} - {1}: {2}@{3:0.6f}".format(
+            self.timestamp, partition_name(self.side), self.quantity, self.price
+        )
@@ -1,30 +1,42 @@
 from event_processing.subscriber import Subscriber
+from event_processing.event import Event
 from event_backtesting.order import Order, OrderSide, OrderStatus
 from event_backtesting.constants import *
-import numpy as np
+from event_backtesting.stats import Stats
+from event_backtesting.history import PriceHistory
+from event_backtesting.equity import EquityCurve
+from event_backtesting import analytics
+from datetime import date
 
 # TODO: implement original strategy receive
-# TODO: make it generic for dict[id, etc]
 
 
 class Risk(Subscriber):
     def __init__(self):
         self.position: dict[str, dict[int, int]] = {}
 
-        self._prices = {}  # vector of prices by instrument
-        self._last = {}  # dictionary of last prices by instrument
+        # Price bars of each instrument, the last one is _prices[instrument].last
+        self._prices: dict[str, PriceHistory] = {}
 
+        # Accounting of each strategy (owner), isolated from the others
         self._trade: dict[int, Trade] = {}  # Actual open trade for each strategy
-        self._trades: dict[int, list[Trade]] = (
-            {}
-        )  # list of all trades for each strategy
-        self._days: dict[int, dict] = (
-            {}
-        )  # Struct of daily aggregated mectrics for each strategy
+        self._trades: dict[int, list[Trade]] = {}  # Closed trades of each strategy
+        self._days: dict[int, EquityCurve] = {}  # Equity and days of each strategy
+        self._stats: dict[int, TradeStats] = {}  # Running trade statistics
 
-        self._orders: dict[
-            int, int
-        ]  # List of orders for flow control for each strategy
+        # Last price of each instrument and the strategies with a position in it,
+        # the only ones marked to market on a new price
+        self._marks: dict[str, float] = {}
+        self._holders: dict[str, set] = {}
+
+        # Best bid and ask of each instrument with tick data
+        self._quotes: dict[str, list] = {}
+
+        # Current day of the run
+        self._day: date = None
+
+        # Executed quantity and amount already accounted for each order
+        self._orders: dict[int, tuple] = {}
 
         # Fee, Tax, Carry and Capital information
         # See constants.py for more information
@@ -34,282 +46,635 @@ class Risk(Subscriber):
         self.tax_flow_sell = FLOW_SELL_TAX
         self.tax_profit = PROFIT_TAX
         self.init_capital = INITIAL_CAPITAL
-        self.avail_capital = self.init_capital
+        self.avail_capital: dict[int, float] = {}  # Balance of each strategy
         self.risk_free_rate = RISK_FREE_RATE
 
         # TODO: implement for each instrument
         self.margin = MARGIN
         self.leverage = LEVERAGE
 
-    def receive(self, event):
+        # Handler of each partition, the Dispatcher routes the events straight
+        # to them and receive() looks them up
+        self.handlers: dict = {
+            Partition.LOAD: self.on_load,
+            Partition.PRICE: self.on_price,
+            Partition.CANDLE: self.on_price,
+            Partition.TRADE: self.on_tick,
+            Partition.NEG: self.on_tick,
+            Partition.BEST_BID: self.on_tick,
+            Partition.BEST_ASK: self.on_tick,
+            Partition.BUY: self.on_order,
+            Partition.SELL: self.on_order,
+            Partition.SELLSHORT: self.on_order,
+            OrderStatus.PARTIAL: self.on_partial,
+            OrderStatus.FILLED: self.on_filled,
+        }
 
-        if event.topic == Topic.SYSTEM and event.partition == Partition.LOAD:
+    def receive(self, event):
 
-            for instrument in event.value:
-                self.position[instrument] = {}
-                self._prices[instrument] = []
+        if event.topic == Topic.SYSTEM:
+            if event.partition == Partition.LOAD:
+                self.on_load(event)
 
         elif event.topic in self.position:
-            if event.partition == Partition.PRICE:
-                self._prices[event.topic].append(event.value)
-
-                # Update results MtM
-                for trade in self._trade.values():
-                    if not trade.zeroed():
-                        pass
-
-            elif event.partition in [
-                Partition.BUY,
-                Partition.SELL,
-                Partition.SELLSHORT,
-            ]:
-                owner = event.sender
-                if owner not in self.position[event.topic]:
-                    self.position[event.topic][owner] = 0
-
-                partition = Partition.EXECUTE
-
-                if event.partition == Partition.SELLSHORT:
-                    # Check if position is 0
-                    if self.position[event.topic][owner] != 0:
-                        partition = OrderStatus.REJECTED
-
-                # Create the Execute Event
-                order = event(
-                    event.topic,
-                    partition,
-                    {
-                        Order.OWNER: owner,
-                        Order.QUANTITY: event.value[Order.QUANTITY],
-                        Order.PRICE: event.value[Order.PRICE],
-                        Order.SIDE: event.partition,
-                        Order.STATUS: partition,
-                    },
-                )
+            handler = self.handlers.get(event.partition)
+            if handler is not None:
+                handler(event)
+
+    def on_load(self, event: Event) -> None:
+        for instrument in event.value:
+            self.position[instrument] = {}
+            self._prices[instrument] = PriceHistory()
+            self._holders[instrument] = set()
+
+    # New price bar of an instrument
+    def on_price(self, event: Event) -> None:
+        self.new_day(event.timestamp)
+
+        self._prices[event.topic].append(
+            event.timestamp,
+            event.value[Candle.OPEN],
+            event.value[Candle.HIGH],
+            event.value[Candle.LOW],
+            event.value[Candle.CLOSE],
+        )
+        self._marks[event.topic] = event.value[Candle.CLOSE]
+
+        # Update results MtM of the open positions in the instrument
+        for owner in self._holders[event.topic]:
+            self.mark(owner)
+
+    # New tick of an instrument: trades mark it at their price and best quotes
+    # at the mid, or at the only side known so far
+    def on_tick(self, event: Event) -> None:
+        self.new_day(event.timestamp)
+
+        price = event.value[Order.PRICE]
+        quote = self._quotes.setdefault(event.topic, [None, None])
+
+        if event.partition == Partition.BEST_BID:
+            quote[0] = price
+        elif event.partition == Partition.BEST_ASK:
+            quote[1] = price
+
+        if event.partition in (Partition.BEST_BID, Partition.BEST_ASK):
+            bid, ask = quote
+            if bid is not None and ask is not None:
+                price = (bid + ask) / 2
+
+        self._marks[event.topic] = price
+
+        # Update results MtM of the open positions in the instrument
+        for owner in self._holders[event.topic]:
+            self.mark(owner)
+
+    # Order request of a strategy, sent to execution
+    def on_order(self, event: Event) -> None:
+        owner = event.sender
+        self.open(owner)
+        if owner not in self.position[event.topic]:
+            self.position[event.topic][owner] = 0
+
+        partition = Partition.EXECUTE
+
+        if event.partition == Partition.SELLSHORT:
+            # Check if position is 0
+            if self.position[event.topic][owner] != 0:
+                partition = OrderStatus.REJECTED
+
+        # Create the Execute Event
+        order = Event(
+            event.topic,
+            partition,
+            {
+                Order.OWNER: owner,
+                Order.QUANTITY: event.value[Order.QUANTITY],
+                Order.PRICE: event.value[Order.PRICE],
+                Order.SIDE: event.partition,
+                Order.STATUS: partition,
+            },
+            event.timestamp,
+        )
 
-                self.send(order)
+        self.send(order)
 
-            elif event.partition == OrderStatus.PARTIAL:
+    def on_partial(self, event: Event) -> None:
+        # Execution report of the fill
+        report = event.value
 
-                instrument = event.topic
-                owner = event.value[Order.OWNER]
+        # Quantity and amount already accounted for the order
+        executed, amount = self._orders.get(report.id, (0, 0))
+        self._orders[report.id] = (
+            executed + report.fill_quantity,
+            amount + report.fill_quantity * report.fill_price,
+        )
 
-                id = event.value[Order.ID]
-                price = event.value[Fill.PRICE]
-                quantity = event.value[Fill.QUANTITY]
-                side = event.value[Order.SIDE]
+        self.fill(
+            event.topic,
+            report.owner,
+            report.id,
+            report.side,
+            report.fill_quantity,
+            report.fill_price,
+            event.timestamp,
+        )
 
-                if price != 0 and quantity != 0:
+    def on_filled(self, event: Event) -> None:
+        report = event.value
 
-                    # Update Strategy position in position dictionary
-                    if instrument in self.position:
-                        if owner not in self.position[instrument]:
-                            self.position[instrument][owner] = 0
+        # Orders filled by a candle range have no PARTIAL event:
+        # account whatever was executed and not reported yet
+        executed, amount = self._orders.pop(report.id, (0, 0))
+        quantity = report.executed - executed
 
-                        self.position[instrument][owner] += event.value[Fill.QUANTITY]
+        if quantity > 0:
+            if executed == 0:
+                price = report.average
+            else:
+                price = (report.executed * report.average - amount) / quantity
+            self.fill(
+                event.topic,
+                report.owner,
+                report.id,
+                report.side,
+                quantity,
+                price,
+                event.timestamp,
+            )
 
-                    # order list of a trade. One trade may contain n orders
-                    if id not in self._trade.orders:
-                        self._trade.orders.append(id)
-                        self._trade.fee += self.fee_order
+    def open(self, owner: int) -> None:
+        """
+        Starts the accounting of a new strategy.
+        """
+        if owner not in self._trade:
+            self._trade[owner] = Trade()
+            self._trades[owner] = []
+            self._days[owner] = EquityCurve(self.init_capital)
+            self._stats[owner] = TradeStats()
+            self.avail_capital[owner] = self.init_capital
+
+    def fill(
+        self,
+        instrument: str,
+        owner: int,
+        id: int,
+        side: str,
+        quantity: int,
+        price: float,
+        timestamp,
+    ) -> None:
+        """
+        Accounts one fill in the open trade of the owner: position, cash flows, fees and
+        taxes. The trade is closed when all its positions are zeroed.
+        """
+        if price == 0 or quantity == 0:
+            return
+
+        self.open(owner)
+        trade = self._trade[owner]
+
+        # Signed quantity of the fill
+        signed = quantity if side == OrderSide.BUY else -quantity
+
+        # Update Strategy position in position dictionary
+        if instrument in self.position:
+            if owner not in self.position[instrument]:
+                self.position[instrument][owner] = 0
+
+            self.position[instrument][owner] += signed
+
+        # First fill of the trade
+        if len(trade.orders) == 0:
+            trade.timestamp = timestamp
+
+        trade.position[instrument] = trade.position.get(instrument, 0) + signed
+
+        # Strategies marked to market on the prices of the instrument
+        if instrument in self._holders:
+            if trade.position[instrument] != 0:
+                self._holders[instrument].add(owner)
+            else:
+                self._holders[instrument].discard(owner)
 
-                # if it was a BUY
-                if side == OrderSide.BUY:
+        # Instruments without price bars or ticks are marked at the fills
+        if instrument not in self._quotes and (
+            instrument not in self._prices or self._prices[instrument].last is None
+        ):
+            self._marks[instrument] = price
 
-                    # Buy Cash Flow
-                    self._trade.buy_flow -= price * quantity * self.leverage
+        # order list of a trade. One trade may contain n orders
+        if id not in trade.orders:
+            trade.orders.append(id)
+            trade.fee += self.fee_order
 
-                    # Fee and tax calculation (flow is negative)
-                    self._trade.fee += self.fee_flow * quantity * price
-                    self._trade.tax -= self.tax_flow_buy * quantity * price
+        # if it was a BUY
+        if side == OrderSide.BUY:
 
-                elif side == OrderSide.SELL or side == OrderSide.SELLSHORT:
+            # Buy Cash Flow
+            trade.buy_flow -= price * quantity * self.leverage
 
-                    # Sell Cash Flow
-                    self._trade.sell_flow = price * quantity * self.leverage
+            # Fee and tax calculation
+            trade.fee += self.fee_flow * quantity * price
+            trade.tax += self.tax_flow_buy * quantity * price
 
-                    # Fee and tax calculation (flow is positive)
-                    self._trade.fee -= self.fee_flow * quantity * price
-                    self._trade.tax = self.tax_flow_sell * quantity * price
+        elif side == OrderSide.SELL or side == OrderSide.SELLSHORT:
 
-                # Update max alloc to calculate return
-                self._trade.update_alloc()
+            # Sell Cash Flow
+            trade.sell_flow += price * quantity * self.leverage
 
-                # If the trade is completed zeroed, the trade is over
-                if self._trade.zeroed():
+            # Fee and tax calculation
+            trade.fee += self.fee_flow * quantity * price
+            trade.tax += self.tax_flow_sell * quantity * price
 
-                    # Update P&L (sum of cashflows)
-                    self._trade.pnl = self._trade.sell_flow + self._trade.buy_flow
+        # Update max alloc to calculate return
+        trade.update_alloc()
 
-                    # Revenue tax
-                    if self._trade.pnl > 0:
-                        self._trade.tax += self.tax_profit * self._trade.pnl
+        # If the trade is completed zeroed, the trade is over
+        if trade.zeroed():
 
-                    # Update capital, this is not the result, it is balance
-                    self.avail_capital += (
-                        self._trade.pnl - self._trade.tax - self._trade.fee
-                    )
+            # Update P&L (sum of cashflows)
+            trade.pnl = trade.sell_flow + trade.buy_flow
+
+            # Revenue tax
+            if trade.pnl > 0:
+                trade.tax += self.tax_profit * trade.pnl
+
+            # Update capital, this is not the result, it is balance
+            self.avail_capital[owner] += trade.pnl - trade.tax - trade.fee
+
+            # Return! Think on multi-instrument or arbitrage strategy to understand it
+            trade.ret = trade.pnl / trade.max_alloc
+
+            # Net return - including fees and taxes
+            trade.net_ret = (trade.pnl - trade.fee - trade.tax) / trade.max_alloc
+
+            # Archive the trade and start another one
+            self._trades[owner].append(trade)
+            self._stats[owner].add(trade)
 
-                    # Return! Think on multi-instrument or arbitrage strategy to understand it
-                    self._trade.ret = self._trade.pnl / self._trade.max_alloc
+            # It is always available even though it is not used
+            self._trade[owner] = Trade()
 
-                    # Net return - including fees and taxes
-                    self._trade.net_ret = (
-                        self._trade.pnl - self._trade.fee - self._trade.tax
-                    ) / self._trade.max_alloc
+        self.mark(owner)
 
-                    # Archive the trade and start another one
-                    self._trades.append(self._trade)
+    def mark(self, owner: int) -> None:
+        """
+        Marks the open trade of a strategy to market with the last prices and updates its
+        equity curve. Only the instruments of the trade are touched.
+        """
+        trade = self._trade[owner]
 
-                    # It is always available even though it is not used
-                    self._trade = Trade()
+        result = trade.sell_flow + trade.buy_flow
+        for instrument, position in trade.position.items():
+            if position != 0:
+                result += position * self._marks[instrument] * self.leverage
+
+        self._days[owner].update(self.avail_capital[owner] + result)
+
+    def new_day(self, timestamp) -> None:
+        """
+        Closes the current day of every strategy when the timestamp is in a new day.
+        """
+        day = timestamp.date()
+        if self._day is not None and day != self._day:
+            for owner in self._days:
+                self.close_day(owner)
+        self._day = day
+
+    def close_day(self, owner: int) -> None:
+        """
+        Saves the equity and the carry of the current day of a strategy: the risk-free
+        rate over the capital not allocated to the open trade.
+        """
+        if self._day is None:
+            return
+
+        daily_rate = (1 + self.risk_free_rate / 100) ** (1 / 252) - 1
+        carry = (self.avail_capital[owner] - self._trade[owner].max_alloc) * daily_rate
+
+        self._days[owner].close_day(self._day, carry, not self._trade[owner].zeroed())
+
+    def equity(self, owner: int) -> EquityCurve:
+        """
+        Equity curve of a strategy: current equity, peak and drawdown in O(1) and the daily
+        closes so far.
+        """
+        return self._days[owner]
 
     def close(self, strategy_id: int) -> None:  # close all open positions
 
-        for instrument, position in self._trade.position.items():
-            if position > 0:
-                self.submit(self.id, Order(instrument, Order.S, position, 0))
-            elif position < 0:
-                self.submit(self.id, Order(instrument, Order.B, position, 0))
+        trade = self._trade[strategy_id]
+
+        for instrument, position in trade.position.items():
+            if position != 0:
+                self.send(
+                    Event(
+                        instrument,
+                        Partition.EXECUTE,
+                        {
+                            Order.OWNER: strategy_id,
+                            Order.QUANTITY: abs(position),
+                            Order.PRICE: 0,
+                            Order.SIDE: (
+                                OrderSide.SELL if position > 0 else OrderSide.BUY
+                            ),
+                            Order.STATUS: Partition.EXECUTE,
+                        },
+                    )
+                )
 
         # Fill last item in vector days
-        max_timestamp = max(self._days.keys())
-        self._days[max_timestamp][0] = self.avail_capital + self._trade.partial_result(
-            self._last, self.leverage
+        self.close_day(strategy_id)
+
+    def metrics(self, *owners: int) -> dict:
+        """
+        Main results of the closed trades of some strategies (all by default) as numbers,
+        one row of a results table.
+        """
+        if len(owners) == 0:
+            owners = list(self._stats.keys())
+
+        stats = TradeStats()
+        for owner in owners:
+            if owner in self._stats:
+                stats = stats.merge(self._stats[owner])
+
+        return {
+            "trades": stats.pnl.count,
+            "hit_ratio": (
+                stats.win.count / stats.pnl.count if stats.pnl.count > 0 else 0.0
+            ),
+            "gross": stats.pnl.total,
+            "fee": stats.fee.total,
+            "tax": stats.tax.total,
+            "net": stats.pnl.total - stats.fee.total - stats.tax.total,
+            "max_alloc": max(stats.max_alloc.max, 0.0),
+        }
+
+    def performance(self, *owners: int) -> dict:
+        """
+        Sharpe, Sortino, Calmar, drawdown, volatility and exposure of the daily equity of
+        some strategies (all by default), computed as one batch.
+
+        Returns:
+            dict: Each metric as an array, one value per owner in owners order.
+        """
+        if len(owners) == 0:
+            owners = list(self._days.keys())
+
+        equity, exposed = analytics.stack(
+            [self._days[owner] for owner in owners], self.init_capital
+        )
+        return analytics.report(equity, exposed, self.init_capital, self.risk_free_rate)
+
+    def summary(self, strategy_id: int, structured: bool = False):
+        """
+        Results of a strategy, built in O(1) from the running trade statistics.
+
+        Parameters:
+            strategy_id (int): The owner of the trades.
+            structured (bool): Return the Summary object instead of the text report.
+
+        Returns:
+            str | Summary: The text report or the Summary.
+        """
+        summary = Summary(
+            self._stats.get(strategy_id, TradeStats()),
+            self._days.get(strategy_id, EquityCurve(self.init_capital)),
+            self.init_capital,
+            self.risk_free_rate,
+            self.margin,
         )
-        daily_rate = (1 + self.risk_free_rate / 100) ** (1 / 252) - 1
-        self._days[max_timestamp][1] = (
-            self.avail_capital - self._trade.max_alloc
-        ) * daily_rate
-
-    def summary(self, strategy_id: int) -> str:
 
-        if len(self._trades) == 0:
-            res = "No trades in the period\n\n"
-            gross = 0
-            fee = 0
-            tax = 0
-        else:
+        return summary if structured else summary.text()
+
+
+class TradeStats:
+    """
+    Running statistics of the closed trades of one strategy, updated when a trade is archived.
+    """
+
+    __slots__ = (
+        "pnl",
+        "win",
+        "loss",
+        "ret",
+        "net_ret",
+        "fee",
+        "tax",
+        "max_alloc",
+        "events",
+        "max_profit_close",
+        "max_profit_high",
+        "max_dd_close",
+        "max_dd_low",
+    )
+
+    def __init__(self) -> None:
+        for name in TradeStats.__slots__:
+            setattr(self, name, Stats())
+
+    def add(self, trade: "Trade") -> None:
+        self.pnl.add(trade.pnl)
+        if trade.pnl > 0:
+            self.win.add(trade.pnl)
+        elif trade.pnl < 0:
+            self.loss.add(trade.pnl)
+        self.ret.add(trade.ret)
+        self.net_ret.add(trade.net_ret)
+        self.fee.add(trade.fee)
+        self.tax.add(trade.tax)
+        self.max_alloc.add(trade.max_alloc)
+        self.events.add(len(trade.events))
+        self.max_profit_close.add(trade.max_profit_close)
+        self.max_profit_high.add(trade.max_profit_high)
+        self.max_dd_close.add(trade.max_dd_close)
+        self.max_dd_low.add(trade.max_dd_low)
+
+    def merge(self, other: "TradeStats") -> "TradeStats":
+        merged = TradeStats()
+        for name in TradeStats.__slots__:
+            setattr(merged, name, getattr(self, name).merge(getattr(other, name)))
+        return merged
+
+
+class Summary:
+    """
+    Results of a strategy. Values that do not exist (e.g. the average loss without losing
+    trades) are None.
+    """
+
+    def __init__(
+        self,
+        stats: TradeStats,
+        equity: EquityCurve,
+        init_capital: float,
+        risk_free_rate: float,
+        margin: float,
+    ) -> None:
+
+        def value(accumulator, attribute):
+            return getattr(accumulator, attribute) if accumulator.count > 0 else None
+
+        self.trades = stats.pnl.count
+        self.profit_trades = stats.win.count
+        self.loss_trades = stats.loss.count
+        self.hit_ratio = (
+            stats.win.count / stats.pnl.count if stats.pnl.count > 0 else None
+        )
 
-            res = ""
-            res += "Gross Profit: ${0:.2f}\n".format(
-                sum([trade.pnl for trade in self._trades if trade.pnl > 0])
-            )
-            res += "Gross Loss: ${0:.2f}\n".format(
-                sum([trade.pnl for trade in self._trades if trade.pnl < 0])
-            )
-            res += "Gross Total: ${0:.2f}\n\n".format(
-                sum([trade.pnl for trade in self._trades])
-            )
+        self.gross_profit = stats.win.total
+        self.gross_loss = stats.loss.total
+        self.gross = stats.pnl.total
+        self.fee = stats.fee.total
+        self.tax = stats.tax.total
+        self.net = self.gross - self.fee - self.tax
+
+        self.avg_events = value(stats.events, "mean")
+        self.max_win = value(stats.win, "max")
+        self.avg_win = value(stats.win, "mean")
+        self.std_win = value(stats.win, "std")
+        self.max_loss = value(stats.loss, "min")
+        self.avg_loss = value(stats.loss, "mean")
+        self.std_loss = value(stats.loss, "std")
+        self.avg_trade = value(stats.pnl, "mean")
+        self.std_trade = value(stats.pnl, "std")
+        self.win_loss_ratio = (
+            -self.avg_win / self.avg_loss
+            if stats.win.count > 0 and stats.loss.count > 0
+            else None
+        )
 
-            res += "Number of trades: {0}\n".format(len(self._trades))
-            res += "Hitting Ratio: {0:.2f}%\n".format(
-                100
-                * len([trade.pnl for trade in self._trades if trade.pnl > 0])
-                / len(self._trades)
-            )
-            res += "Number of profit trades: {0}\n".format(
-                len([trade.pnl for trade in self._trades if trade.pnl > 0])
-            )
-            res += "Number of loss trades: {0}\n".format(
-                len([trade.pnl for trade in self._trades if trade.pnl < 0])
-            )
-            res += "Average number of events per trade: {0:.2f}\n\n".format(
-                np.mean([len(trade.events) for trade in self._trades])
-            )
+        self.max_profit = value(stats.max_profit_close, "max")
+        self.max_profit_high = value(stats.max_profit_high, "max")
+        self.max_drawdown = value(stats.max_dd_close, "min")
+        self.max_drawdown_low = value(stats.max_dd_low, "min")
+
+        self.max_alloc = value(stats.max_alloc, "max")
+        self.avg_alloc = value(stats.max_alloc, "mean")
+        self.max_cash = None if self.max_alloc is None else self.max_alloc * margin
+
+        self.gross_return = stats.ret.total
+        self.avg_return = value(stats.ret, "mean")
+        self.std_return = value(stats.ret, "std")
+        self.net_return = stats.net_ret.total
+        self.avg_net_return = value(stats.net_ret, "mean")
+        self.std_net_return = value(stats.net_ret, "std")
+        self.net_return_alloc = (
+            self.net / self.avg_alloc if self.avg_alloc is not None else None
+        )
 
-            win = [trade.pnl for trade in self._trades if trade.pnl > 0]
-            loss = [trade.pnl for trade in self._trades if trade.pnl < 0]
+        self.days = len(equity)
+        self.init_capital = init_capital
+        self.risk_free_rate = risk_free_rate
+        self.daily_rate = (1 + risk_free_rate / 100) ** (1 / 252) - 1
+        self.carry = equity.carry
+        self.equity = equity.equity
+        self.equity_drawdown = equity.max_drawdown
+        self.net_carry = self.net + self.carry
+        self.return_capital = self.net_carry / init_capital
+        self.return_capital_yearly = (
+            (1 + self.return_capital) ** (252 / self.days) - 1
+            if self.days > 0
+            else None
+        )
 
-            if len(win) > 0:
-                res += "Max win trade: ${0:.2f}\n".format(max(win))
-                res += "Avg win trade: ${0:.2f}\n".format(np.mean(win))
-            else:
-                res += "Max win trade: $-\n"
-                res += "Avg win trade: $-\n"
+    def text(self) -> str:
+        """
+        The text report of the summary.
+        """
 
-            if len(loss) > 0:
-                res += "Max loss trade: ${0:.2f}\n".format(min(loss))
-                res += "Avg loss trade: ${0:.2f}\n".format(np.mean(loss))
-            else:
-                res += "Max loss trade: $-\n"
-                res += "Avg loss trade: $-\n"
+        def money(value):
+            return "$-" if value is None else "${0:.2f}".format(value)
 
-            res += "Avg all trades: ${0:.2f}\n".format(
-                np.mean([trade.pnl for trade in self._trades])
+        if self.trades == 0:
+            res = "No trades in the period\n\n"
+        else:
+            res = ""
+            res += "Gross Profit: {0}\n".format(money(self.gross_profit))
+            res += "Gross Loss: {0}\n".format(money(self.gross_loss))
+            res += "Gross Total: {0}\n\n".format(money(self.gross))
+
+            res += "Number of trades: {0}\n".format(self.trades)
+            res += "Hitting Ratio: {0:.2f}%\n".format(100 * self.hit_ratio)
+            res += "Number of profit trades: {0}\n".format(self.profit_trades)
+            res += "Number of loss trades: {0}\n".format(self.loss_trades)
+            res += "Average number of events per trade: {0:.2f}\n\n".format(
+                self.avg_events
             )
-            if len(win) > 0 and len(loss) > 0:
-                res += "Win/Loss ratio: {0:.2f}\n\n".format(
-                    -np.mean(win) / np.mean(loss)
-                )
+
+            res += "Max win trade: {0}\n".format(money(self.max_win))
+            res += "Avg win trade: {0}\n".format(money(self.avg_win))
+            res += "Max loss trade: {0}\n".format(money(self.max_loss))
+            res += "Avg loss trade: {0}\n".format(money(self.avg_loss))
+            res += "Avg all trades: {0}\n".format(money(self.avg_trade))
+            if self.win_loss_ratio is not None:
+                res += "Win/Loss ratio: {0:.2f}\n\n".format(self.win_loss_ratio)
             else:
                 res += "Win/Loss ratio: -\n\n"
 
-            res += "Max Profit: ${0:.2f}\n".format(
-                max([trade.max_profit_close for trade in self._trades])
-            )
-            res += "Max Profit High/Low: ${0:.2f}\n".format(
-                max([trade.max_profit_high for trade in self._trades])
-            )
-            res += "Max Drawdown: ${0:.2f}\n".format(
-                min([trade.max_dd_close for trade in self._trades])
-            )
-            res += "Max Drawdown High/Low: ${0:.2f}\n\n".format(
-                min([trade.max_dd_low for trade in self._trades])
-            )
-
-            max_alloc = max([trade.max_alloc for trade in self._trades])
-            res += "Max Allocation: ${0:.2f}\n".format(max_alloc)
-            res += "Avg Allocation: ${0:.2f}\n".format(
-                np.mean([trade.max_alloc for trade in self._trades])
-            )
-            res += "Max Cash Required (margin): ${0:.2f}\n\n".format(
-                max_alloc * self.margin
-            )
+            res += "Max Profit: {0}\n".format(money(self.max_profit))
+            res += "Max Profit High/Low: {0}\n".format(money(self.max_profit_high))
+            res += "Max Drawdown: {0}\n".format(money(self.max_drawdown))
+            res += "Max Drawdown High/Low: {0}\n\n".format(money(self.max_drawdown_low))
 
-            gross = sum([trade.pnl for trade in self._trades])
-            fee = sum([trade.fee for trade in self._trades])
-            tax = sum([trade.tax for trade in self._trades])
+            res += "Max Allocation: {0}\n".format(money(self.max_alloc))
+            res += "Avg Allocation: {0}\n".format(money(self.avg_alloc))
+            res += "Max Cash Required (margin): {0}\n\n".format(money(self.max_cash))
 
-            res += "Gross Total: ${0:.2f}\n".format(gross)
-            res += "Total Fees: ${0:.2f}\n".format(fee)
-            res += "Total Taxes: ${0:.2f}\n".format(tax)
-            res += "Net Total: ${0:.2f}\n\n".format(gross - fee - tax)
+            res += "Gross Total: {0}\n".format(money(self.gross))
+            res += "Total Fees: {0}\n".format(money(self.fee))
+            res += "Total Taxes: {0}\n".format(money(self.tax))
+            res += "Net Total: {0}\n\n".format(money(self.net))
 
-            res += "Gross Return: {0:.2f}%\n".format(
-                100 * sum([trade.ret for trade in self._trades])
-            )
-            res += "Average Return: {0:.2f}%\n".format(
-                100 * np.mean([trade.ret for trade in self._trades])
-            )
-            res += "Net Return: {0:.2f}%\n".format(
-                100 * sum([trade.net_ret for trade in self._trades])
-            )
+            res += "Gross Return: {0:.2f}%\n".format(100 * self.gross_return)
+            res += "Average Return: {0:.2f}%\n".format(100 * self.avg_return)
+            res += "Net Return: {0:.2f}%\n".format(100 * self.net_return)
             res += "Net Return Avg Alocation: {0:.2f}%\n\n".format(
-                100
-                * (gross - fee - tax)
-                / np.mean([trade.max_alloc for trade in self._trades])
+                100 * self.net_return_alloc
             )
 
-        res += "Number of days: {}\n".format(len(self._days))
-        res += "Initial Capital: ${0:.2f}\n".format(self.init_capital)
-        daily_rate = (1 + self.risk_free_rate / 100) ** (1 / 252) - 1
+        res += "Number of days: {}\n".format(self.days)
+        res += "Initial Capital: {0}\n".format(money(self.init_capital))
         res += "Risk Free Rate: {0:.2f}% yearly/{1:.4f}% daily\n".format(
-            self.risk_free_rate, 100 * daily_rate
-        )
-        carry = sum([day[1] for day in self._days.values()])
-        res += "Total Carry: ${0:.2f}\n".format(carry)
-        res += "Net Total + Carry: ${0:.2f}\n".format(gross - fee - tax + carry)
-        ret_cap = (gross - fee - tax + carry) / self.init_capital
-        res += "Net Return Capital: {0:.2f}%\n".format(100 * ret_cap)
-        res += "Net Return Capital Yearly: {0:.2f}%\n\n".format(
-            100 * ((1 + ret_cap) ** (252 / len(self._days)) - 1)
+            self.risk_free_rate, 100 * self.daily_rate
         )
+        res += "Total Carry: {0}\n".format(money(self.carry))
+        res += "Max Drawdown Equity: {0}\n".format(money(self.equity_drawdown))
+        res += "Net Total + Carry: {0}\n".format(money(self.net_carry))
+        res += "Net Return Capital: {0:.2f}%\n".format(100 * self.return_capital)
+        if self.return_capital_yearly is not None:
+            res += "Net Return Capital Yearly: {0:.2f}%\n\n".format(
+                100 * self.return_capital_yearly
+            )
+        else:
+            res += "Net Return Capital Yearly: -\n\n"
 
         return res
 
 
 class Trade:
+    __slots__ = (
+        "timestamp",
+        "position",
+        "orders",
+        "fee",
+        "tax",
+        "avg_sell_price",
+        "avg_buy_price",
+        "sell_flow",
+        "buy_flow",
+        "max_alloc",
+        "ret",
+        "net_ret",
+        "max_profit_high",
+        "max_profit_close",
+        "max_dd_low",
+        "max_dd_close",
+        "events",
+        "pnl",
+    )
+
     def __init__(self):
         self.timestamp = ""
         self.position = {}
@@ -328,6 +693,7 @@ class Trade:
         self.max_dd_low = 0
         self.max_dd_close = 0
         self.events = []
+        self.pnl = 0
 
     def zeroed(self):
         for pos in self.position.values():
@@ -339,20 +705,18 @@ class Trade:
         alloc = self.sell_flow + self.buy_flow
         self.max_alloc = max(max(self.max_alloc, alloc), -alloc)
 
-    def partial_result(self, prices, leverage):
+    # Mark to market with the last bar of each instrument
+    # prices is the dict of PriceHistory by instrument
+    def partial_result(self, prices, leverage, field=Candle.CLOSE):
         result = self.sell_flow + self.buy_flow
         for instrument in self.position:
-            result += self.position[instrument] * prices[instrument][3] * leverage
+            result += (
+                self.position[instrument] * prices[instrument].last[field] * leverage
+            )
         return result
 
     def partial_result_high(self, prices, leverage):
-        result = self.sell_flow + self.buy_flow
-        for instrument in self.position:
-            result += self.position[instrument] * prices[instrument][1] * leverage
-        return result
+        return self.partial_result(prices, leverage, Candle.HIGH)
 
     def partial_result_low(self, prices, leverage):
-        result = self.sell_flow + self.buy_flow
-        for instrument in self.position:
-            result += self.position[instrument] * prices[instrument][2] * leverage
-        return result
+        return self.partial_result(prices, leverage, Candle.LOW)
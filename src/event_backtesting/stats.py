@@ -0,0 +1,76 @@
+from math import inf, sqrt
+
+
+class Stats:
+    """
+    Running statistics of a stream of numbers, updated in O(1) per value: count, sum,
+    minimum, maximum and the Welford mean and variance.
+
+    Attributes:
+        count (int): Number of values.
+        total (float): Sum of the values.
+        min (float): Smallest value, inf if there is none.
+        max (float): Largest value, -inf if there is none.
+        mean (float): Mean of the values, 0 if there is none.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "mean", "_m2")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = inf
+        self.max = -inf
+        self.mean = 0.0
+
+        # Sum of the squared distances to the mean
+        self._m2 = 0.0
+
+    def __repr__(self) -> str:
+        return "{0} values, mean {1:.6f}, std {2:.6f}".format(
+            self.count, self.mean, self.std
+        )
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, other: "Stats") -> "Stats":
+        """
+        Statistics of the values of both accumulators (Chan et al. parallel update).
+        """
+        merged = Stats()
+        merged.count = self.count + other.count
+        merged.total = self.total + other.total
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+
+        if merged.count > 0:
+            delta = other.mean - self.mean
+            merged.mean = self.mean + delta * other.count / merged.count
+            merged._m2 = (
+                self._m2
+                + other._m2
+                + delta * delta * self.count * other.count / merged.count
+            )
+
+        return merged
+
+    @property
+    def variance(self) -> float:
+        """
+        Sample variance, 0 with less than two values.
+        """
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return sqrt(self.variance)
@@ -0,0 +1,218 @@
+from event_backtesting.constants import partition_code, partition_name
+from event_backtesting.market_data import (
+    MarketData,
+    columns_parser,
+    read_rows,
+    to_timestamp,
+    CHUNK_SIZE,
+)
+from datetime import datetime
+import numpy as np
+import json
+
+# File layout:
+#   [magic][header length][json header] padded to HEADER_SIZE bytes
+#   [fixed-width records sorted by timestamp]
+#   [sparse index: timestamp of every STRIDE-th record]
+MAGIC = b"EBTSTORE"
+STORE_VERSION = 1
+HEADER_SIZE = 4096
+
+# One index entry every STRIDE records
+STRIDE = 1024
+
+
+def record_dtype(fields: list) -> np.dtype:
+    """
+    Fixed-width record: int64 timestamp, int8 partition code and one field per column.
+    """
+    return np.dtype(
+        [("timestamp", "<i8"), ("code", "i1")]
+        + [(name, dtype) for name, _, dtype in fields]
+    )
+
+
+def convert(
+    source: str,
+    type: str,
+    csv_file: str,
+    store_file: str,
+    stride: int = STRIDE,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """
+    Converts a Bloomberg TICK/INTR or Yahoo HIST file into a tick store. The csv file is read
+    in chunks and must be sorted by time.
+
+    Returns:
+        int: The number of records written.
+
+    Raises:
+        ValueError: If the rows of the csv file are not sorted by time.
+    """
+    parse = columns_parser(source, type)
+
+    partitions = []
+    fields = None
+    index = []
+    count = 0
+    last = None
+
+    with open(store_file, "wb") as file:
+        # Room for the header, written when the size is known
+        file.write(b"\0" * HEADER_SIZE)
+
+        for rows in read_rows(csv_file, chunk_size):
+            data = parse("", rows)
+            if len(data) == 0:
+                continue
+
+            if fields is None:
+                fields = [
+                    ("c{0}".format(i), key, column.dtype.str)
+                    for i, (key, column) in enumerate(data.columns.items())
+                ]
+                dtype = record_dtype(fields)
+
+            if np.any(np.diff(data.timestamp) < 0) or (
+                last is not None and data.timestamp[0] < last
+            ):
+                raise ValueError("The rows of {0} are not sorted.".format(csv_file))
+            last = data.timestamp[-1]
+
+            # Partition codes of the chunk to codes of the store
+            for name in data.partitions:
+                if name not in partitions:
+                    partitions.append(name)
+            lookup = np.array(
+                [partitions.index(name) for name in data.partitions], dtype=np.int8
+            )
+
+            records = np.empty(len(data), dtype=dtype)
+            records["timestamp"] = data.timestamp
+            records["code"] = lookup[data.code]
+            for name, key, _ in fields:
+                records[name] = data.columns[key]
+
+            # Index entries that fall inside this chunk
+            first = -count % stride
+            index.append(data.timestamp[first::stride])
+
+            file.write(records.tobytes())
+            count += len(data)
+
+        index_offset = file.tell()
+        if len(index) > 0:
+            file.write(np.concatenate(index).astype("<i8").tobytes())
+
+        header = json.dumps(
+            {
+                "version": STORE_VERSION,
+                "partitions": [partition_name(code) for code in partitions],
+                "fields": fields or [],
+                "count": count,
+                "stride": stride,
+                "index_offset": index_offset,
+            }
+        ).encode()
+
+        if len(MAGIC) + 4 + len(header) > HEADER_SIZE:
+            raise ValueError("Header of {0} is too large.".format(store_file))
+
+        file.seek(0)
+        file.write(MAGIC + len(header).to_bytes(4, "little") + header)
+
+    return count
+
+
+class TickStore:
+    """
+    Memory-mapped store of the fixed-width records of one instrument. A sparse index with
+    the timestamp of every stride-th record lets a time range be found with two binary
+    searches, so only the pages inside the range are ever read.
+
+    Attributes:
+        file_name (str): Path of the store file.
+        partitions (list[int]): Partitions, indexed by the record codes.
+        fields (list): (record field, column key, dtype) of each column.
+        stride (int): Number of records between index entries.
+        records (np.ndarray): Memory-mapped records.
+        index (np.ndarray): Memory-mapped sparse timestamp index.
+
+    Raises:
+        ValueError: If the file is not a tick store.
+    """
+
+    def __init__(self, file_name: str) -> None:
+        self.file_name = file_name
+
+        with open(file_name, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{0} is not a tick store.".format(file_name))
+            size = int.from_bytes(file.read(4), "little")
+            header = json.loads(file.read(size))
+
+        self.partitions = [partition_code(name) for name in header["partitions"]]
+        self.fields = [tuple(field) for field in header["fields"]]
+        self.stride = header["stride"]
+
+        count = header["count"]
+        dtype = record_dtype(self.fields)
+
+        if count == 0:
+            self.records = np.empty(0, dtype=dtype)
+            self.index = np.empty(0, dtype=np.int64)
+        else:
+            self.records = np.memmap(
+                file_name, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,)
+            )
+            self.index = np.memmap(
+                file_name,
+                dtype="<i8",
+                mode="r",
+                offset=header["index_offset"],
+                shape=((count - 1) // self.stride + 1,),
+            )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def search(self, timestamp: int, side: str = "left") -> int:
+        """
+        Binary search of a timestamp, first in the sparse index and then inside one block.
+
+        Parameters:
+            timestamp (int): Timestamp in microseconds since the epoch.
+            side (str): "left" for the first record >= timestamp, "right" for the first > timestamp.
+
+        Returns:
+            int: The record position.
+        """
+        block = np.searchsorted(self.index, timestamp, side)
+
+        # The position is between the previous index entry and this one
+        low = max(block - 1, 0) * self.stride
+        high = min(block * self.stride, len(self.records))
+
+        return low + int(
+            np.searchsorted(self.records["timestamp"][low:high], timestamp, side)
+        )
+
+    def read(
+        self, instrument: str, start: datetime = None, end: datetime = None
+    ) -> MarketData:
+        """
+        Returns the records with start <= timestamp < end as MarketData. The columns are
+        views of the memory-mapped file, nothing is copied.
+        """
+        low = 0 if start is None else self.search(to_timestamp(start))
+        high = len(self.records) if end is None else self.search(to_timestamp(end))
+        records = self.records[low : max(low, high)]
+
+        return MarketData(
+            instrument,
+            self.partitions,
+            records["timestamp"],
+            records["code"],
+            {key: records[name] for name, key, _ in self.fields},
+        )
@@ -0,0 +1,194 @@
+from event_processing.event import Event
+from event_backtesting.constants import *
+from event_backtesting.dispatch import Dispatcher
+from event_backtesting.book import Book
+from event_backtesting.risk import Risk
+from event_backtesting.execution import Execution
+from event_backtesting.data_manager import DataManager
+from event_backtesting.cache import read_columns, write_columns
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+import tempfile
+import shutil
+import os
+
+
+def share(data: dict, folder: str) -> list:
+    """
+    Saves the columns of each instrument as .npy files, one sub folder per instrument, so
+    every worker can memory-map them instead of receiving a copy.
+
+    Returns:
+        list: (instrument, sub folder, columns meta) in LOAD order.
+    """
+    shared = []
+    for i, (instrument, columns) in enumerate(data.items()):
+        path = os.path.join(folder, str(i))
+        shared.append((instrument, path, write_columns(columns, path)))
+    return shared
+
+
+def attach(shared: list) -> dict:
+    """
+    Memory-maps the columns saved by share(). The pages are shared by all the processes.
+    """
+    return {
+        instrument: read_columns(instrument, path, meta)
+        for instrument, path, meta in shared
+    }
+
+
+def run(shared: list, strategy: type, params: list) -> list:
+    """
+    Runs several parameterizations in one replay of the shared data: one Dispatcher, one
+    Book per instrument and one Risk and Execution for all of them. Each strategy is a
+    different owner, so its orders and accounting are isolated from the others.
+
+    Returns:
+        list[dict]: For each parameter set, the parameters, the Risk metrics of its
+            strategies and the Risk summary of each instrument.
+    """
+    engine = Dispatcher()
+    risk = Risk()
+    execution = Execution()
+
+    manager = DataManager(columnar=True)
+    manager.events = attach(shared)
+
+    # One strategy per parameter set and instrument
+    strategies = [
+        {instrument: strategy(instrument, **values) for instrument in manager.events}
+        for values in params
+    ]
+
+    engine.subscribe(risk, Topic.SYSTEM)
+    for instrument in manager.events:
+        for subscriber in [Book(instrument), risk, execution]:
+            engine.subscribe(subscriber, instrument)
+        for group in strategies:
+            engine.subscribe(group[instrument], instrument)
+
+    engine.inject(Event(Topic.SYSTEM, Partition.LOAD, list(manager.events)))
+
+    # Replay directly into the engine, one event at a time
+    for event in manager.replay():
+        engine.inject(event)
+
+    rows = []
+    for values, group in zip(params, strategies):
+        owners = [subscriber.id for subscriber in group.values()]
+        rows.append(
+            {
+                **values,
+                **risk.metrics(*owners),
+                "summary": {
+                    instrument: risk.summary(subscriber.id)
+                    for instrument, subscriber in group.items()
+                },
+            }
+        )
+    return rows
+
+
+def sweep(
+    instruments: dict,
+    strategy: type,
+    params: list,
+    workers: int = 1,
+    executor: str = Executor.PROCESS,
+    group: int = None,
+    manager: DataManager = None,
+    folder: str = None,
+) -> list:
+    """
+    Runs a strategy once per parameter set over the same data. The data is loaded once,
+    saved as .npy columns and memory-mapped by every run, so the workers never send the
+    dataset to each other, only the parameters and the results. Each run replays the data
+    once for a group of parameter sets.
+
+    Parameters:
+        instruments (dict): The LOAD event value, instrument -> data spec.
+        strategy (type): Strategy class, created as strategy(instrument, **params) for
+            each instrument. It must be importable by the worker processes.
+        params (list[dict]): The parameter sets.
+        workers (int): Number of runs in parallel.
+        executor (str): Executor.PROCESS or Executor.THREAD.
+        group (int): Parameter sets per replay. Defaults to an even split among the workers.
+        manager (DataManager): Columnar DataManager used for the LOAD, e.g. with cache or
+            parallel loading. Defaults to DataManager(columnar=True).
+        folder (str): Where the columns are saved. Defaults to a temporary folder that is
+            removed at the end.
+
+    Returns:
+        list[dict]: One row per parameter set, in params order.
+
+    Raises:
+        ValueError: If the DataManager is not columnar or is streaming.
+    """
+    if manager is None:
+        manager = DataManager(columnar=True)
+    if not manager.columnar or manager.streaming:
+        raise ValueError("The sweep needs a columnar DataManager without streaming.")
+
+    manager.receive(Event(Topic.SYSTEM, Partition.LOAD, instruments))
+
+    temporary = folder is None
+    if temporary:
+        folder = tempfile.mkdtemp(prefix="sweep")
+
+    try:
+        shared = share(manager.events, folder)
+
+        # The parent does not need its copy anymore
+        manager.events = {}
+
+        if group is None:
+            group = max(-(-len(params) // max(workers, 1)), 1)
+        groups = [params[i : i + group] for i in range(0, len(params), group)]
+
+        args = (repeat(shared), repeat(strategy), groups)
+
+        if workers > 1 and executor == Executor.THREAD:
+            with ThreadPoolExecutor(workers) as pool:
+                results = list(pool.map(run, *args))
+
+        elif workers > 1 and executor == Executor.PROCESS:
+            with ProcessPoolExecutor(workers) as pool:
+                results = list(pool.map(run, *args))
+
+        else:
+            results = list(map(run, *args))
+
+        return [row for rows in results for row in rows]
+
+    finally:
+        if temporary:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def table(rows: list, columns: list = None) -> str:
+    """
+    Formats the rows of a sweep as a text table. Defaults to every column but the summary.
+    """
+    if len(rows) == 0:
+        return ""
+
+    if columns is None:
+        columns = [key for key in rows[0] if key != "summary"]
+
+    def cell(value):
+        if isinstance(value, float):
+            return "{0:.2f}".format(value)
+        return str(value)
+
+    cells = [[cell(row[key]) for key in columns] for row in rows]
+    widths = [
+        max([len(key)] + [len(line[i]) for line in cells])
+        for i, key in enumerate(columns)
+    ]
+
+    lines = [" ".join(key.rjust(width) for key, width in zip(columns, widths))]
+    for line in cells:
+        lines.append(" ".join(value.rjust(width) for value, width in zip(line, widths)))
+
+    return "\n".join(lines)
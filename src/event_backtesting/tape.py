@@ -0,0 +1,151 @@
+from event_backtesting.order import Trade
+from datetime import datetime, timedelta
+import numpy as np
+
+# Initial number of trades of the preallocated columns
+CAPACITY = 1024
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class TradeTape:
+    """
+    Trades of one instrument kept in preallocated NumPy columns (int64 timestamp in microseconds,
+    float64 price and int64 quantity) instead of a list of Trade objects. The live trades are
+    always one contiguous slice of the columns, so every query returns views.
+
+    Retention is unbounded by default, or the last size trades, or the trades of the last
+    seconds seconds (trades must be appended in time order).
+
+    Attributes:
+        instrument (str): The instrument of the trades.
+        size (int): Maximum number of trades kept, or None.
+        seconds (float): Maximum age of the trades kept, relative to the last one, or None.
+    """
+
+    def __init__(
+        self,
+        instrument: str,
+        size: int = None,
+        seconds: float = None,
+        capacity: int = CAPACITY,
+    ) -> None:
+        self.instrument = instrument
+        self.size = size
+        self.seconds = seconds
+
+        if size is not None:
+            capacity = max(min(capacity, 2 * size), 1)
+
+        self._timestamp = np.empty(capacity, dtype=np.int64)
+        self._price = np.empty(capacity, dtype=np.float64)
+        self._quantity = np.empty(capacity, dtype=np.int64)
+
+        # Live trades are [start, end)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, i: int) -> Trade:
+        """
+        Builds the Trade object of the i-th live trade (negative indexes count from the end).
+        """
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("Trade index out of range.")
+
+        i += self._start
+        return Trade(
+            EPOCH + int(self._timestamp[i]) * MICROSECOND,
+            self.instrument,
+            int(self._quantity[i]),
+            float(self._price[i]),
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return "{0}: {1} trades".format(self.instrument, len(self))
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self._timestamp[self._start : self._end]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self._price[self._start : self._end]
+
+    @property
+    def quantity(self) -> np.ndarray:
+        return self._quantity[self._start : self._end]
+
+    def append(self, timestamp: datetime, quantity: int, price: float) -> None:
+        if self._end == len(self._timestamp):
+            self._make_room()
+
+        timestamp = (timestamp - EPOCH) // MICROSECOND
+
+        self._timestamp[self._end] = timestamp
+        self._price[self._end] = price
+        self._quantity[self._end] = quantity
+        self._end += 1
+
+        # Retention
+        if self.size is not None and len(self) > self.size:
+            self._start = self._end - self.size
+        if self.seconds is not None:
+            oldest = timestamp - int(self.seconds * 1_000_000)
+            self._start += int(np.searchsorted(self.timestamp, oldest, "left"))
+
+    def _make_room(self) -> None:
+        count = len(self)
+
+        # Move the live trades to the front if they use half of the columns or less,
+        # otherwise double the columns
+        if count > len(self._timestamp) // 2:
+            capacity = 2 * len(self._timestamp)
+        else:
+            capacity = len(self._timestamp)
+
+        for name in ["_timestamp", "_price", "_quantity"]:
+            column = getattr(self, name)
+            if capacity != len(column):
+                new = np.empty(capacity, dtype=column.dtype)
+            else:
+                new = column
+            new[:count] = column[self._start : self._end]
+            setattr(self, name, new)
+
+        self._start = 0
+        self._end = count
+
+    def search(self, timestamp: datetime, side: str = "left") -> int:
+        """
+        Binary search of a timestamp among the live trades.
+        """
+        timestamp = (timestamp - EPOCH) // MICROSECOND
+        return int(np.searchsorted(self.timestamp, timestamp, side))
+
+    def between(self, start: datetime = None, end: datetime = None) -> tuple:
+        """
+        Trades with start <= timestamp < end, found by binary search.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Views (not copies) of the timestamp,
+                price and quantity columns.
+        """
+        low = 0 if start is None else self.search(start)
+        high = len(self) if end is None else self.search(end)
+        high = max(low, high)
+
+        return (
+            self.timestamp[low:high],
+            self.price[low:high],
+            self.quantity[low:high],
+        )
@@ -0,0 +1,221 @@
+from event_backtesting.market_data import MarketData
+from event_backtesting.risk import Trade
+from event_backtesting.constants import *
+from datetime import datetime, timedelta
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# First number of bars scanned for the fill of a resting order, doubled until found
+WINDOW = 64
+
+# Fill kinds, in the order the event path reports them inside one bar:
+# resting orders matched by the candle range, then orders filled on arrival
+RANGE, ARRIVAL = 0, 1
+
+
+class Result:
+    """
+    Output of a vectorized backtest.
+
+    Attributes:
+        fills (np.ndarray): One record per fill, in event order: bar of the order, bar of the
+            fill, signed quantity and price.
+        trades (list[Trade]): Closed trades, the same Trade objects Risk archives.
+        capital (float): Available capital after the closed trades.
+    """
+
+    def __init__(self, fills: np.ndarray, trades: list, capital: float) -> None:
+        self.fills = fills
+        self.trades = trades
+        self.capital = capital
+
+    def __repr__(self) -> str:
+        return "{0} fills, {1} trades, capital ${2:.2f}".format(
+            len(self.fills), len(self.trades), self.capital
+        )
+
+
+def first_inside(low: np.ndarray, high: np.ndarray, price: float, start: int) -> int:
+    """
+    First bar from start whose low/high range contains price, or -1. Scans windows of bars
+    that double in size, so a fill close to the order does not touch the whole array.
+    """
+    size = WINDOW
+    while start < len(low):
+        end = min(start + size, len(low))
+        inside = np.flatnonzero((low[start:end] <= price) & (price <= high[start:end]))
+        if len(inside) > 0:
+            return start + int(inside[0])
+        start = end
+        size *= 2
+    return -1
+
+
+def match(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    quantity: np.ndarray,
+    price: np.ndarray,
+) -> np.ndarray:
+    """
+    Fills of one order per bar with the semantics of Book in candle mode: the candle sets
+    bid and ask at the close with infinite liquidity, so a market order (price 0) or a limit
+    order crossing the close is filled at the close on arrival. Any other order rests and is
+    filled at its own price by the first later candle whose low/high range contains it
+    (Book.try_match_range).
+
+    Parameters:
+        quantity (np.ndarray): Signed order quantity of each bar (> 0 buy, < 0 sell, 0 none).
+        price (np.ndarray): Limit price of each bar, 0 for market orders.
+
+    Returns:
+        np.ndarray: Fill records sorted in event order.
+    """
+    quantity = np.asarray(quantity, dtype=np.int64)
+    price = np.asarray(price, dtype=np.float64)
+
+    bars = np.flatnonzero(quantity != 0)
+    buy = quantity[bars] > 0
+    limit = price[bars]
+
+    # Filled on arrival at the close of the bar
+    arrival = (limit == 0) | np.where(buy, limit >= close[bars], limit <= close[bars])
+
+    fill_bar = np.where(arrival, bars, -1)
+    fill_price = np.where(arrival, close[bars], limit)
+
+    # Resting orders, matched by a later candle range
+    for i in np.flatnonzero(~arrival):
+        fill_bar[i] = first_inside(low, high, limit[i], bars[i] + 1)
+
+    fills = np.empty(
+        int(np.count_nonzero(fill_bar >= 0)),
+        dtype=[
+            ("order", "i8"),
+            ("bar", "i8"),
+            ("kind", "i1"),
+            ("quantity", "i8"),
+            ("price", "f8"),
+        ],
+    )
+    filled = fill_bar >= 0
+    fills["order"] = bars[filled]
+    fills["bar"] = fill_bar[filled]
+    fills["kind"] = np.where(arrival[filled], ARRIVAL, RANGE)
+    fills["quantity"] = quantity[bars][filled]
+    fills["price"] = fill_price[filled]
+
+    # Event order: bar, range fills before arrivals, then placement order
+    return fills[np.lexsort((fills["order"], fills["kind"], fills["bar"]))]
+
+
+def account(
+    fills: np.ndarray,
+    timestamp: np.ndarray,
+    fee_order: float = ORDER_FEE,
+    fee_flow: float = FLOW_FEE,
+    tax_flow_buy: float = FLOW_BUY_TAX,
+    tax_flow_sell: float = FLOW_SELL_TAX,
+    tax_profit: float = PROFIT_TAX,
+    leverage: float = LEVERAGE,
+) -> list:
+    """
+    Splits the fills into trades where the position returns to zero and computes the Risk
+    accounting of each trade with segment reductions: cash flows, fees, taxes, P&L, maximum
+    allocation and returns. An open trade at the end is not returned, as in Risk. The orders
+    of a trade are identified by the bar they were sent on instead of an Order id.
+
+    Returns:
+        list[Trade]: The closed trades.
+    """
+    position = np.cumsum(fills["quantity"])
+
+    # A trade ends on each fill that zeroes the position
+    ends = np.flatnonzero(position == 0)
+    if len(ends) == 0:
+        return []
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    fills = fills[: ends[-1] + 1]
+
+    quantity = np.abs(fills["quantity"])
+    volume = fills["price"] * quantity
+    buy = fills["quantity"] > 0
+
+    # Cash flows of each fill
+    buy_flow = np.where(buy, -(fills["price"] * quantity * leverage), 0.0)
+    sell_flow = np.where(buy, 0.0, fills["price"] * quantity * leverage)
+    fee = fee_order + fee_flow * volume
+    tax = np.where(buy, tax_flow_buy, tax_flow_sell) * volume
+
+    buy_flow = np.add.reduceat(buy_flow, starts)
+    sell_flow = np.add.reduceat(sell_flow, starts)
+    fee = np.add.reduceat(fee, starts)
+    tax = np.add.reduceat(tax, starts)
+    pnl = sell_flow + buy_flow
+    tax = np.where(pnl > 0, tax + tax_profit * pnl, tax)
+
+    # Running allocation inside each trade
+    flow = np.cumsum(np.where(buy, -volume, volume) * leverage)
+    offset = np.repeat(np.concatenate(([0.0], flow[ends[:-1]])), ends - starts + 1)
+    max_alloc = np.maximum.reduceat(np.abs(flow - offset), starts)
+
+    trades = []
+    for i, start in enumerate(starts):
+        trade = Trade()
+        trade.timestamp = EPOCH + int(timestamp[fills["bar"][start]]) * MICROSECOND
+        trade.orders = fills["order"][start : ends[i] + 1].tolist()
+        trade.position = {}
+        trade.buy_flow = float(buy_flow[i])
+        trade.sell_flow = float(sell_flow[i])
+        trade.fee = float(fee[i])
+        trade.tax = float(tax[i])
+        trade.pnl = float(pnl[i])
+        trade.max_alloc = float(max_alloc[i])
+        trade.ret = trade.pnl / trade.max_alloc
+        trade.net_ret = (trade.pnl - trade.fee - trade.tax) / trade.max_alloc
+        trades.append(trade)
+
+    return trades
+
+
+def backtest(
+    data: MarketData,
+    quantity: np.ndarray,
+    price: np.ndarray,
+    capital: float = INITIAL_CAPITAL,
+    **costs
+) -> Result:
+    """
+    Bar-mode backtest of one instrument without the event engine: the orders of a signal
+    strategy are matched against the candles as the Book does and accounted as Risk does,
+    with array operations. For a strategy that sends at most one order per candle, the fills
+    and trades are the ones of the event path.
+
+    Parameters:
+        data (MarketData): Candles (Yahoo HIST or Bloomberg INTR) sorted by time.
+        quantity (np.ndarray): Signed order quantity sent on each candle, 0 for none.
+        price (np.ndarray): Limit price of each order, 0 for market orders.
+        capital (float): Initial capital.
+        costs: Fee, tax and leverage overrides, see account().
+
+    Returns:
+        Result: Fills, closed trades and final capital.
+    """
+    if len(quantity) != len(data) or len(price) != len(data):
+        raise ValueError("One order quantity and price per candle is required.")
+
+    fills = match(
+        data.columns[Candle.HIGH],
+        data.columns[Candle.LOW],
+        data.columns[Candle.CLOSE],
+        quantity,
+        price,
+    )
+    trades = account(fills, data.timestamp, **costs)
+
+    capital += sum(trade.pnl - trade.tax - trade.fee for trade in trades)
+
+    return Result(fills, trades, capital)
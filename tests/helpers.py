@@ -0,0 +1,112 @@
+import numpy as np
+from event_processing.event import Event
+from event_processing.engine import Engine
+from event_processing.subscriber import Subscriber
+
+from src.event_backtesting.book import Book
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.execution import Execution
+from src.event_backtesting.market_data import MarketData
+from src.event_backtesting.order import Order
+from src.event_backtesting.constants import *
+
+
+def write_ticks(file_name, rows):
+    # Bloomberg tick file, one row per second cycling BID, ASK and TRADE
+    with open(file_name, "w") as file:
+        file.write("DATA;ACAO;VALOR;VOLUME\n")
+        for i in range(rows):
+            file.write(
+                "01/10/2018 10:{0:02d}:{1:02d};{2};59,{3:02d};{4}\n".format(
+                    i // 60, i % 60, ["BID", "ASK", "TRADE"][i % 3], i % 100, 100 + i
+                )
+            )
+
+
+def candles(count, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 + np.cumsum(rng.normal(0, 0.2, count)).round(2)
+    open = np.concatenate(([20.0], close[:-1]))
+    high = np.maximum(open, close) + rng.uniform(0, 0.3, count).round(2)
+    low = np.minimum(open, close) - rng.uniform(0, 0.3, count).round(2)
+
+    return MarketData(
+        "PETR4",
+        [Partition.CANDLE],
+        np.datetime64("2020-01-01", "us").astype(np.int64)
+        + np.arange(count, dtype=np.int64) * 60_000_000,
+        np.zeros(count, dtype=np.int8),
+        {
+            Candle.OPEN: open,
+            Candle.HIGH: high,
+            Candle.LOW: low,
+            Candle.CLOSE: close,
+            Candle.VOLUME: np.full(count, 1000, dtype=np.int64),
+        },
+    )
+
+
+def signals(data, seed=0):
+    rng = np.random.default_rng(seed)
+    count = len(data)
+
+    # Orders on a tenth of the bars, alternating sides, half market and half limit
+    quantity = np.zeros(count, dtype=np.int64)
+    bars = np.flatnonzero(rng.random(count) < 0.1)
+    quantity[bars] = np.where(np.arange(len(bars)) % 2 == 0, 100, -100)
+
+    price = np.zeros(count)
+    limit = bars[rng.random(len(bars)) < 0.5]
+    price[limit] = (
+        data.columns[Candle.CLOSE][limit] + rng.normal(0, 0.3, len(limit))
+    ).round(2)
+
+    return quantity, price
+
+
+class SignalStrategy(Subscriber):
+    def __init__(self, instrument, quantity, price, short=False):
+        self.instrument = instrument
+        self.quantity = quantity
+        self.price = price
+        self.short = short
+        self.bar = 0
+
+    def receive(self, event):
+        if event.topic == self.instrument and event.partition == Partition.CANDLE:
+            quantity = int(self.quantity[self.bar])
+            if quantity != 0:
+                if quantity > 0:
+                    side = Partition.BUY
+                else:
+                    side = Partition.SELLSHORT if self.short else Partition.SELL
+                self.send(
+                    Event(
+                        self.instrument,
+                        side,
+                        {
+                            Order.QUANTITY: abs(quantity),
+                            Order.PRICE: float(self.price[self.bar]),
+                        },
+                        event.timestamp,
+                    )
+                )
+            self.bar += 1
+
+
+def run_events(data, quantity, price, short=False):
+    engine = Engine()
+    book = Book(data.instrument)
+    risk = Risk()
+    execution = Execution()
+    strategy = SignalStrategy(data.instrument, quantity, price, short)
+
+    for subscriber in [book, risk, execution, strategy]:
+        engine.subscribe(subscriber, data.instrument)
+    engine.subscribe(risk, Topic.SYSTEM)
+
+    engine.inject(Event(Topic.SYSTEM, Partition.LOAD, [data.instrument]))
+    for event in data.events():
+        engine.inject(event)
+
+    return risk, strategy.id
@@ -0,0 +1,155 @@
+import pytest
+import warnings
+import numpy as np
+from datetime import datetime
+from event_processing.event import Event
+
+from src.event_backtesting import analytics
+from src.event_backtesting.equity import EquityCurve
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.constants import *
+
+
+def curves(strategies, days, seed=0):
+    rng = np.random.default_rng(seed)
+    daily = rng.normal(0.0005, 0.01, (strategies, days))
+    return INITIAL_CAPITAL * np.cumprod(1 + daily, axis=-1)
+
+
+def test_drawdown_matches_loop():
+    equity = curves(1, 300)[0]
+
+    peak = equity[0]
+    expected = []
+    for value in equity:
+        peak = max(peak, value)
+        expected.append(value / peak - 1)
+
+    assert analytics.underwater(equity) == pytest.approx(expected)
+    assert analytics.max_drawdown(equity) == pytest.approx(min(expected))
+
+
+def test_ratios_match_definitions():
+    equity = curves(1, 500)[0]
+    daily = np.diff(equity) / equity[:-1]
+    risk_free = analytics.daily_rate(10)
+
+    excess = daily - risk_free
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2))
+    assert analytics.sharpe(daily, risk_free) == pytest.approx(
+        excess.mean() / excess.std(ddof=1) * np.sqrt(252)
+    )
+    assert analytics.sortino(daily, risk_free) == pytest.approx(
+        excess.mean() / downside * np.sqrt(252)
+    )
+
+    years = (len(equity) - 1) / 252
+    cagr = (equity[-1] / equity[0]) ** (1 / years) - 1
+    assert analytics.calmar(equity) == pytest.approx(
+        cagr / -analytics.max_drawdown(equity)
+    )
+
+
+@pytest.mark.parametrize("window", [2, 21, 63])
+def test_rolling_volatility(window):
+    daily = analytics.returns(curves(2, 400))
+    volatility = analytics.rolling_volatility(daily, window)
+
+    windows = np.lib.stride_tricks.sliding_window_view(daily, window, axis=-1)
+    expected = windows.std(axis=-1, ddof=1) * np.sqrt(252)
+
+    assert np.isnan(volatility[:, : window - 1]).all()
+    assert volatility[:, window - 1 :] == pytest.approx(expected)
+
+
+def test_rolling_volatility_window():
+    daily = analytics.returns(curves(2, 10))
+
+    for window in [1, 0, -3]:
+        with pytest.raises(ValueError):
+            analytics.rolling_volatility(daily, window)
+
+    # Longer than the data: no full window
+    for window in [10, 50]:
+        volatility = analytics.rolling_volatility(daily, window)
+        assert volatility.shape == daily.shape
+        assert np.isnan(volatility).all()
+
+    assert not np.isnan(analytics.rolling_volatility(daily, 9)[:, -1]).any()
+
+
+def test_batch_matches_each_strategy():
+    equity = curves(5, 250)
+    exposed = np.random.default_rng(1).random((5, 250)) > 0.5
+
+    batch = analytics.report(equity, exposed)
+    for i in range(len(equity)):
+        single = analytics.report(equity[i], exposed[i])
+        for key, value in single.items():
+            assert batch[key][i] == pytest.approx(value)
+
+
+def test_stack_pads_late_strategies():
+    first = EquityCurve(100.0)
+    second = EquityCurve(100.0)
+
+    for day in range(1, 4):
+        first.update(100.0 + day)
+        first.close_day(datetime(2020, 1, day), 0.0, True)
+    second.update(90.0)
+    second.close_day(datetime(2020, 1, 3), 0.0, True)
+
+    equity, exposed = analytics.stack([first, second], 100.0)
+    assert equity.tolist() == [[101.0, 102.0, 103.0], [100.0, 100.0, 90.0]]
+    assert analytics.exposure(exposed).tolist() == [1.0, 1 / 3]
+
+
+def test_short_curves_are_nan():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+
+        # No time has passed with a single point
+        assert np.isnan(analytics.cagr([INITIAL_CAPITAL]))
+        assert np.isnan(analytics.cagr(np.full((3, 1), INITIAL_CAPITAL))).all()
+
+        # Empty curve: only the initial capital
+        empty = analytics.report([])
+        assert empty["return"] == 0.0
+        for key in ["cagr", "volatility", "sharpe", "sortino", "calmar"]:
+            assert np.isnan(empty[key])
+
+        # One point: a single return has no standard deviation
+        single = analytics.report([INITIAL_CAPITAL * 0.99])
+        assert single["return"] == pytest.approx(-0.01)
+        assert single["max_drawdown"] == pytest.approx(-0.01)
+        assert np.isnan(single["volatility"]) and np.isnan(single["sharpe"])
+
+
+def test_performance_without_days():
+    risk = Risk()
+    risk.receive(Event(Topic.SYSTEM, Partition.LOAD, ["PETR4"]))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+
+        # No strategies
+        assert all(len(value) == 0 for value in risk.performance().values())
+
+        # A strategy without any closed day
+        risk.open(1)
+        performance = risk.performance(1)
+        assert performance["return"].tolist() == [0.0]
+        assert np.isnan(performance["cagr"]).all()
+        assert np.isnan(performance["sharpe"]).all()
+
+
+def test_calmar_without_drawdown():
+    rising = INITIAL_CAPITAL * np.linspace(1.0, 1.2, 300)
+    flat = np.full(300, INITIAL_CAPITAL)
+
+    assert analytics.max_drawdown(rising) == 0.0
+    assert analytics.calmar(rising) == np.inf
+    assert np.isnan(analytics.calmar(flat))
+
+    batch = analytics.calmar(np.stack([rising, flat, curves(1, 300)[0]]))
+    assert batch[0] == np.inf and np.isnan(batch[1]) and np.isfinite(batch[2])
@@ -0,0 +1,70 @@
+import pytest
+from event_processing.event import Event
+
+from src.event_backtesting.data_manager import DataManager
+from src.event_backtesting.constants import *
+from benchmarks.generate import dataset, write
+from benchmarks import generate
+from benchmarks.run import FORMATS, main, compare
+
+
+@pytest.mark.parametrize("format", list(FORMATS))
+def test_synthetic_files_load(tmp_path, format):
+    source, type = FORMATS[format]
+    specs = dataset(str(tmp_path), source, type, 1001, instruments=2)
+    assert list(specs) == ["SYN0", "SYN1"]
+
+    for columnar in [False, True]:
+        manager = DataManager(columnar=columnar)
+        manager.receive(Event(Topic.SYSTEM, Partition.LOAD, specs))
+        assert sorted(len(data) for data in manager.events.values()) == [500, 501]
+
+        timestamps = [event.timestamp for event in manager.replay()]
+        assert timestamps == sorted(timestamps)
+
+
+@pytest.mark.parametrize("format", ["intr", "hist"])
+def test_prices_continue_across_blocks(tmp_path, monkeypatch, format):
+    monkeypatch.setattr(generate, "BLOCK", 100)
+
+    source, type = FORMATS[format]
+    file_name = str(tmp_path / "data.csv")
+    write(file_name, source, type, 350)
+
+    manager = DataManager(columnar=True)
+    data = manager.load(
+        "SYN0", {Data.SOURCE: source, Data.TYPE: type, Data.FILE: file_name}
+    )
+    open, close = data.columns[Candle.OPEN], data.columns[Candle.CLOSE]
+
+    # Each bar opens at the previous close, also at the first row of each block
+    assert len(data) == 350
+    assert open[0] == generate.PRICE
+    assert (open[1:] == close[:-1]).all()
+
+
+def test_benchmark_report(tmp_path):
+    output = str(tmp_path / "results.json")
+    report = main(
+        [
+            "--rows=200",
+            "--formats=intr",
+            "--pending=10",
+            "--trades=10",
+            "--repeat=1",
+            "--folder={0}".format(tmp_path),
+            "--output={0}".format(output),
+        ]
+    )
+
+    names = {row["benchmark"] for row in report["results"]}
+    assert names == {
+        "data_manager.load",
+        "data_manager.run",
+        "book.try_fill_orders",
+        "book.try_match_range",
+        "risk.fill",
+        "risk.summary",
+    }
+    assert all(row["seconds"] > 0 for row in report["results"])
+    assert compare(report, report).count("1.00x") == len(report["results"])
@@ -6,6 +6,7 @@ from datetime import datetime
 
 # from event_processing.subscriber import Subscriber
 from src.event_backtesting.book import Book
+from src.event_backtesting.data_manager import DataManager
 from src.event_backtesting.order import Order, OrderStatus, OrderSide
 from src.event_backtesting.constants import *
 
@@ -96,10 +97,11 @@ def test_event_subscription_and_dispatch():
     engine.inject(order)
 
     # Verify the placement
-    # It starts with id 5 because of the book formation before
+    # Quotes take no order ids, so the orders below get consecutive ids
+    order_id = mock_subscriber.received_events[-3].value[Order.ID]
     assert mock_subscriber.received_events[-3].topic == topic
     assert mock_subscriber.received_events[-3].partition == OrderStatus.NEW
-    assert mock_subscriber.received_events[-3].value[Order.ID] == 5
+    assert mock_subscriber.received_events[-3].value[Order.ID] == order_id
     assert mock_subscriber.received_events[-3].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-3].value[Order.STATUS] == OrderStatus.NEW
     assert mock_subscriber.received_events[-3].value[Order.QUANTITY] == 10
@@ -112,7 +114,7 @@ def test_event_subscription_and_dispatch():
     # The fill
     assert mock_subscriber.received_events[-2].topic == topic
     assert mock_subscriber.received_events[-2].partition == OrderStatus.PARTIAL
-    assert mock_subscriber.received_events[-2].value[Order.ID] == 5
+    assert mock_subscriber.received_events[-2].value[Order.ID] == order_id
     assert mock_subscriber.received_events[-2].value[Order.OWNER] == "me"
     assert (
         mock_subscriber.received_events[-2].value[Order.STATUS] == OrderStatus.PARTIAL
@@ -129,7 +131,7 @@ def test_event_subscription_and_dispatch():
     # Verify the termination
     assert mock_subscriber.received_events[-1].topic == topic
     assert mock_subscriber.received_events[-1].partition == OrderStatus.FILLED
-    assert mock_subscriber.received_events[-1].value[Order.ID] == 5
+    assert mock_subscriber.received_events[-1].value[Order.ID] == order_id
     assert mock_subscriber.received_events[-1].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-1].value[Order.STATUS] == OrderStatus.FILLED
     assert mock_subscriber.received_events[-1].value[Order.QUANTITY] == 10
@@ -156,7 +158,7 @@ def test_event_subscription_and_dispatch():
 
     assert mock_subscriber.received_events[-3].topic == topic
     assert mock_subscriber.received_events[-3].partition == OrderStatus.NEW
-    assert mock_subscriber.received_events[-3].value[Order.ID] == 6
+    assert mock_subscriber.received_events[-3].value[Order.ID] == order_id + 1
     assert mock_subscriber.received_events[-3].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-3].value[Order.STATUS] == OrderStatus.NEW
     assert mock_subscriber.received_events[-3].value[Order.QUANTITY] == 30
@@ -169,7 +171,7 @@ def test_event_subscription_and_dispatch():
     # The fill
     assert mock_subscriber.received_events[-2].topic == topic
     assert mock_subscriber.received_events[-2].partition == OrderStatus.PARTIAL
-    assert mock_subscriber.received_events[-2].value[Order.ID] == 6
+    assert mock_subscriber.received_events[-2].value[Order.ID] == order_id + 1
     assert mock_subscriber.received_events[-2].value[Order.OWNER] == "me"
     assert (
         mock_subscriber.received_events[-2].value[Order.STATUS] == OrderStatus.PARTIAL
@@ -186,7 +188,7 @@ def test_event_subscription_and_dispatch():
     # Verify the termination
     assert mock_subscriber.received_events[-1].topic == topic
     assert mock_subscriber.received_events[-1].partition == OrderStatus.FILLED
-    assert mock_subscriber.received_events[-1].value[Order.ID] == 6
+    assert mock_subscriber.received_events[-1].value[Order.ID] == order_id + 1
     assert mock_subscriber.received_events[-1].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-1].value[Order.STATUS] == OrderStatus.FILLED
     assert mock_subscriber.received_events[-1].value[Order.QUANTITY] == 30
@@ -213,7 +215,7 @@ def test_event_subscription_and_dispatch():
     # Verify the placement
     assert mock_subscriber.received_events[-3].topic == topic
     assert mock_subscriber.received_events[-3].partition == OrderStatus.NEW
-    assert mock_subscriber.received_events[-3].value[Order.ID] == 7
+    assert mock_subscriber.received_events[-3].value[Order.ID] == order_id + 2
     assert mock_subscriber.received_events[-3].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-3].value[Order.STATUS] == OrderStatus.NEW
     assert mock_subscriber.received_events[-3].value[Order.QUANTITY] == 5
@@ -226,7 +228,7 @@ def test_event_subscription_and_dispatch():
     # Verify the order filling
     assert mock_subscriber.received_events[-1].topic == topic
     assert mock_subscriber.received_events[-1].partition == OrderStatus.FILLED
-    assert mock_subscriber.received_events[-2].value[Order.ID] == 7
+    assert mock_subscriber.received_events[-2].value[Order.ID] == order_id + 2
     assert mock_subscriber.received_events[-1].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-1].value[Order.STATUS] == OrderStatus.FILLED
     assert mock_subscriber.received_events[-1].value[Order.QUANTITY] == 5
@@ -253,14 +255,14 @@ def test_event_subscription_and_dispatch():
     # Verify last fill
     # There is an event between each test (thats why it is -3)
     assert mock_subscriber.received_events[-3].partition == OrderStatus.FILLED
-    assert mock_subscriber.received_events[-3].value[Order.ID] == 7
+    assert mock_subscriber.received_events[-3].value[Order.ID] == order_id + 2
     assert mock_subscriber.received_events[-3].value[Order.TIMESTAMP] == timestamp
     assert mock_subscriber.received_events[-3].timestamp == timestamp
 
     # Verify the placement
     assert mock_subscriber.received_events[-1].topic == topic
     assert mock_subscriber.received_events[-1].partition == OrderStatus.NEW
-    assert mock_subscriber.received_events[-1].value[Order.ID] == 8
+    assert mock_subscriber.received_events[-1].value[Order.ID] == order_id + 3
     assert mock_subscriber.received_events[-1].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-1].value[Order.STATUS] == OrderStatus.NEW
     assert mock_subscriber.received_events[-1].value[Order.QUANTITY] == 15
@@ -272,7 +274,7 @@ def test_event_subscription_and_dispatch():
 
     # Verify pending orders
     assert len(book.orders) == 1
-    assert book.orders[8].status == OrderStatus.NEW
+    assert book.orders[order_id + 3].status == OrderStatus.NEW
 
     # send an ask and partial fill
     ask = Event(
@@ -285,7 +287,7 @@ def test_event_subscription_and_dispatch():
 
     assert mock_subscriber.received_events[-1].topic == topic
     assert mock_subscriber.received_events[-1].partition == OrderStatus.PARTIAL
-    assert mock_subscriber.received_events[-1].value[Order.ID] == 8
+    assert mock_subscriber.received_events[-1].value[Order.ID] == order_id + 3
     assert mock_subscriber.received_events[-1].value[Order.OWNER] == "me"
     assert (
         mock_subscriber.received_events[-1].value[Order.STATUS] == OrderStatus.PARTIAL
@@ -299,7 +301,7 @@ def test_event_subscription_and_dispatch():
 
     # Verify pending orders
     assert len(book.orders) == 1
-    assert book.orders[8].status == OrderStatus.PARTIAL
+    assert book.orders[order_id + 3].status == OrderStatus.PARTIAL
 
     # New ask and fill the partial filled order
 
@@ -314,7 +316,7 @@ def test_event_subscription_and_dispatch():
 
     assert mock_subscriber.received_events[-1].topic == topic
     assert mock_subscriber.received_events[-1].partition == OrderStatus.FILLED
-    assert mock_subscriber.received_events[-1].value[Order.ID] == 8
+    assert mock_subscriber.received_events[-1].value[Order.ID] == order_id + 3
     assert mock_subscriber.received_events[-1].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-1].value[Order.STATUS] == OrderStatus.FILLED
     assert mock_subscriber.received_events[-1].value[Order.QUANTITY] == 15
@@ -335,7 +337,7 @@ def test_event_subscription_and_dispatch():
     )
     engine.inject(ask)
 
-    assert mock_subscriber.received_events[-2].value[Order.ID] == 8
+    assert mock_subscriber.received_events[-2].value[Order.ID] == order_id + 3
     assert mock_subscriber.received_events[-2].value[Order.EXECUTED] == 15
     assert mock_subscriber.received_events[-2].value[Order.TIMESTAMP] == timestamp
     assert mock_subscriber.received_events[-2].timestamp == timestamp
@@ -391,7 +393,7 @@ def test_event_subscription_and_dispatch():
 
     assert mock_subscriber.received_events[-2].topic == topic
     assert mock_subscriber.received_events[-2].partition == OrderStatus.FILLED
-    assert mock_subscriber.received_events[-2].value[Order.ID] == 12
+    assert mock_subscriber.received_events[-2].value[Order.ID] == order_id + 4
     assert mock_subscriber.received_events[-2].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-2].value[Order.STATUS] == OrderStatus.FILLED
     assert mock_subscriber.received_events[-2].value[Order.QUANTITY] == 30
@@ -403,7 +405,7 @@ def test_event_subscription_and_dispatch():
 
     assert mock_subscriber.received_events[-1].topic == topic
     assert mock_subscriber.received_events[-1].partition == OrderStatus.FILLED
-    assert mock_subscriber.received_events[-1].value[Order.ID] == 13
+    assert mock_subscriber.received_events[-1].value[Order.ID] == order_id + 5
     assert mock_subscriber.received_events[-1].value[Order.OWNER] == "me"
     assert mock_subscriber.received_events[-1].value[Order.STATUS] == OrderStatus.FILLED
     assert mock_subscriber.received_events[-1].value[Order.QUANTITY] == 40
@@ -414,3 +416,306 @@ def test_event_subscription_and_dispatch():
     assert mock_subscriber.received_events[-1].timestamp == timestamp
 
     # TODO: bid/ask/trade events
+
+
+def test_limit_order_book_levels():
+    topic = "instrument"
+    timestamp = datetime.now()
+
+    engine = Engine()
+    book = Book(topic)
+    engine.subscribe(book, topic)
+
+    def level(partition, price, quantity):
+        engine.inject(
+            Event(
+                topic,
+                partition,
+                {Order.QUANTITY: quantity, Order.PRICE: price},
+                timestamp,
+            )
+        )
+
+    level(Partition.BID, 10.00, 100)
+    level(Partition.BID, 10.02, 200)
+    level(Partition.BID, 10.01, 300)
+    level(Partition.ASK, 10.05, 100)
+    level(Partition.ASK, 10.03, 200)
+    level(Partition.ASK, 10.04, 300)
+
+    # Best price first
+    assert [(o.price, o.quantity) for o in book.bids] == [
+        (10.02, 200),
+        (10.01, 300),
+        (10.00, 100),
+    ]
+    assert [(o.price, o.quantity) for o in book.asks] == [
+        (10.03, 200),
+        (10.04, 300),
+        (10.05, 100),
+    ]
+
+    # Update and delete levels
+    level(Partition.BID, 10.01, 50)
+    level(Partition.BID, 10.02, 0)
+    level(Partition.ASK, 10.06, 0)
+    assert [(o.price, o.quantity) for o in book.bids] == [(10.01, 50), (10.00, 100)]
+    assert book.bids.best().price == 10.01
+    assert len(book.asks) == 3
+
+    class MockSubscriber(Subscriber):
+        def __init__(self):
+            self.received_events = []
+
+        def receive(self, event: Event):
+            self.received_events.append(event)
+
+    mock_subscriber = MockSubscriber()
+    engine.subscribe(mock_subscriber, topic)
+
+    # Market order walks the ask levels
+    engine.inject(
+        Event(
+            topic,
+            Partition.ORDER,
+            {
+                Order.OWNER: "me",
+                Order.SIDE: OrderSide.BUY,
+                Order.QUANTITY: 400,
+                Order.PRICE: 0,
+            },
+            timestamp,
+        )
+    )
+
+    fills = [
+        (event.value[Fill.QUANTITY], event.value[Fill.PRICE])
+        for event in mock_subscriber.received_events
+        if event.partition == OrderStatus.PARTIAL
+    ]
+    assert fills == [(200, 10.03), (200, 10.04)]
+    assert mock_subscriber.received_events[-1].partition == OrderStatus.FILLED
+    assert mock_subscriber.received_events[-1].value[Order.AVERAGE] == pytest.approx(
+        10.035
+    )
+
+    # Limit sell resting in the book, filled when a bid level crosses it
+    engine.inject(
+        Event(
+            topic,
+            Partition.ORDER,
+            {
+                Order.OWNER: "me",
+                Order.SIDE: OrderSide.SELL,
+                Order.QUANTITY: 100,
+                Order.PRICE: 10.02,
+            },
+            timestamp,
+        )
+    )
+    assert len(book.orders) == 1
+
+    level(Partition.BID, 10.02, 60)
+    assert len(book.orders) == 1
+    assert mock_subscriber.received_events[-1].partition == OrderStatus.PARTIAL
+    assert mock_subscriber.received_events[-1].value[Fill.QUANTITY] == 60
+
+    level(Partition.BID, 10.03, 40)
+    assert len(book.orders) == 0
+    assert mock_subscriber.received_events[-1].partition == OrderStatus.FILLED
+    assert mock_subscriber.received_events[-1].value[Order.EXECUTED] == 100
+
+
+def test_pending_orders_price_index():
+    topic = "instrument"
+    timestamp = datetime.now()
+
+    engine = Engine()
+    book = Book(topic)
+    engine.subscribe(book, topic)
+
+    class MockSubscriber(Subscriber):
+        def __init__(self):
+            self.received_events = []
+
+        def receive(self, event: Event):
+            self.received_events.append(event)
+
+    mock_subscriber = MockSubscriber()
+    engine.subscribe(mock_subscriber, topic)
+
+    def order(side, price):
+        engine.inject(
+            Event(
+                topic,
+                Partition.ORDER,
+                {
+                    Order.OWNER: "me",
+                    Order.SIDE: side,
+                    Order.QUANTITY: 10,
+                    Order.PRICE: price,
+                },
+                timestamp,
+            )
+        )
+        return mock_subscriber.received_events[-1].value[Order.ID]
+
+    # A ladder of resting orders on both sides
+    buys = {order(OrderSide.BUY, 9.0 + i / 10): 9.0 + i / 10 for i in range(10)}
+    sells = {order(OrderSide.SELL, 11.0 + i / 10): 11.0 + i / 10 for i in range(10)}
+    assert len(book.orders) == 20
+    assert len(book.pending[OrderSide.BUY]) == 10
+    assert len(book.pending[OrderSide.SELL]) == 10
+
+    # Candle range crossing the top of both ladders
+    engine.inject(
+        Event(
+            topic,
+            Partition.CANDLE,
+            {
+                Candle.OPEN: 10,
+                Candle.HIGH: 11.25,
+                Candle.LOW: 9.75,
+                Candle.CLOSE: 10,
+                Candle.VOLUME: 0,
+            },
+            timestamp,
+        )
+    )
+
+    filled = [
+        event.value[Order.ID]
+        for event in mock_subscriber.received_events
+        if event.partition == OrderStatus.FILLED
+    ]
+    expected = [id for id, price in buys.items() if price >= 9.75]
+    expected += [id for id, price in sells.items() if price <= 11.25]
+    assert filled == sorted(expected)
+    assert len(book.orders) == 20 - len(expected)
+
+    # A bid at 11.45 only reaches the sells up to that price
+    del mock_subscriber.received_events[:]
+    engine.inject(
+        Event(
+            topic,
+            Partition.BEST_BID,
+            {Order.QUANTITY: 0, Order.PRICE: 11.45},
+            timestamp,
+        )
+    )
+    filled = [
+        event.value[Order.ID]
+        for event in mock_subscriber.received_events
+        if event.partition == OrderStatus.FILLED
+    ]
+    assert filled == [id for id, price in sells.items() if 11.25 < price <= 11.45]
+    assert all(order.price > 11.45 for order in book.pending[OrderSide.SELL])
+
+
+def test_quotes_updated_in_place():
+    topic = "instrument"
+    timestamp = datetime(2020, 1, 1, 10)
+
+    engine = Engine()
+    book = Book(topic)
+    engine.subscribe(book, topic)
+
+    for close in [10.0, 10.5, 9.5]:
+        engine.inject(
+            Event(
+                topic,
+                Partition.CANDLE,
+                {
+                    Candle.OPEN: close,
+                    Candle.HIGH: close,
+                    Candle.LOW: close,
+                    Candle.CLOSE: close,
+                    Candle.VOLUME: 100,
+                },
+                timestamp,
+            )
+        )
+        if close == 10.0:
+            bid, ask = book.bids[0], book.asks[0]
+
+    # Same quote objects, updated in place
+    assert book.bids[0] is bid
+    assert book.asks[0] is ask
+    assert bid.price == 9.5 and bid.quantity == 0
+    assert len(book.bids) == 1 and len(book.asks) == 1
+
+    # A best bid replaces the side with the same quote
+    engine.inject(
+        Event(
+            topic,
+            Partition.BEST_BID,
+            {Order.QUANTITY: 300, Order.PRICE: 9.4},
+            timestamp,
+        )
+    )
+    assert book.bids[0] is bid
+    assert book.bids.get(9.4).quantity == 300
+    assert book.bids.get(9.5) is None
+
+    # Quotes take no order ids: consecutive orders get consecutive ids
+    class MockSubscriber(Subscriber):
+        def __init__(self):
+            self.received_events: list[Event] = []
+
+        def receive(self, event: Event):
+            self.received_events.append(event)
+
+    mock_subscriber = MockSubscriber()
+    engine.subscribe(mock_subscriber, topic)
+
+    ids = []
+    for price in [9.0, 11.0]:
+        engine.inject(
+            Event(
+                topic,
+                Partition.ORDER,
+                {
+                    Order.OWNER: "me",
+                    Order.SIDE: OrderSide.BUY,
+                    Order.QUANTITY: 10,
+                    Order.PRICE: 8.0,
+                },
+                timestamp,
+            )
+        )
+        ids.append(mock_subscriber.received_events[-1].value[Order.ID])
+        engine.inject(
+            Event(
+                topic,
+                Partition.BEST_ASK,
+                {Order.QUANTITY: 100, Order.PRICE: price},
+                timestamp,
+            )
+        )
+
+    assert ids[1] == ids[0] + 1
+
+
+def test_bloomberg_quotes_replace_top_of_book():
+    topic = "PETR4"
+
+    engine = Engine()
+    book = Book(topic)
+    engine.subscribe(book, topic)
+
+    events = DataManager().load_bloomberg_tick(topic, "./tests/2018-10-01.csv")
+    assert {event.partition for event in events} >= {
+        Partition.BEST_BID,
+        Partition.BEST_ASK,
+    }
+
+    # Each BID/ASK row is the new best quote, old prices do not stay as levels
+    for event in events:
+        engine.inject(event)
+        if event.partition == Partition.BEST_BID:
+            assert len(book.bids) == 1
+            assert book.bids[0].price == event.value[Order.PRICE]
+            assert book.bids[0].quantity == event.value[Order.QUANTITY]
+        elif event.partition == Partition.BEST_ASK:
+            assert len(book.asks) == 1
+            assert book.asks[0].price == event.value[Order.PRICE]
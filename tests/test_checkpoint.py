@@ -0,0 +1,132 @@
+import pytest
+from event_processing.event import Event
+from event_processing.engine import Engine
+
+from src.event_backtesting.book import Book
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.execution import Execution
+from src.event_backtesting.data_manager import DataManager
+from src.event_backtesting.dispatch import Dispatcher
+from src.event_backtesting.checkpoint import Checkpoint
+from src.event_backtesting.constants import *
+from tests.helpers import signals, SignalStrategy
+from benchmarks.generate import write
+
+
+def spec(file_name):
+    return {
+        "SYN": {
+            Data.SOURCE: DataSource.BLOOMBERG,
+            Data.TYPE: DataType.INTR,
+            Data.FILE: str(file_name),
+        }
+    }
+
+
+def simulation(specs, engine, columnar):
+    manager = DataManager(columnar=columnar)
+    manager.receive(Event(Topic.SYSTEM, Partition.LOAD, specs))
+
+    data = DataManager(columnar=True).load("SYN", specs["SYN"])
+    quantity, price = signals(data, 0)
+
+    risk = Risk()
+    strategy = SignalStrategy("SYN", quantity, price)
+    for subscriber in [Book("SYN"), risk, Execution(), strategy]:
+        engine.subscribe(subscriber, "SYN")
+    engine.subscribe(risk, Topic.SYSTEM)
+    engine.inject(Event(Topic.SYSTEM, Partition.LOAD, list(specs)))
+
+    return Checkpoint(engine, manager), risk, strategy
+
+
+def parts(checkpoint):
+    subscribers = checkpoint.subscribers.values()
+    risk = [s for s in subscribers if type(s).__name__ == "Risk"][0]
+    book = [s for s in subscribers if type(s).__name__ == "Book"][0]
+    strategy = [s for s in subscribers if type(s).__name__ == "SignalStrategy"][0]
+    return risk, book, strategy
+
+
+@pytest.mark.parametrize(
+    "engine, columnar", [(Engine, False), (Engine, True), (Dispatcher, True)]
+)
+def test_resume_matches_full_run(tmp_path, engine, columnar):
+    file = tmp_path / "intr.csv"
+    write(str(file), DataSource.BLOOMBERG, DataType.INTR, 600)
+    specs = spec(file)
+
+    checkpoint, risk, strategy = simulation(specs, engine(), columnar)
+    assert checkpoint.run() == 600
+    expected = risk.summary(strategy.id)
+
+    # Stop in the middle and throw everything away
+    snapshot = str(tmp_path / "snapshot.pkl")
+    checkpoint, _, _ = simulation(specs, engine(), columnar)
+    assert checkpoint.run(every=100, file_name=snapshot, limit=250) == 250
+    del checkpoint
+
+    resumed = Checkpoint.resume(snapshot)
+    assert isinstance(resumed.engine, engine)
+    assert resumed.run() == 350
+
+    risk, book, strategy = parts(resumed)
+    assert strategy.bar == 600
+    assert risk.summary(strategy.id) == expected
+
+
+def test_resume_new_day(tmp_path):
+    file = tmp_path / "intr.csv"
+    write(str(file), DataSource.BLOOMBERG, DataType.INTR, 600)
+    rows = open(file).read().split("\n")
+
+    # The history without its last 100 rows
+    history = tmp_path / "history.csv"
+    history.write_text("\n".join(rows[:501]) + "\n")
+
+    snapshot = str(tmp_path / "snapshot.pkl")
+    checkpoint, _, _ = simulation(spec(file), Engine(), True)
+    checkpoint.manager.receive(Event(Topic.SYSTEM, Partition.LOAD, spec(history)))
+    assert checkpoint.run(file_name=snapshot) == 500
+
+    # Only the new rows are replayed
+    resumed = Checkpoint.resume(snapshot, spec(file))
+    assert resumed.run() == 100
+
+    risk, book, strategy = parts(resumed)
+    assert strategy.bar == 600
+    assert len(book.trades) == 600
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"columnar": True}, {"streaming": True}], ids=str
+)
+def test_replay_cursor(options):
+    manager = DataManager(**options)
+    manager.receive(
+        Event(
+            Topic.SYSTEM,
+            Partition.LOAD,
+            {
+                "A": {
+                    Data.SOURCE: DataSource.BLOOMBERG,
+                    Data.TYPE: DataType.TICK,
+                    Data.FILE: "./tests/2018-10-01.csv",
+                },
+                "B": {
+                    Data.SOURCE: DataSource.BLOOMBERG,
+                    Data.TYPE: DataType.TICK,
+                    Data.FILE: "./tests/2018-10-01.csv",
+                },
+            },
+        )
+    )
+
+    def rows(events):
+        return [(e.topic, e.partition, e.value, e.timestamp) for e in events]
+
+    full = rows(manager.replay())
+    for k in [1, 7, 40, 41, len(full)]:
+        timestamp = full[k - 1][3]
+        seen = sum(1 for row in full[:k] if row[3] == timestamp)
+        assert rows(manager.replay((timestamp, seen))) == full[k:]
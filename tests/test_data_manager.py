@@ -3,11 +3,19 @@ from event_processing.event import Event
 from event_processing.engine import Engine
 from event_processing.subscriber import Subscriber
 from datetime import datetime
+import numpy as np
+import json
+import os
 
 from src.event_backtesting.data_manager import DataManager
 from src.event_backtesting.book import Book
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.execution import Execution
+from src.event_backtesting.dispatch import Dispatcher
 from src.event_backtesting.order import Order, OrderStatus, OrderSide
+from src.event_backtesting.cache import cache_dir, KEY_FILE
 from src.event_backtesting.constants import *
+from tests.helpers import write_ticks
 
 
 def test_data_load_and_run():
@@ -88,4 +96,516 @@ def test_data_load_and_run():
     assert book.trades[-1].price == 59.72
 
 
-# TODO: blooberg intr and yahoo hist (other functions)
+def assert_same_events(events, expected):
+    assert len(events) == len(expected)
+    for event, other in zip(events, expected):
+        assert event.topic == other.topic
+        assert event.partition == other.partition
+        assert event.value == other.value
+        assert event.timestamp == other.timestamp
+
+
+def test_columnar_load_matches_rows(tmp_path):
+    dm = DataManager(columnar=True)
+
+    intr = tmp_path / "intr.csv"
+    intr.write_text(
+        "DATA;ABERTURA;FECHAMENTO;MAXIMO;MINIMO\n"
+        "01/10/2018 10:05:00;59,68;59,72;59,80;59,60\n"
+        "01/10/2018 10:06:00;59,72;59,70;59,75;59,65\n"
+    )
+    yahoo = tmp_path / "yahoo.csv"
+    yahoo.write_text(
+        "Date,Open,High,Low,Close,Adj Close,Volume\n"
+        "2018-10-01,10.5,11.0,10.0,10.8,10.7,1000\n"
+        "2018-10-02,null,null,null,null,null,null\n"
+        "2018-10-03,10.8,11.2,10.6,11.1,11.0,2000\n"
+    )
+
+    for source, type, file, load in [
+        (
+            DataSource.BLOOMBERG,
+            DataType.TICK,
+            "./tests/2018-10-01.csv",
+            dm.load_bloomberg_tick,
+        ),
+        (DataSource.BLOOMBERG, DataType.INTR, str(intr), dm.load_bloomberg_intr),
+        (DataSource.YAHOO, DataType.HIST, str(yahoo), dm.load_yahoo_hist),
+    ]:
+        data = dm.load_columns(
+            "instrument", {Data.SOURCE: source, Data.TYPE: type, Data.FILE: file}
+        )
+        assert_same_events(list(data.events()), load("instrument", file))
+
+
+def test_columnar_run():
+    instrument = "instrument"
+
+    engine = Engine()
+    dm = DataManager(columnar=True)
+    engine.subscribe(dm, Topic.SYSTEM)
+
+    book = Book(instrument)
+    engine.subscribe(book, instrument)
+
+    engine.inject(
+        Event(
+            Topic.SYSTEM,
+            Partition.LOAD,
+            {
+                instrument: {
+                    Data.SOURCE: DataSource.BLOOMBERG,
+                    Data.TYPE: DataType.TICK,
+                    Data.FILE: "./tests/2018-10-01.csv",
+                },
+            },
+        )
+    )
+    assert len(dm.events) == 1
+
+    engine.inject(Event(Topic.SYSTEM, Partition.RUN, None))
+
+    assert book.bids[0].price == 59.72
+    assert book.bids[0].quantity == 300
+    assert book.asks[0].price == 59.95
+    assert book.asks[0].quantity == 99
+    assert len(book.trades) == 4
+    assert book.trades[-1].price == 59.72
+
+
+def test_columnar_cache(tmp_path):
+    file = tmp_path / "tick.csv"
+    file.write_bytes(open("./tests/2018-10-01.csv", "rb").read())
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: str(file),
+    }
+
+    dm = DataManager(cache=True)
+    parsed = dm.load_columns("instrument", spec)
+    assert not isinstance(parsed.timestamp, np.memmap)
+
+    # Second load is memory-mapped from the cache
+    cached = dm.load_columns("other", spec)
+    assert isinstance(cached.timestamp, np.memmap)
+    assert cached.instrument == "other"
+    assert cached.partitions == parsed.partitions
+    assert (cached.timestamp == parsed.timestamp).all()
+    assert (cached.columns[Order.PRICE] == parsed.columns[Order.PRICE]).all()
+
+    # Partitions are codes in memory and names on disk
+    assert set(parsed.partitions) == {
+        Partition.BEST_BID,
+        Partition.BEST_ASK,
+        Partition.TRADE,
+    }
+    with open(os.path.join(cache_dir(str(file), "BLOOMBERG_TICK"), KEY_FILE)) as f:
+        names = json.load(f)["partitions"]
+    assert names == [partition_name(code) for code in parsed.partitions]
+    assert names[-1] == "TRADE"
+
+    # Changing the source invalidates the cache
+    with open(file, "a") as f:
+        f.write("01/10/2018 10:10:00;TRADE;60,00;100\n")
+
+    changed = dm.load_columns("instrument", spec)
+    assert not isinstance(changed.timestamp, np.memmap)
+    assert len(changed) == len(parsed) + 1
+
+    # The columns mapped before are replaced, not overwritten in place
+    cached = dm.load_columns("instrument", spec)
+    prices = np.array(cached.columns[Order.PRICE])
+    file.write_text(file.read_text().replace("59,68", "11,11"))
+    os.utime(file, ns=(0, 0))
+
+    rewritten = dm.load_columns("instrument", spec)
+    assert rewritten.columns[Order.PRICE][0] == 11.11
+    assert (cached.columns[Order.PRICE] == prices).all()
+
+    folder = cache_dir(str(file), "BLOOMBERG_TICK")
+    assert not any(name.endswith(".tmp") for name in os.listdir(folder))
+    assert dm.load_columns("instrument", spec).columns[Order.PRICE][0] == 11.11
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_run_merges_instruments_by_time(tmp_path, columnar):
+    first = tmp_path / "first.csv"
+    first.write_text(
+        "DATA;ACAO;VALOR;VOLUME\n"
+        "01/10/2018 10:05:00;BID;10,00;100\n"
+        "01/10/2018 10:07:00;BID;10,02;100\n"
+        "01/10/2018 10:06:00;BID;10,01;100\n"
+    )
+    second = tmp_path / "second.csv"
+    second.write_text(
+        "DATA;ACAO;VALOR;VOLUME\n"
+        "01/10/2018 10:05:00;ASK;20,00;200\n"
+        "01/10/2018 10:06:30;ASK;20,01;200\n"
+        "02/10/2018 09:00:00;ASK;20,02;200\n"
+    )
+
+    engine = Engine()
+    dm = DataManager(columnar=columnar)
+    engine.subscribe(dm, Topic.SYSTEM)
+
+    class MockSubscriber(Subscriber):
+        def __init__(self):
+            self.received_events = []
+
+        def receive(self, event: Event):
+            self.received_events.append(event)
+
+    mock_subscriber = MockSubscriber()
+    engine.subscribe(mock_subscriber, "first")
+    engine.subscribe(mock_subscriber, "second")
+
+    engine.inject(
+        Event(
+            Topic.SYSTEM,
+            Partition.LOAD,
+            {
+                name: {
+                    Data.SOURCE: DataSource.BLOOMBERG,
+                    Data.TYPE: DataType.TICK,
+                    Data.FILE: str(file),
+                }
+                for name, file in [("first", first), ("second", second)]
+            },
+        )
+    )
+    engine.inject(Event(Topic.SYSTEM, Partition.RUN, None))
+
+    received = [
+        (event.topic, event.value[Order.PRICE])
+        for event in mock_subscriber.received_events
+    ]
+    # Same timestamp: LOAD order wins
+    assert received == [
+        ("first", 10.00),
+        ("second", 20.00),
+        ("first", 10.01),
+        ("second", 20.01),
+        ("first", 10.02),
+        ("second", 20.02),
+    ]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_streaming_matches_load(columnar):
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: "./tests/2018-10-01.csv",
+    }
+    expected = DataManager().load_bloomberg_tick("instrument", spec[Data.FILE])
+
+    # Tiny chunks, so most rows cross a chunk boundary
+    for chunk_size in [1, 7, 64, 1 << 20]:
+        dm = DataManager(columnar=columnar, streaming=True, chunk_size=chunk_size)
+        assert_same_events(list(dm.stream("instrument", spec)), expected)
+
+
+@pytest.mark.parametrize("executor", [Executor.PROCESS, Executor.THREAD])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_parallel_load_matches_serial(tmp_path, executor, columnar):
+    files = {}
+    for i in range(4):
+        files["instrument{0}".format(i)] = file = tmp_path / "{0}.csv".format(i)
+        file.write_text(
+            "DATA;ACAO;VALOR;VOLUME\n"
+            + "".join(
+                "01/10/2018 10:{0:02d}:00;BID;{1},{2:02d};{3}\n".format(
+                    (j * (i + 1)) % 60, 10 + i, j, 100 * j
+                )
+                for j in range(20)
+            )
+        )
+    load = Event(
+        Topic.SYSTEM,
+        Partition.LOAD,
+        {
+            instrument: {
+                Data.SOURCE: DataSource.BLOOMBERG,
+                Data.TYPE: DataType.TICK,
+                Data.FILE: str(file),
+            }
+            for instrument, file in files.items()
+        },
+    )
+
+    serial = DataManager(columnar=columnar)
+    serial.receive(load)
+
+    parallel = DataManager(columnar=columnar, workers=3, executor=executor)
+    parallel.receive(load)
+
+    assert list(parallel.events.keys()) == list(files.keys())
+    assert_same_events(list(parallel.replay()), list(serial.replay()))
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"columnar": True}, {"streaming": True}, {"workers": 2}]
+)
+def test_load_spec_by_name(options):
+    spec = {Data.SOURCE: DataSource.BLOOMBERG, Data.FILE: "./tests/2018-10-01.csv"}
+    expected = DataManager().load_bloomberg_tick("instrument", spec[Data.FILE])
+
+    # Names and codes load the same data
+    dm = DataManager(**options)
+    dm.receive(
+        Event(
+            Topic.SYSTEM,
+            Partition.LOAD,
+            {"instrument": {**spec, Data.TYPE: "TICK", Data.PARTITIONS: ["TRADE"]}},
+        )
+    )
+    assert dm.specs["instrument"][Data.TYPE] == DataType.TICK
+    assert_same_events(
+        list(dm.replay()),
+        [event for event in expected if event.partition == Partition.TRADE],
+    )
+
+
+@pytest.mark.parametrize(
+    "source, type",
+    [
+        (DataSource.YAHOO, DataType.TICK),
+        (DataSource.BLOOMBERG, DataType.HIST),
+        (DataSource.BLOOMBERG, "MINUTE"),
+        ("REUTERS", "TICK"),
+    ],
+)
+def test_load_unsupported_spec(source, type):
+    spec = {Data.SOURCE: source, Data.TYPE: type, Data.FILE: "./tests/2018-10-01.csv"}
+
+    for dm in [DataManager(), DataManager(columnar=True), DataManager(streaming=True)]:
+        with pytest.raises(ValueError):
+            dm.receive(Event(Topic.SYSTEM, Partition.LOAD, {"instrument": spec}))
+
+
+def test_columnar_dates_outside_the_layout(tmp_path):
+    tick = tmp_path / "tick.csv"
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: str(tick),
+    }
+    dm = DataManager(columnar=True)
+
+    # Dates without zero padding are parsed as the row loader does
+    tick.write_text(
+        "DATA;ACAO;VALOR;VOLUME\n"
+        "01/10/2018 10:05:00;BID;59,68;400\n"
+        "1/10/2018 10:05:01;ASK;59,79;1200\n"
+        "01/10/2018 9:05:02;TRADE;59,70;100\n"
+    )
+    data = dm.load_columns("instrument", spec)
+    assert_same_events(
+        list(data.events()), dm.load_bloomberg_tick("instrument", str(tick))
+    )
+
+    # Malformed dates raise instead of being shuffled into wrong timestamps
+    tick.write_text(
+        "DATA;ACAO;VALOR;VOLUME\n"
+        "01/10/2018 10:05:00;BID;59,68;400\n"
+        "01/10/2018 10:05:00.5;ASK;59,79;1200\n"
+    )
+    with pytest.raises(ValueError):
+        dm.load_columns("instrument", spec)
+    with pytest.raises(ValueError):
+        dm.load_bloomberg_tick("instrument", str(tick))
+
+
+@pytest.mark.parametrize("engine", [Engine, Dispatcher])
+def test_streaming_run_keeps_engine_queue_bounded(engine):
+    instrument = "instrument"
+    engine = engine()
+
+    # Events waiting in the engine queue when each event is received
+    class Depth(Subscriber):
+        def __init__(self):
+            self.depths = []
+
+        def receive(self, event: Event):
+            self.depths.append(engine.events.qsize())
+
+    dm = DataManager(streaming=True, chunk_size=256)
+    depth = Depth()
+    engine.subscribe(dm, Topic.SYSTEM)
+    engine.subscribe(depth, instrument)
+
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: "./tests/2018-10-01.csv",
+    }
+    engine.inject(Event(Topic.SYSTEM, Partition.LOAD, {instrument: spec}))
+    engine.inject(Event(Topic.SYSTEM, Partition.RUN, None))
+
+    # Each event is processed before the next one is read
+    assert len(depth.depths) == 41
+    assert max(depth.depths) == 0
+
+
+@pytest.mark.parametrize("engine", [Engine, Dispatcher])
+@pytest.mark.parametrize("options", [{}, {"columnar": True}, {"streaming": True}])
+def test_run_handles_orders_at_their_timestamp(engine, options):
+    instrument = "instrument"
+
+    class Recorder(Subscriber):
+        def __init__(self):
+            self.received_events = []
+
+        def receive(self, event: Event):
+            self.received_events.append(event)
+
+    # Market buy on the first ask
+    class Buyer(Subscriber):
+        def __init__(self):
+            self.sent = False
+
+        def receive(self, event: Event):
+            if event.partition == Partition.BEST_ASK and not self.sent:
+                self.sent = True
+                self.send(
+                    Event(
+                        instrument,
+                        Partition.BUY,
+                        {Order.QUANTITY: 100, Order.PRICE: 0},
+                        event.timestamp,
+                    )
+                )
+
+    engine = engine()
+    dm = DataManager(**options)
+    recorder = Recorder()
+    risk = Risk()
+    engine.subscribe(dm, Topic.SYSTEM)
+    engine.subscribe(risk, Topic.SYSTEM)
+    for subscriber in [Book(instrument), risk, Execution(), Buyer(), recorder]:
+        engine.subscribe(subscriber, instrument)
+
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: "./tests/2018-10-01.csv",
+    }
+    engine.inject(Event(Topic.SYSTEM, Partition.LOAD, {instrument: spec}))
+    engine.inject(Event(Topic.SYSTEM, Partition.RUN, None))
+
+    # The order is filled before the next market event is replayed
+    partitions = [event.partition for event in recorder.received_events]
+    ask = partitions.index(Partition.BEST_ASK)
+    filled = partitions.index(OrderStatus.FILLED)
+    market = [Partition.BEST_BID, Partition.BEST_ASK, Partition.TRADE]
+    assert all(partition not in market for partition in partitions[ask + 1 : filled])
+    assert recorder.received_events[filled].timestamp == (
+        recorder.received_events[ask].timestamp
+    )
+    assert sum(partition in market for partition in partitions) == 41
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"columnar": True},
+        {"cache": True},
+        {"streaming": True, "chunk_size": 64},
+        {"streaming": True, "columnar": True, "chunk_size": 64},
+    ],
+)
+def test_load_filters(tmp_path, options):
+    file_name = str(tmp_path / "tick.csv")
+    write_ticks(file_name, 150)
+
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: file_name,
+    }
+    everything = DataManager().load_bloomberg_tick("instrument", file_name)
+
+    filters = {
+        Data.START: datetime(2018, 10, 1, 10, 0, 20),
+        Data.END: datetime(2018, 10, 1, 10, 2, 10),
+        Data.SESSION: [("10:00:00", "10:00:40"), ("10:01:30", "10:03:00")],
+        Data.PARTITIONS: [Partition.BEST_BID, Partition.TRADE],
+    }
+    expected = [
+        event
+        for event in everything
+        if filters[Data.START] <= event.timestamp < filters[Data.END]
+        and any(
+            a <= event.timestamp.strftime("%H:%M:%S") < b
+            for a, b in filters[Data.SESSION]
+        )
+        and event.partition in filters[Data.PARTITIONS]
+    ]
+    assert 0 < len(expected) < len(everything)
+
+    dm = DataManager(**options)
+    data = dm.load("instrument", {**spec, **filters})
+    events = list(data.events()) if dm.columnar else list(data)
+    assert_same_events(events, expected)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"columnar": True},
+        {"cache": True},
+        {"streaming": True, "chunk_size": 64},
+    ],
+)
+@pytest.mark.parametrize(
+    "partitions, expected",
+    [
+        ([Partition.BID], [Partition.BEST_BID]),
+        (["BID", "ASK"], [Partition.BEST_BID, Partition.BEST_ASK]),
+    ],
+)
+def test_load_filters_quote_actions(tmp_path, options, partitions, expected):
+    file_name = str(tmp_path / "tick.csv")
+    write_ticks(file_name, 150)
+
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: file_name,
+    }
+    everything = DataManager().load_bloomberg_tick("instrument", file_name)
+
+    # The file actions select the best quote events they are loaded as
+    dm = DataManager(**options)
+    data = dm.load("instrument", {**spec, Data.PARTITIONS: partitions})
+    events = list(data.events()) if dm.columnar else list(data)
+    assert_same_events(
+        events, [event for event in everything if event.partition in expected]
+    )
+    assert len(events) == 50 * len(expected)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_sorted_load_stops_after_end(tmp_path, columnar):
+    file_name = str(tmp_path / "tick.csv")
+    write_ticks(file_name, 150)
+
+    # A row inside the range after the end of the file is never read
+    with open(file_name, "a") as file:
+        file.write("01/10/2018 10:00:05;TRADE;1,00;1\n")
+
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: file_name,
+        Data.END: datetime(2018, 10, 1, 10, 0, 30),
+    }
+
+    assert len(DataManager(columnar=columnar).load("instrument", spec)) == 31
+
+    dm = DataManager(columnar=columnar, chunk_size=256)
+    data = dm.load("instrument", {**spec, Data.SORTED: True})
+    assert len(data) == 30
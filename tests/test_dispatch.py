@@ -0,0 +1,103 @@
+import pytest
+from event_processing.event import Event
+from event_processing.engine import Engine
+from event_processing.subscriber import Subscriber
+
+from src.event_backtesting.book import Book
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.execution import Execution
+from src.event_backtesting.dispatch import Dispatcher
+from src.event_backtesting.instrumentation import Profiler
+from src.event_backtesting.constants import *
+from tests.helpers import candles, signals, SignalStrategy
+
+
+class MockSubscriber(Subscriber):
+    def __init__(self):
+        self.received_events = []
+
+    def receive(self, event: Event):
+        self.received_events.append(event)
+
+
+class Handlers(MockSubscriber):
+    def __init__(self):
+        super().__init__()
+        self.handlers = {Partition.CANDLE: self.receive}
+
+
+def test_routes():
+    dispatcher = Dispatcher()
+    every = MockSubscriber()
+    candle = Handlers()
+    trades = MockSubscriber()
+
+    dispatcher.subscribe(every, "PETR4")
+    dispatcher.subscribe(candle, "PETR4")
+    dispatcher.subscribe(trades, "PETR4", [Partition.TRADE])
+
+    for partition in [Partition.CANDLE, Partition.TRADE, Partition.BUY]:
+        dispatcher.inject(Event("PETR4", partition, None))
+    dispatcher.inject(Event("VALE3", Partition.CANDLE, None))
+
+    def partitions(subscriber):
+        return [event.partition for event in subscriber.received_events]
+
+    assert partitions(every) == [Partition.CANDLE, Partition.TRADE, Partition.BUY]
+    assert partitions(candle) == [Partition.CANDLE]
+    assert partitions(trades) == [Partition.TRADE]
+
+    # Subscription order, never to the sender
+    order = []
+    dispatcher.route(every, "PETR4", Partition.SELL, lambda event: order.append(1))
+    dispatcher.route(candle, "PETR4", Partition.SELL, lambda event: order.append(2))
+    event = Event("PETR4", Partition.SELL, None)
+    candle.send(event)
+    assert order == [] and partitions(every)[-1] == Partition.SELL
+
+    dispatcher.route(trades, "PETR4", Partition.SELL, lambda event: order.append(3))
+    every.send(Event("PETR4", Partition.SELL, None))
+    assert order == [2, 3]
+
+    dispatcher.unsubscribe(candle.id, "PETR4")
+    dispatcher.inject(Event("PETR4", Partition.CANDLE, None))
+    assert len(candle.received_events) == 1
+    assert partitions(every)[-1] == Partition.CANDLE
+
+
+def run(engine, data, quantity, price, profiler=None):
+    book = Book(data.instrument)
+    risk = Risk()
+    execution = Execution()
+    strategy = SignalStrategy(data.instrument, quantity, price)
+
+    for subscriber in [book, risk, execution, strategy]:
+        engine.subscribe(subscriber, data.instrument)
+    engine.subscribe(risk, Topic.SYSTEM)
+
+    if profiler is not None:
+        profiler.attach(engine)
+
+    engine.inject(Event(Topic.SYSTEM, Partition.LOAD, [data.instrument]))
+    for event in data.events():
+        engine.inject(event)
+
+    return risk.summary(strategy.id), book
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_dispatcher_matches_engine(seed):
+    data = candles(500, seed)
+    quantity, price = signals(data, seed)
+
+    expected, _ = run(Engine(), data, quantity, price)
+    profiler = Profiler()
+    summary, book = run(Dispatcher(), data, quantity, price, profiler)
+
+    assert summary == expected
+
+    # The Book only got the partitions it handles
+    label = "Book#{0}".format(book.id)
+    received = {key[1] for key in profiler.handlers if key[0] == label}
+    assert received == {Partition.CANDLE, Partition.ORDER}
+    assert profiler.handlers[(label, Partition.CANDLE)].count == len(data)
@@ -0,0 +1,138 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from event_processing.event import Event
+
+from src.event_backtesting.equity import EquityCurve
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.order import Order
+from src.event_backtesting.constants import *
+
+
+def test_equity_curve():
+    curve = EquityCurve(100.0, capacity=2)
+
+    for equity in [110.0, 90.0, 120.0, 100.0]:
+        curve.update(equity)
+
+    assert curve.peak == 120.0
+    assert curve.drawdown == -20.0
+    assert curve.max_drawdown == -20.0
+
+    # Closing the same day again replaces it
+    curve.close_day(datetime(2020, 1, 1), 1.0)
+    curve.update(105.0)
+    curve.close_day(datetime(2020, 1, 1), 2.0)
+    assert len(curve) == 1
+    assert curve.carry == 2.0
+    assert curve.equities.tolist() == [105.0]
+
+    # The arrays grow as the days go by
+    for day in range(2, 6):
+        curve.close_day(datetime(2020, 1, day), 1.0)
+    assert len(curve) == 5
+    assert curve.carry == 6.0
+    assert curve.dates[-1] == np.datetime64("2020-01-05")
+    assert curve.drawdowns.tolist() == [-15.0] * 5
+
+
+def test_risk_marks_to_market():
+    risk = Risk()
+    risk.receive(Event(Topic.SYSTEM, Partition.LOAD, ["PETR4", "VALE3"]))
+
+    def candle(instrument, close, timestamp):
+        risk.receive(
+            Event(
+                instrument,
+                Partition.CANDLE,
+                {
+                    Candle.OPEN: close,
+                    Candle.HIGH: close,
+                    Candle.LOW: close,
+                    Candle.CLOSE: close,
+                    Candle.VOLUME: 100,
+                },
+                timestamp,
+            )
+        )
+
+    start = datetime(2020, 1, 1, 10)
+    candle("PETR4", 10.0, start)
+
+    # Long 100 PETR4 at 10
+    risk.fill("PETR4", 1, 1, OrderSide.BUY, 100, 10.0, start)
+    curve = risk.equity(1)
+    assert curve.equity == INITIAL_CAPITAL
+    assert risk._holders["PETR4"] == {1}
+
+    # Only the PETR4 prices move the equity
+    candle("PETR4", 12.0, start + timedelta(hours=1))
+    candle("VALE3", 50.0, start + timedelta(hours=1))
+    assert curve.equity == INITIAL_CAPITAL + 200
+
+    candle("PETR4", 9.0, start + timedelta(days=1))
+    assert len(curve) == 1
+    assert curve.equities[0] == INITIAL_CAPITAL + 200
+    assert curve.equity == INITIAL_CAPITAL - 100
+    assert curve.max_drawdown == -300
+
+    # Closing the trade realizes the result, fees and taxes
+    risk.fill("PETR4", 1, 2, OrderSide.SELL, 100, 9.0, start + timedelta(days=1))
+    assert risk._holders["PETR4"] == set()
+    assert curve.equity == risk.avail_capital[1]
+
+    risk.close(1)
+    assert len(curve) == 2
+    summary = risk.summary(1, structured=True)
+    assert summary.days == 2
+
+    # The drawdown of the equity curve does not replace the one of the trades
+    assert summary.equity_drawdown == curve.max_drawdown < -300
+    assert summary.max_drawdown == risk._trades[1][0].max_dd_close
+    assert "Max Drawdown Equity: ${0:.2f}".format(curve.max_drawdown) in risk.summary(1)
+
+    # Daily performance of the equity, the first day was exposed
+    performance = risk.performance(1)
+    assert performance["exposure"].tolist() == [0.5]
+    assert performance["max_drawdown"][0] < 0
+
+
+def test_risk_marks_to_market_on_ticks():
+    risk = Risk()
+    risk.receive(Event(Topic.SYSTEM, Partition.LOAD, ["PETR4"]))
+
+    def tick(partition, price, timestamp):
+        risk.receive(
+            Event(
+                "PETR4",
+                partition,
+                {Order.QUANTITY: 100, Order.PRICE: price},
+                timestamp,
+            )
+        )
+
+    start = datetime(2020, 1, 1, 10)
+    tick(Partition.BEST_BID, 10.0, start)
+    tick(Partition.BEST_ASK, 10.2, start)
+
+    # Long 100 PETR4 at the ask, marked at the mid
+    risk.fill("PETR4", 1, 1, OrderSide.BUY, 100, 10.2, start)
+    curve = risk.equity(1)
+    assert curve.equity == pytest.approx(INITIAL_CAPITAL - 10)
+
+    # Trades mark at their price
+    tick(Partition.TRADE, 10.5, start + timedelta(minutes=1))
+    assert curve.equity == pytest.approx(INITIAL_CAPITAL + 30)
+
+    # Ticks of a new day close the previous one
+    tick(Partition.TRADE, 11.0, start + timedelta(days=1))
+    tick(Partition.NEG, 9.0, start + timedelta(days=2))
+    assert curve.equities.tolist() == pytest.approx(
+        [INITIAL_CAPITAL + 30, INITIAL_CAPITAL + 80]
+    )
+    assert curve.equity == pytest.approx(INITIAL_CAPITAL - 120)
+    assert curve.max_drawdown == pytest.approx(-200)
+
+    performance = risk.performance(1)
+    assert performance["return"][0] == pytest.approx(80 / INITIAL_CAPITAL)
+    assert performance["exposure"].tolist() == [1.0]
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from event_processing.event import Event
+from event_processing.engine import Engine
+
+from src.event_backtesting.book import Book
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.execution import Execution
+from src.event_backtesting.feed import Feed, connect, serve, encode, decode
+from src.event_backtesting.constants import *
+from tests.helpers import candles, signals, SignalStrategy, run_events
+
+
+def test_feed_matches_replay():
+    data = candles(300, 0)
+    quantity, price = signals(data, 0)
+    risk, owner = run_events(data, quantity, price)
+
+    engine = Engine()
+    fed = Risk()
+    strategy = SignalStrategy(data.instrument, quantity, price)
+    for subscriber in [Book(data.instrument), fed, Execution(), strategy]:
+        engine.subscribe(subscriber, data.instrument)
+    engine.subscribe(fed, Topic.SYSTEM)
+    engine.inject(Event(Topic.SYSTEM, Partition.LOAD, [data.instrument]))
+
+    count = asyncio.run(Feed(engine, maxsize=16).run(data.events()))
+
+    assert count == len(data)
+    assert fed.summary(strategy.id) == risk.summary(owner)
+
+
+def test_backpressure():
+    produced = [0]
+    behind = []
+
+    async def source():
+        for i in range(100):
+            produced[0] += 1
+            yield Event("PETR4", Partition.TRADE, i)
+
+    class SlowEngine:
+        def __init__(self):
+            self.events = []
+
+        def inject(self, event):
+            self.events.append(event.value)
+            behind.append(produced[0] - len(self.events))
+
+    engine = SlowEngine()
+    asyncio.run(Feed(engine, maxsize=4).run(source()))
+
+    assert engine.events == list(range(100))
+    # The queue and the event being put
+    assert max(behind) <= 5
+
+
+def test_paced_replay():
+    start = datetime(2020, 1, 1, 10)
+    events = [
+        Event("PETR4", Partition.TRADE, i, start + timedelta(seconds=i))
+        for i in range(5)
+    ]
+
+    class Clock:
+        def __init__(self):
+            self.times = []
+
+        def inject(self, event):
+            self.times.append(time.perf_counter())
+
+    clock = Clock()
+    asyncio.run(Feed(clock, speed=100).run(events))
+
+    # 4 seconds of events at 100x
+    assert clock.times[-1] - clock.times[0] >= 0.039
+
+
+def test_socket_feed():
+    start = datetime(2020, 1, 1, 10)
+    events = [
+        Event(
+            "PETR4",
+            Partition.CANDLE,
+            {Candle.OPEN: 10.0 + i, Candle.CLOSE: 10.5 + i},
+            start + timedelta(minutes=i),
+        )
+        for i in range(50)
+    ]
+    assert decode(encode(events[0])).partition == Partition.CANDLE
+
+    class Recorder:
+        def __init__(self):
+            self.events = []
+
+        def inject(self, event):
+            self.events.append(event)
+
+    async def main():
+        server = await serve(events)
+        port = server.sockets[0].getsockname()[1]
+        recorder = Recorder()
+        async with server:
+            await Feed(recorder, maxsize=8).run(connect("127.0.0.1", port))
+        return recorder.events
+
+    received = asyncio.run(main())
+    assert [(e.topic, e.partition, e.value, e.timestamp) for e in received] == [
+        (e.topic, e.partition, e.value, e.timestamp) for e in events
+    ]
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from event_processing.event import Event
+
+from src.event_backtesting.history import PriceHistory
+from src.event_backtesting.risk import Risk, Trade
+from src.event_backtesting.constants import *
+
+
+def test_price_history_chunks():
+    start = datetime(2020, 1, 1, 10)
+    history = PriceHistory(chunk=8)
+    assert len(history) == 0 and history.last is None
+    assert len(history.bars()) == 0
+
+    for i in range(20):
+        history.append(start + timedelta(minutes=i), i, i + 1, i - 1, i + 0.5)
+
+        # The last bar is always the one just appended
+        assert history.last[Candle.CLOSE] == i + 0.5
+
+    assert len(history) == 20
+    assert len(history._chunks) == 3
+
+    closes = history.column(Candle.CLOSE)
+    assert closes.tolist() == [i + 0.5 for i in range(20)]
+    assert history.column("timestamp")[1] - history.column("timestamp")[0] == 60e6
+
+    # Merged into one chunk, appending keeps working
+    history.append(start, 0, 0, 0, 99.0)
+    assert len(history) == 21
+    assert history.column(Candle.CLOSE)[-1] == 99.0
+    assert history.column(Candle.HIGH)[:3].tolist() == [1, 2, 3]
+
+    # The next chunks keep the configured size
+    for i in range(4):
+        history.append(start, 0, 0, 0, 100.0 + i)
+    assert len(history) == 25
+    assert history.chunk == 8
+    assert [len(chunk) for chunk in history._chunks] == [24, 8]
+    assert history.column(Candle.CLOSE)[-5:].tolist() == [99, 100, 101, 102, 103]
+
+
+def test_risk_price_history():
+    risk = Risk()
+    risk.receive(Event(Topic.SYSTEM, Partition.LOAD, ["PETR4"]))
+
+    for close in [10.0, 11.0, 12.0]:
+        risk.receive(
+            Event(
+                "PETR4",
+                Partition.CANDLE,
+                {
+                    Candle.OPEN: close,
+                    Candle.HIGH: close + 1,
+                    Candle.LOW: close - 1,
+                    Candle.CLOSE: close,
+                    Candle.VOLUME: 100,
+                },
+                datetime(2020, 1, 1),
+            )
+        )
+
+    assert risk._prices["PETR4"].column(Candle.CLOSE).tolist() == [10, 11, 12]
+
+    # Long 100 bought at 10, marked to market on the last bar
+    trade = Trade()
+    trade.position = {"PETR4": 100}
+    trade.buy_flow = -1000.0
+    assert trade.partial_result(risk._prices, 1) == 200.0
+    assert trade.partial_result_high(risk._prices, 1) == 300.0
+    assert trade.partial_result_low(risk._prices, 1) == 100.0
@@ -0,0 +1,99 @@
+import json
+import numpy as np
+from event_processing.event import Event
+from event_processing.engine import Engine
+from event_processing.subscriber import Subscriber
+
+from src.event_backtesting.book import Book
+from src.event_backtesting.risk import Risk
+from src.event_backtesting.execution import Execution
+from src.event_backtesting.data_manager import DataManager
+from src.event_backtesting.instrumentation import Histogram, Profiler
+from src.event_backtesting.constants import *
+from tests.helpers import candles, signals, SignalStrategy
+
+
+def test_histogram():
+    histogram = Histogram()
+    for latency in [100, 200, 300, 5000]:
+        histogram.add(latency)
+
+    assert histogram.count == 4
+    assert histogram.mean == 1400
+    assert histogram.percentile(50) == 256
+    assert histogram.percentile(100) == 5000
+
+
+def test_profiler(tmp_path):
+    data = candles(200, 0)
+    quantity, price = signals(data, 0)
+
+    engine = Engine()
+    book = Book(data.instrument)
+    risk = Risk()
+    execution = Execution()
+    strategy = SignalStrategy(data.instrument, quantity, price)
+
+    for subscriber in [book, risk, execution, strategy]:
+        engine.subscribe(subscriber, data.instrument)
+    engine.subscribe(risk, Topic.SYSTEM)
+
+    profiler = Profiler()
+    with profiler.attach(engine):
+        engine.inject(Event(Topic.SYSTEM, Partition.LOAD, [data.instrument]))
+        for event in data.events():
+            engine.inject(event)
+
+    orders = np.count_nonzero(quantity)
+    assert profiler.events[(data.instrument, Partition.CANDLE)] == len(data)
+    assert profiler.events[(data.instrument, Partition.EXECUTE)] == orders
+    assert profiler.events[(data.instrument, Partition.ORDER)] == orders
+
+    # Every subscriber of the topic received every candle
+    for subscriber in [book, risk, execution, strategy]:
+        label = "{0}#{1}".format(type(subscriber).__name__, subscriber.id)
+        assert profiler.handlers[(label, Partition.CANDLE)].count == len(data)
+
+    report = profiler.report()
+    assert report["events"] == sum(profiler.events.values())
+    assert report["events_per_second"] > 0
+    assert "SignalStrategy#{0}".format(strategy.id) in profiler.text()
+
+    profiler.save(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json") as file:
+        assert json.load(file)["events"] == report["events"]
+
+    # The engine is restored
+    assert "inject" not in vars(engine)
+    assert engine.subscriptions[data.instrument][book.id] == book.receive
+    assert strategy._send == engine.inject
+
+
+def test_profiled_run_keeps_engine_queue_bounded():
+    engine = Engine()
+
+    class Depth(Subscriber):
+        def __init__(self):
+            self.depths = []
+
+        def receive(self, event):
+            self.depths.append(engine.events.qsize())
+
+    dm = DataManager(streaming=True, chunk_size=256)
+    depth = Depth()
+    engine.subscribe(dm, Topic.SYSTEM)
+    engine.subscribe(depth, "PETR4")
+
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: "./tests/2018-10-01.csv",
+    }
+    with Profiler().attach(engine) as profiler:
+        engine.inject(Event(Topic.SYSTEM, Partition.LOAD, {"PETR4": spec}))
+        engine.inject(Event(Topic.SYSTEM, Partition.RUN, None))
+
+    # RUN still processes each event before reading the next one
+    assert len(depth.depths) == 41
+    assert max(depth.depths) == 0
+    assert profiler.report()["events"] == 2 + 41
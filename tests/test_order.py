@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
 from src.event_backtesting.order import Order, Trade, OrderSide, OrderStatus
+from src.event_backtesting.constants import Fill
 
 
 def test_order_initialization_and_repr():
@@ -53,3 +54,33 @@ def test_trade_creation():
 
     expected_repr = f"{timestamp} - AAPL: 100@150.500000"
     assert repr(trade) == expected_repr
+
+
+def test_order_report():
+    order = Order("AAPL", OrderSide.BUY, 100, 150.00)
+    order.owner = "me"
+    order.executed = 40
+    order.average = 149.5
+
+    report = order.report(40, 149.5)
+
+    # Keyed like the order attributes, plus the fill
+    assert report[Order.ID] == order.id
+    assert report[Order.OWNER] == "me"
+    assert report[Order.EXECUTED] == 40
+    assert report[Fill.QUANTITY] == 40
+    assert report[Fill.PRICE] == 149.5
+    assert report.fill_quantity == 40
+    assert report.get("missing") is None
+
+    # A snapshot: later changes of the order do not change it
+    order.executed = 100
+    assert report.executed == 40
+
+    with pytest.raises(AttributeError):
+        report.executed = 100
+
+    # Slotted classes have no instance dictionary
+    assert not hasattr(order, "__dict__")
+    assert not hasattr(report, "__dict__")
+    assert not hasattr(Trade(None, "AAPL", 1, 1.0), "__dict__")
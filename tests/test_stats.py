@@ -0,0 +1,64 @@
+import pytest
+import numpy as np
+
+from src.event_backtesting.stats import Stats
+from tests.helpers import candles, signals, run_events
+
+
+def test_stats_welford():
+    values = np.random.default_rng(0).normal(10, 3, 1000)
+
+    stats = Stats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.count == 1000
+    assert stats.total == pytest.approx(values.sum())
+    assert stats.min == values.min()
+    assert stats.max == values.max()
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var(ddof=1))
+    assert stats.std == pytest.approx(values.std(ddof=1))
+
+
+def test_stats_merge():
+    values = np.random.default_rng(1).normal(0, 1, 500)
+
+    left, right = Stats(), Stats()
+    for value in values[:200]:
+        left.add(value)
+    for value in values[200:]:
+        right.add(value)
+
+    merged = left.merge(right)
+    assert merged.count == 500
+    assert merged.mean == pytest.approx(values.mean())
+    assert merged.variance == pytest.approx(values.var(ddof=1))
+    assert merged.min == values.min()
+
+    # Empty accumulators are neutral
+    assert Stats().merge(left).mean == pytest.approx(left.mean)
+    assert Stats().merge(Stats()).count == 0
+    assert Stats().variance == 0.0
+
+
+def test_structured_summary():
+    data = candles(500, 0)
+    quantity, price = signals(data, 0)
+    risk, owner = run_events(data, quantity, price)
+
+    trades = risk._trades[owner]
+    pnl = np.array([trade.pnl for trade in trades])
+    summary = risk.summary(owner, structured=True)
+
+    assert summary.trades == len(trades)
+    assert summary.profit_trades == np.count_nonzero(pnl > 0)
+    assert summary.gross == pytest.approx(pnl.sum())
+    assert summary.avg_win == pytest.approx(pnl[pnl > 0].mean())
+    assert summary.max_loss == pnl.min()
+    assert summary.std_trade == pytest.approx(pnl.std(ddof=1))
+    assert "Number of trades: {0}".format(len(trades)) in risk.summary(owner)
+
+    # A strategy without trades
+    assert risk.summary(-1, structured=True).avg_loss is None
+    assert risk.summary(-1).startswith("No trades in the period")
@@ -0,0 +1,120 @@
+import pytest
+from event_processing.event import Event
+from event_processing.engine import Engine
+from event_processing.subscriber import Subscriber
+from datetime import datetime
+
+from src.event_backtesting.data_manager import DataManager
+from src.event_backtesting.store import TickStore, convert
+from src.event_backtesting.order import Order
+from src.event_backtesting.constants import *
+from tests.helpers import write_ticks
+
+
+def test_convert_and_read(tmp_path):
+    csv_file = str(tmp_path / "tick.csv")
+    store_file = str(tmp_path / "tick.store")
+    write_ticks(csv_file, 150)
+
+    count = convert(
+        DataSource.BLOOMBERG,
+        DataType.TICK,
+        csv_file,
+        store_file,
+        stride=4,
+        chunk_size=100,
+    )
+    assert count == 150
+
+    spec = {
+        Data.SOURCE: DataSource.BLOOMBERG,
+        Data.TYPE: DataType.TICK,
+        Data.FILE: csv_file,
+    }
+    expected = [
+        (event.partition, event.value, event.timestamp)
+        for event in DataManager(columnar=True)
+        .load_columns("instrument", spec)
+        .events()
+    ]
+
+    store = TickStore(store_file)
+    assert len(store) == 150
+    events = [
+        (event.partition, event.value, event.timestamp)
+        for event in store.read("instrument").events()
+    ]
+    assert events == expected
+
+    # Range seek: start inclusive, end exclusive
+    for start, end in [
+        (datetime(2018, 10, 1, 10, 0, 30), datetime(2018, 10, 1, 10, 1, 7)),
+        (datetime(2018, 10, 1, 10, 0, 3), datetime(2018, 10, 1, 10, 0, 4)),
+        (datetime(2018, 10, 1), datetime(2018, 10, 1, 10, 0, 8)),
+        (datetime(2018, 10, 1, 10, 2), datetime(2018, 10, 2)),
+    ]:
+        events = [
+            (event.partition, event.value, event.timestamp)
+            for event in store.read("instrument", start, end).events()
+        ]
+        assert events == [e for e in expected if start <= e[2] < end]
+
+    # Outside the data
+    assert len(store.read("instrument", datetime(2019, 1, 1))) == 0
+    assert len(store.read("instrument", end=datetime(2018, 1, 1))) == 0
+
+
+def test_convert_unsorted(tmp_path):
+    csv_file = tmp_path / "tick.csv"
+    csv_file.write_text(
+        "DATA;ACAO;VALOR;VOLUME\n"
+        "01/10/2018 10:06:00;BID;10,00;100\n"
+        "01/10/2018 10:05:00;BID;10,02;100\n"
+    )
+
+    with pytest.raises(ValueError) as excinfo:
+        convert(DataSource.BLOOMBERG, DataType.TICK, str(csv_file), str(tmp_path / "s"))
+    assert "not sorted" in str(excinfo.value)
+
+
+def test_load_store(tmp_path):
+    csv_file = str(tmp_path / "tick.csv")
+    store_file = str(tmp_path / "tick.store")
+    write_ticks(csv_file, 150)
+    convert(DataSource.BLOOMBERG, DataType.TICK, csv_file, store_file)
+
+    engine = Engine()
+    dm = DataManager()
+    engine.subscribe(dm, Topic.SYSTEM)
+
+    class MockSubscriber(Subscriber):
+        def __init__(self):
+            self.received_events = []
+
+        def receive(self, event: Event):
+            self.received_events.append(event)
+
+    mock_subscriber = MockSubscriber()
+    engine.subscribe(mock_subscriber, "instrument")
+
+    engine.inject(
+        Event(
+            Topic.SYSTEM,
+            Partition.LOAD,
+            {
+                "instrument": {
+                    Data.SOURCE: DataSource.STORE,
+                    Data.FILE: store_file,
+                    Data.START: datetime(2018, 10, 1, 10, 1),
+                },
+            },
+        )
+    )
+    engine.inject(Event(Topic.SYSTEM, Partition.RUN, None))
+
+    assert len(mock_subscriber.received_events) == 90
+    assert mock_subscriber.received_events[0].timestamp == datetime(2018, 10, 1, 10, 1)
+    assert mock_subscriber.received_events[0].partition == Partition.BEST_BID
+    assert mock_subscriber.received_events[0].value[Order.PRICE] == 59.60
+    assert mock_subscriber.received_events[-1].partition == Partition.TRADE
+    assert mock_subscriber.received_events[-1].value[Order.QUANTITY] == 249
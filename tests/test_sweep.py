@@ -0,0 +1,93 @@
+import pytest
+import os
+import numpy as np
+from event_processing.event import Event
+
+from src.event_backtesting.strategy import Strategy
+from src.event_backtesting.sweep import sweep, table
+from src.event_backtesting.order import Order
+from src.event_backtesting.constants import *
+
+
+class MovingAverage(Strategy):
+    def __init__(self, instrument, window):
+        super().__init__(instrument)
+        self.window = window
+        self.closes = []
+        self.long = False
+
+    def receive(self, event):
+        if event.topic != self.instrument or event.partition != Partition.CANDLE:
+            return
+
+        self.closes.append(event.value[Candle.CLOSE])
+        if len(self.closes) < self.window:
+            return
+
+        above = self.closes[-1] > np.mean(self.closes[-self.window :])
+        if above != self.long:
+            self.long = above
+            self.send(
+                Event(
+                    self.instrument,
+                    Partition.BUY if above else Partition.SELL,
+                    {Order.QUANTITY: 100, Order.PRICE: 0},
+                    event.timestamp,
+                )
+            )
+
+
+def write_hist(file_name, days, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 20 + np.cumsum(rng.normal(0, 0.3, days))
+    dates = np.datetime64("2020-01-01") + np.arange(days)
+
+    with open(file_name, "w") as file:
+        file.write("Date,Open,High,Low,Close,Adj Close,Volume\n")
+        for date, price in zip(dates, close):
+            file.write(
+                "{0},{1:.2f},{2:.2f},{3:.2f},{1:.2f},{1:.2f},1000\n".format(
+                    date, price, price + 0.5, price - 0.5
+                )
+            )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"workers": 2, "executor": Executor.THREAD},
+        {"workers": 2, "executor": Executor.PROCESS},
+    ],
+)
+def test_sweep(tmp_path, options):
+    instruments = {}
+    for i, name in enumerate(["PETR4", "VALE3"]):
+        file_name = str(tmp_path / "{0}.csv".format(name))
+        write_hist(file_name, 200, i)
+        instruments[name] = {
+            Data.SOURCE: DataSource.YAHOO,
+            Data.TYPE: DataType.HIST,
+            Data.FILE: file_name,
+        }
+
+    params = [{"window": window} for window in [5, 10, 20]]
+    folder = str(tmp_path / "shared")
+
+    rows = sweep(instruments, MovingAverage, params, folder=folder, **options)
+    serial = sweep(instruments, MovingAverage, params, group=1)
+
+    # One row per parameter set, in order. Strategies sharing a replay get the
+    # same results as one replay per parameter set
+    assert [row["window"] for row in rows] == [5, 10, 20]
+    assert all(row["trades"] > 0 for row in rows)
+    for row, expected in zip(rows, serial):
+        assert row == expected
+        assert list(row["summary"]) == ["PETR4", "VALE3"]
+
+    # Each instrument was saved once and is memory-mapped by the runs
+    assert sorted(os.listdir(folder)) == ["0", "1"]
+
+    text = table(rows)
+    assert len(text.split("\n")) == 4
+    assert "summary" not in text
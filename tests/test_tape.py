@@ -0,0 +1,59 @@
+import pytest
+from datetime import datetime, timedelta
+
+from src.event_backtesting.tape import TradeTape
+
+
+def fill(tape, count, start=datetime(2020, 1, 1, 10)):
+    for i in range(count):
+        tape.append(start + timedelta(seconds=i), i + 1, 10.0 + i)
+
+
+def test_tape_unbounded_growth():
+    tape = TradeTape("PETR4", capacity=4)
+    fill(tape, 100)
+
+    assert len(tape) == 100
+    assert tape[0].quantity == 1
+    assert tape[0].price == 10.0
+    assert tape[0].timestamp == datetime(2020, 1, 1, 10)
+    assert tape[-1].quantity == 100
+    assert tape[-1].instrument == "PETR4"
+    assert list(tape.quantity) == list(range(1, 101))
+
+    with pytest.raises(IndexError):
+        tape[100]
+
+
+def test_tape_retention():
+    # Last 10 trades, compacted in place without growing
+    tape = TradeTape("PETR4", size=10)
+    fill(tape, 95)
+
+    assert len(tape) == 10
+    assert len(tape._timestamp) == 20
+    assert list(tape.quantity) == list(range(86, 96))
+
+    # Last 5 seconds, the first trade kept is exactly 5 seconds old
+    tape = TradeTape("PETR4", seconds=5, capacity=4)
+    fill(tape, 50)
+
+    assert len(tape) == 6
+    assert tape[0].timestamp == datetime(2020, 1, 1, 10) + timedelta(seconds=44)
+
+
+def test_tape_between_views():
+    start = datetime(2020, 1, 1, 10)
+    tape = TradeTape("PETR4")
+    fill(tape, 20, start)
+
+    timestamp, price, quantity = tape.between(
+        start + timedelta(seconds=5), start + timedelta(seconds=8)
+    )
+
+    assert list(quantity) == [6, 7, 8]
+    assert list(price) == [15.0, 16.0, 17.0]
+    assert price.base is not None
+
+    assert len(tape.between(start + timedelta(seconds=30))[0]) == 0
+    assert len(tape.between()[0]) == 20
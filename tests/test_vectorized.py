@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+
+from src.event_backtesting.vectorized import backtest, match
+from src.event_backtesting.constants import *
+from tests.helpers import candles, signals, run_events
+
+
+def test_match_semantics():
+    high = np.array([11.0, 11.0, 12.0, 10.5])
+    low = np.array([9.0, 10.0, 10.5, 9.0])
+    close = np.array([10.0, 10.5, 11.0, 10.0])
+
+    # Market buy, limit sell below the close, resting buy at 9.5, resting sell at 11.8
+    quantity = np.array([100, -100, 0, 0])
+    price = np.array([0.0, 10.0, 0.0, 0.0])
+    fills = match(high, low, close, quantity, price)
+    assert fills["bar"].tolist() == [0, 1]
+    assert fills["price"].tolist() == [10.0, 10.5]
+
+    quantity = np.array([100, -100, 0, 0])
+    price = np.array([9.5, 11.8, 0.0, 0.0])
+    fills = match(high, low, close, quantity, price)
+    assert fills["order"].tolist() == [1, 0]
+    assert fills["bar"].tolist() == [2, 3]
+    assert fills["price"].tolist() == [11.8, 9.5]
+
+
+@pytest.mark.parametrize("short", [False, True])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vectorized_matches_event_path(seed, short):
+    data = candles(500, seed)
+    quantity, price = signals(data, seed)
+
+    if short:
+        # Short sell first and buy back, with market orders so that every short
+        # sell is sent flat and is not rejected by Risk
+        quantity, price = -quantity, np.zeros(len(data))
+
+    risk, owner = run_events(data, quantity, price, short)
+    result = backtest(data, quantity, price)
+
+    assert len(result.trades) == len(risk._trades[owner]) > 0
+
+    for fast, slow in zip(result.trades, risk._trades[owner]):
+        assert fast.timestamp == slow.timestamp
+        assert len(fast.orders) == len(slow.orders)
+        assert fast.buy_flow == pytest.approx(slow.buy_flow)
+        assert fast.sell_flow == pytest.approx(slow.sell_flow)
+        assert fast.pnl == pytest.approx(slow.pnl)
+        assert fast.fee == pytest.approx(slow.fee)
+        assert fast.tax == pytest.approx(slow.tax)
+        assert fast.max_alloc == pytest.approx(slow.max_alloc)
+        assert fast.ret == pytest.approx(slow.ret)
+        assert fast.net_ret == pytest.approx(slow.net_ret)
+
+    assert result.capital == pytest.approx(risk.avail_capital[owner])